@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+週間経済指標カレンダー処理のベンチマーク
+
+合成データで post_weekly_calendar.py の各処理を計測し、従来の実装と比較する。
+
+    ical:  大きな合成 iCal フィードを、icalendar で全件パースしてから期間で絞る従来の方法と、
+           ical_stream で期間外を読み飛ばす parse_ical_events() で比較する
+    local: 数年分の合成 parquet を、pandas で全件読んで iterrows する従来の方法と、
+           期間条件を parquet リーダーに渡す load_local_calendar() で比較する
+    importance: 数万件のイベントの重要度判定を、キーワードリストを順に in で探す従来の方法と、
+           importance_classifier（1本の正規表現 + メモ化 + 一括判定）で比較する。
+           一致の確認には従来のリストと同じ表（国を限定しない）を使い、
+           出荷している国別の表とは何件で判定が変わるかを表示する
+    holidays: 数年分の期間問い合わせを、1日ずつ strftime して休場日の辞書を引く従来の方法と、
+           market_calendar（日付順の配列 + bisect）で比較する
+
+使用方法:
+    python calendar_bench.py ical
+    python calendar_bench.py ical --events 100000 --runs 5
+    python calendar_bench.py local --years 5
+    python calendar_bench.py importance --events 50000
+    python calendar_bench.py holidays --years 30 --queries 20000
+"""
+
+import io
+import os
+import json
+import sys
+import time
+import contextlib
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+from statistics import median
+
+from post_weekly_calendar import (
+    JST,
+    parse_ical_events,
+    determine_importance,
+    clean_summary,
+    get_week_range,
+    load_local_calendar,
+)
+from importance_classifier import ImportanceClassifier, DEFAULT_KEYWORDS_FILE
+from market_calendar import MarketCalendar
+
+SAMPLE_SUMMARIES = [
+    "米国 雇用統計・失業率", "米国 消費者物価指数(CPI)", "FOMC 政策金利発表",
+    "日銀 金融政策決定会合", "ユーロ圏 GDP（速報値）", "米国 ISM製造業景気指数",
+    "米国 小売売上高", "日本 鉱工業生産（速報）", "米国 住宅着工件数", "豪州 貿易収支",
+    "米国 生産者物価指数(PPI)", "英国 英中銀政策金利", "中国 製造業PMI", "米国 新規失業保険申請件数",
+    "独 IFO景況感指数", "NZ 四半期CPI", "カナダ 雇用統計", "米国 中古住宅販売件数",
+]
+
+
+def _fold(line: str) -> str:
+    """75 オクテットで折り返す（RFC 5545）"""
+    out = []
+    data = line.encode("utf-8")
+    while len(data) > 75:
+        cut = 75
+        while (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        out.append(data[:cut].decode("utf-8"))
+        data = b" " + data[cut:]
+    out.append(data.decode("utf-8"))
+    return "\r\n".join(out)
+
+
+def synthetic_feed(n_events: int, center: date, span_days: int = 730, seed: int = 1) -> bytes:
+    """center を中心に ±span_days/2 日へ n_events 件のイベントを散らした iCal フィードを作る"""
+    rng = random.Random(seed)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//calendar//JA"]
+    first = center - timedelta(days=span_days // 2)
+    for i in range(n_events):
+        day = first + timedelta(days=rng.randrange(span_days))
+        kind = rng.random()
+        if kind < 0.1:
+            dtstart = f"DTSTART;VALUE=DATE:{day:%Y%m%d}"
+        elif kind < 0.4:
+            dtstart = f"DTSTART:{day:%Y%m%d}T{rng.randrange(24):02d}{rng.choice((0, 30)):02d}00Z"
+        else:
+            dtstart = (f"DTSTART;TZID=Asia/Tokyo:{day:%Y%m%d}"
+                       f"T{rng.randrange(24):02d}{rng.choice((0, 30)):02d}00")
+        summary = rng.choice(SAMPLE_SUMMARIES)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:bench-{i}@example.com",
+            "DTSTAMP:20260101T000000Z",
+            dtstart,
+            f"SUMMARY:{summary}",
+            _fold(f"DESCRIPTION:前回\\, 予想\\, 結果の詳細は発表後に更新されます。{summary}\\n"
+                  f"参考: 過去12か月の推移と市場予想の中央値"),
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+
+def legacy_parse(content: bytes, start: date, end: date) -> list[dict]:
+    """従来の実装: icalendar で全件をパース・分類してから期間で絞る"""
+    from icalendar import Calendar
+
+    events = []
+    cal = Calendar.from_ical(content)
+    for component in cal.walk():
+        if component.name != "VEVENT":
+            continue
+        dtstart = component.get("dtstart")
+        if not dtstart:
+            continue
+        dt = dtstart.dt
+        if not isinstance(dt, datetime):
+            dt = datetime.combine(dt, datetime.min.time())
+        dt = dt.replace(tzinfo=JST) if dt.tzinfo is None else dt.astimezone(JST)
+        summary = str(component.get("summary", ""))
+        description = str(component.get("description", ""))
+        events.append({
+            "date": dt.date(),
+            "datetime": dt,
+            "time": "終日" if dtstart.params.get("VALUE") == "DATE" else dt.strftime("%H:%M"),
+            "summary": clean_summary(summary),
+            "importance": determine_importance(summary, description),
+        })
+    return [e for e in events if start <= e["date"] <= end]
+
+
+def _timeit(fn, runs: int) -> tuple[float, object]:
+    times = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return median(times), result
+
+
+def _key(e: dict) -> tuple:
+    return (e["datetime"], e["time"], e["summary"], e["importance"])
+
+
+def bench_ical(args) -> None:
+    base = datetime.strptime(args.date, "%Y-%m-%d") if args.date else datetime(2026, 10, 18)
+    week_start, week_end = get_week_range(base)
+    start, end = week_start.date(), week_end.date()
+    content = synthetic_feed(args.events, start)
+    print(f"Synthetic feed: {args.events} events, {len(content) / 1024 / 1024:.1f} MB, "
+          f"window {start} .. {end}")
+
+    try:
+        import icalendar  # noqa: F401
+    except ImportError:
+        print("ERROR: icalendar is not installed (needed for the baseline). Run: pip install icalendar")
+        sys.exit(1)
+
+    legacy_ms, legacy = _timeit(lambda: legacy_parse(content, start, end), args.runs)
+    stream_ms, stream = _timeit(lambda: parse_ical_events(content, start, end), args.runs)
+    same = sorted(map(_key, legacy)) == sorted(map(_key, stream))
+
+    print(f"  icalendar (full parse + filter): {legacy_ms:9.1f} ms  ({len(legacy)} events)")
+    print(f"  streaming (window-pruned):       {stream_ms:9.1f} ms  ({len(stream)} events)")
+    print(f"  speedup: {legacy_ms / stream_ms:.1f}x, results identical: {same}")
+    if not same:
+        sys.exit(1)
+
+
+def legacy_load_local(parquet_path: str, start: date, end: date) -> list[dict]:
+    """従来の実装: pandas で全件読み、iterrows で1行ずつ変換してから期間で絞る"""
+    import pandas as pd
+
+    df = pd.read_parquet(parquet_path)
+    events = []
+    for _, row in df.iterrows():
+        dt_date = row.get("date")
+        if dt_date is None:
+            continue
+        dt = dt_date if isinstance(dt_date, datetime) else datetime.combine(dt_date, datetime.min.time())
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=JST)
+        time_val = row.get("time", "")
+        time_str = "終日" if pd.isna(time_val) or time_val in ["終日", ""] else str(time_val)
+        importance = str(row.get("importance", "medium"))
+        events.append({
+            "date": dt.date(),
+            "datetime": dt,
+            "time": time_str,
+            "summary": clean_summary(str(row.get("summary", ""))),
+            "importance": importance if importance in ["high", "medium", "low"] else "medium",
+        })
+    return [e for e in events if start <= e["date"] <= end]
+
+
+def bench_local(args) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("ERROR: pyarrow is not installed. Run: pip install pyarrow pandas")
+        sys.exit(1)
+
+    base = datetime.strptime(args.date, "%Y-%m-%d") if args.date else datetime(2026, 10, 18)
+    week_start, week_end = get_week_range(base)
+    start, end = week_start.date(), week_end.date()
+
+    rng = random.Random(1)
+    first = start - timedelta(days=365 * args.years)
+    days = (365 * args.years) + 30
+    rows = sorted(
+        (first + timedelta(days=rng.randrange(days)) for _ in range(args.per_day * days)),
+    )
+    table = pa.table({
+        "date": pa.array(rows, pa.date32()),
+        "time": [rng.choice(("08:50", "21:30", "22:30", "", None, "終日")) for _ in rows],
+        "summary": [rng.choice(SAMPLE_SUMMARIES) + rng.choice(("", "（速報値）", "（改定値）"))
+                    for _ in rows],
+        "importance": [rng.choice(("high", "medium", "low", "unknown")) for _ in rows],
+        "country": [rng.choice(("US", "JP", "EU")) for _ in rows],
+        "actual": [rng.random() for _ in rows],
+    })
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "data", "economicCalendar", "economic_calendar_latest.parquet")
+        os.makedirs(os.path.dirname(path))
+        pq.write_table(table, path, row_group_size=args.row_group)
+        print(f"Synthetic parquet: {len(rows)} rows over {args.years} years, "
+              f"{os.path.getsize(path) / 1024 / 1024:.1f} MB, window {start} .. {end}")
+
+        legacy_ms, legacy = _timeit(lambda: legacy_load_local(path, start, end), args.runs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pushdown_ms, pushdown = _timeit(lambda: load_local_calendar(root, start, end), args.runs)
+
+    same = sorted(map(_key, legacy)) == sorted(map(_key, pushdown))
+    print(f"  pandas iterrows (full read):     {legacy_ms:9.1f} ms  ({len(legacy)} events)")
+    print(f"  pyarrow pushdown (week filter):  {pushdown_ms:9.1f} ms  ({len(pushdown)} events)")
+    print(f"  speedup: {legacy_ms / pushdown_ms:.1f}x, results identical: {same}")
+    if not same:
+        sys.exit(1)
+
+
+# 従来の determine_importance() のキーワード（"鳴生産" の誤記は "鉱工業生産" に直して比較する）
+LEGACY_HIGH_KEYWORDS = [
+    "FRB", "FOMC", "政策金利", "雇用統計", "NFP", "非農業部門",
+    "CPI", "消費者物価", "GDP", "ECB", "BOJ", "日銀",
+    "失業率", "英中銀",
+]
+LEGACY_MEDIUM_KEYWORDS = [
+    "ISM", "PMI", "小売売上", "鉱工業生産", "住宅", "貿易収支",
+    "景気指数", "製造業", "PPI", "生産者物価",
+]
+
+
+def legacy_importance(
+    summary: str, description: str, high: list[str] = LEGACY_HIGH_KEYWORDS,
+    medium: list[str] = LEGACY_MEDIUM_KEYWORDS,
+) -> str:
+    """従来の実装: 大文字化したテキストにキーワードを1つずつ in で探す"""
+    text = (summary + " " + description).upper()
+    for keyword in high:
+        if keyword in text:
+            return "high"
+    for keyword in medium:
+        if keyword in text:
+            return "medium"
+    return "low"
+
+
+def bench_importance(args) -> None:
+    rng = random.Random(1)
+    countries = ["米国", "日本", "ユーロ圏", "英国", "中国", "豪州", "カナダ"]
+    noise = ["前回値", "予想", "結果", "改定", "季節調整済", "前月比", "前年比", "コア"]
+    items = []
+    for i in range(args.events):
+        summary = f"{rng.choice(countries)} {rng.choice(SAMPLE_SUMMARIES)}"
+        if rng.random() < args.unique:
+            summary += f" {rng.choice(noise)}{rng.randrange(100)}"
+        description = " ".join(rng.choice(noise) for _ in range(rng.randrange(4)))
+        items.append((summary, description))
+    distinct = len(set(items))
+
+    # キーワード表が大きくなった場合を想定して、一致しないキーワードを足す
+    extra = [f"指標{i:04d}" for i in range(args.extra_keywords)]
+    high_kw = LEGACY_HIGH_KEYWORDS + extra[: len(extra) // 2]
+    medium_kw = LEGACY_MEDIUM_KEYWORDS + extra[len(extra) // 2:]
+    legacy_tables = {"thresholds": {"high": 3, "medium": 2}, "tables": [
+        {"country": "*", "category": "high", "keywords": {k: 3 for k in high_kw}},
+        {"country": "*", "category": "medium", "keywords": {k: 2 for k in medium_kw}},
+    ]}
+    with open(DEFAULT_KEYWORDS_FILE, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if extra:
+        config["tables"].append({"country": "*", "category": "bench", "keywords": {k: 1 for k in extra}})
+    print(f"Synthetic events: {len(items)} ({distinct} distinct summary+description), "
+          f"{len(high_kw) + len(medium_kw)} keywords")
+
+    # 判定器は本番と同じくプロセスで1回だけ作り、計測ごとにメモだけを空にする
+    classifier = ImportanceClassifier(legacy_tables)
+    scoped = ImportanceClassifier(config)
+
+    def cold(c, batch):
+        c.cache_clear()
+        return c.classify_many(items) if batch else [c.classify(s, d) for s, d in items]
+
+    legacy_ms, legacy = _timeit(
+        lambda: [legacy_importance(s, d, high_kw, medium_kw) for s, d in items], args.runs
+    )
+    cold_ms, one_by_one = _timeit(lambda: cold(classifier, False), args.runs)
+    batch_ms, batch = _timeit(lambda: cold(classifier, True), args.runs)
+    classifier.classify_many(items)
+    warm_ms, _ = _timeit(lambda: classifier.classify_many(items), args.runs)
+    scoped_ms, scoped_result = _timeit(lambda: cold(scoped, True), args.runs)
+
+    def rate(ms):
+        return f"{len(items) / ms * 1000:>12,.0f} events/s"
+
+    print(f"  keyword scan (legacy):     {legacy_ms:9.1f} ms {rate(legacy_ms)}")
+    print(f"  classifier, one by one:    {cold_ms:9.1f} ms {rate(cold_ms)}")
+    print(f"  classifier, batch:         {batch_ms:9.1f} ms {rate(batch_ms)}")
+    print(f"  classifier, batch (warm):  {warm_ms:9.1f} ms {rate(warm_ms)}")
+    print(f"  country-scoped tables:     {scoped_ms:9.1f} ms {rate(scoped_ms)}")
+    mismatches = sum(a != b for a, b in zip(legacy, batch))
+    print(f"  agreement with legacy tables: {len(items) - mismatches}/{len(items)}"
+          f"{'' if one_by_one == batch else ' (one-by-one and batch differ!)'}")
+    changed = sum(a != b for a, b in zip(legacy, scoped_result))
+    print(f"  country-scoped tables change {changed} events ({changed / len(items):.1%})")
+    if mismatches or one_by_one != batch:
+        sys.exit(1)
+
+
+# 以前 post_weekly_calendar.py に手で書いていた休場日（規則から計算した結果と突き合わせる）
+LEGACY_US_MARKET_HOLIDAYS = {
+    "2026-01-01": "元日", "2026-01-19": "キング牧師記念日", "2026-02-16": "大統領の日",
+    "2026-04-03": "聖金曜日", "2026-05-25": "戦没者追悼記念日", "2026-06-19": "ジューンティーンス",
+    "2026-07-03": "独立記念日（振替）", "2026-09-07": "労働者の日", "2026-11-26": "感謝祭",
+    "2026-12-25": "クリスマス",
+    "2027-01-01": "元日", "2027-01-18": "キング牧師記念日", "2027-02-15": "大統領の日",
+    "2027-03-26": "聖金曜日", "2027-05-31": "戦没者追悼記念日", "2027-06-18": "ジューンティーンス（振替）",
+    "2027-07-05": "独立記念日（振替）", "2027-09-06": "労働者の日", "2027-11-25": "感謝祭",
+    "2027-12-24": "クリスマス（振替）",
+}
+
+
+def legacy_holidays_in_range(table: dict, start: date, end: date) -> list[tuple[str, str]]:
+    """従来の get_holidays_in_range(): 1日ずつ strftime して辞書を引く"""
+    holidays = []
+    current = start
+    while current <= end:
+        date_str = current.strftime("%Y-%m-%d")
+        if date_str in table:
+            holidays.append((date_str, table[date_str]))
+        current += timedelta(days=1)
+    return holidays
+
+
+def bench_holidays(args) -> None:
+    first, last = 2026, 2026 + args.years - 1
+    build_ms, cal = _timeit(lambda: MarketCalendar(first, last), args.runs)
+    span_start, span_end = date(first, 1, 1), date(last, 12, 31)
+    table = dict(cal.holidays(span_start, span_end))
+
+    old = dict(cal.holidays(date(2026, 1, 1), date(2027, 12, 31)))
+    matches_old = old == LEGACY_US_MARKET_HOLIDAYS
+    print(f"Calendar {first}..{last}: {len(table)} NYSE holidays, built in {build_ms:.1f} ms; "
+          f"2026-2027 identical to the old hand-written table: {matches_old}")
+
+    rng = random.Random(1)
+    total_days = (span_end - span_start).days
+    windows = []
+    for _ in range(args.queries):
+        start = span_start + timedelta(days=rng.randrange(total_days))
+        length = 6 if rng.random() < 0.8 else rng.randrange(30, 3 * 365)
+        windows.append((start, min(start + timedelta(days=length), span_end)))
+    print(f"Queries: {len(windows)} (80% one week, 20% one month to three years)")
+
+    legacy_ms, legacy = _timeit(
+        lambda: [legacy_holidays_in_range(table, s, e) for s, e in windows], args.runs
+    )
+    bisect_ms, result = _timeit(lambda: [cal.holidays(s, e) for s, e in windows], args.runs)
+    same = legacy == result
+    print(f"  day-by-day dict lookup:  {legacy_ms:9.1f} ms")
+    print(f"  bisect on sorted arrays: {bisect_ms:9.1f} ms")
+    print(f"  speedup: {legacy_ms / bisect_ms:.1f}x, results identical: {same}")
+    if not (same and matches_old):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark weekly calendar processing")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ical = sub.add_parser("ical", help="iCal feed parsing")
+    ical.add_argument("--events", type=int, default=20000, help="Events in the feed (default: 20000)")
+    ical.add_argument("--runs", type=int, default=3, help="Repetitions, median is reported (default: 3)")
+    ical.add_argument("--date", type=str, default=None, help="Base date (YYYY-MM-DD)")
+    ical.set_defaults(func=bench_ical)
+
+    local = sub.add_parser("local", help="Local parquet calendar loading")
+    local.add_argument("--years", type=int, default=3, help="Years of history (default: 3)")
+    local.add_argument("--per-day", type=int, default=30, help="Events per day (default: 30)")
+    local.add_argument("--row-group", type=int, default=10000, help="Parquet row group size")
+    local.add_argument("--runs", type=int, default=3, help="Repetitions, median is reported (default: 3)")
+    local.add_argument("--date", type=str, default=None, help="Base date (YYYY-MM-DD)")
+    local.set_defaults(func=bench_local)
+
+    imp = sub.add_parser("importance", help="Importance classification throughput")
+    imp.add_argument("--events", type=int, default=50000, help="Events to classify (default: 50000)")
+    imp.add_argument(
+        "--unique", type=float, default=0.3,
+        help="Share of events with a randomized suffix, limits memo hits (default: 0.3)",
+    )
+    imp.add_argument(
+        "--extra-keywords", type=int, default=0,
+        help="Add N non-matching keywords to both implementations to see how they scale (default: 0)",
+    )
+    imp.add_argument("--runs", type=int, default=3, help="Repetitions, median is reported (default: 3)")
+    imp.set_defaults(func=bench_importance)
+
+    hol = sub.add_parser("holidays", help="Holiday range queries")
+    hol.add_argument("--years", type=int, default=30, help="Years in the calendar (default: 30)")
+    hol.add_argument("--queries", type=int, default=20000, help="Range queries (default: 20000)")
+    hol.add_argument("--runs", type=int, default=3, help="Repetitions, median is reported (default: 3)")
+    hol.set_defaults(func=bench_holidays)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
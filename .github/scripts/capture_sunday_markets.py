@@ -5,16 +5,27 @@
 毎週日曜日に nikkei225jp.com 上の IG証券サンデー指数
 （ダウ / NAS100 / ドル円）のチャートをキャプチャし、X に自動投稿する。
 
+キャプチャ対象は .github/data/sunday_targets.json（または --targets で指定した
+JSON）から sunday_targets.py で読み込み、1つのブラウザ内で複数ページを並列に開いて取得する。
+リクエストフィルタ・スクレイププロファイル・レスポンスの取得と再生はそれぞれ
+network_policy.py / scrape_profiles.py / response_capture.py にある。
+
 使用方法:
     python capture_sunday_markets.py
     python capture_sunday_markets.py --dry-run
     python capture_sunday_markets.py --capture-only
+    python capture_sunday_markets.py --targets my_targets.json --concurrency 6
 """
 
 import os
 import sys
 import io
+import json
+import time
+import asyncio
+import hashlib
 import argparse
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
@@ -24,45 +35,43 @@ if sys.platform == "win32":
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
 
 try:
-    from playwright.sync_api import sync_playwright
-except ImportError:
-    print("ERROR: playwright is not installed. Run: pip install playwright")
-    sys.exit(1)
-
-try:
-    import tweepy
+    from playwright.async_api import async_playwright
 except ImportError:
-    print("ERROR: tweepy is not installed. Run: pip install tweepy")
-    sys.exit(1)
+    # 本文生成だけを使う側（tweet_bench.py など）は playwright なしで import できるようにする
+    async_playwright = None
+
+from market_series import best_series, summarize_series, render_series_chart
+from recorded_responses import record_response, load_manifest, write_manifest
+from sunday_targets import DEFAULT_TARGETS_FILE, DEFAULT_ACTIONS, TARGETS, load_targets
+from network_policy import load_network_policy, install_request_filter, format_network_stats
+from scrape_profiles import (
+    load_scrape_profiles, save_scrape_profiles, scrape_market_data, find_chart_bounds,
+)
+from response_capture import install_response_capture, install_replay_routes, network_market_data
+from sunday_history import HistoryStore, require_pyarrow
+from run_report import RunReport
+from chart_images import prepare_media, format_media_stats, perceptual_hash, hash_distance
+from tweet_composer import TWEET_LIMIT, compose, section, weighted_length
+from x_client import XError, shared_client
+from publishers import PLATFORMS, build_publishers, format_results, make_post, primary_result, publish
 
 JST = ZoneInfo("Asia/Tokyo")
 
-TARGETS = [
-    {
-        "name": "サンデーダウ",
-        "short_name": "ダウ",
-        "url": "https://nikkei225jp.com/_ssi/if/?c=731",
-        "filename": "sunday_dow.png",
-        "emoji": "🇺🇸",
-        "is_fx": False,
-    },
-    {
-        "name": "サンデーNAS100",
-        "short_name": "NAS100",
-        "url": "https://nikkei225jp.com/_ssi/if/?c=737",
-        "filename": "sunday_nas100.png",
-        "emoji": "📈",
-        "is_fx": False,
-    },
-    {
-        "name": "サンデードル円",
-        "short_name": "ドル円",
-        "url": "https://nikkei225jp.com/_ssi/if/?c=734",
-        "filename": "sunday_usdjpy.png",
-        "emoji": "💵",
-        "is_fx": True,
-    },
-]
+# X の1ツイートに添付できる画像の上限
+MAX_TWEET_IMAGES = 4
+
+# --image-layout collage で合成した画像のファイル名
+COLLAGE_FILENAME = "collage_sunday_markets.png"
+
+# 前回投稿との比較で「同じ画像」とみなす知覚ハッシュのハミング距離の上限
+PHASH_TOLERANCE = 4
+
+# アップロード済み media_id を再利用する期限（X 側の有効期限 24 時間より短く）
+MEDIA_REUSE_HOURS = 20
+
+# 状態ディレクトリに残す実行レポートの数（run_report.py compare の比較対象）
+RUN_REPORT_HISTORY = 30
+
 
 CLEANUP_CSS = """
 #gnav, .gnav, .gnav-area,
@@ -87,281 +96,402 @@ body {
 }
 """
 
-FIND_CHART_BOUNDS_JS = """
-() => {
-    const els = document.querySelectorAll('*');
-    for (const el of els) {
-        const text = (el.textContent || '').trim();
-        if (/^(X\\s+)?サンデー/.test(text) && text.length < 40
-            && el.offsetHeight > 30 && el.offsetHeight < 60) {
+# チャート描画完了の判定: 価格ノードが埋まり、canvas/SVG が連続フレームで変化しなくなるまで待つ
+WAIT_CHART_READY_JS = """
+async ({ deadlineMs, stableFrames, minWaitMs }) => {
+    const start = performance.now();
+    const nextFrame = () => new Promise(resolve => {
+        // バックグラウンドページでは rAF が止まるため setTimeout でも進める
+        const t = setTimeout(resolve, 50);
+        requestAnimationFrame(() => { clearTimeout(t); resolve(); });
+    });
+
+    let priceNode = null;
+    function findPriceNode() {
+        // scrape_profiles.py の SCRAPE_MARKET_DATA_JS と同じ条件: チャート領域(y > 400)で最大フォントの数値
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        let best = null, bestFs = 0;
+        for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+            const c = n.textContent.replace(/[,\\s]/g, '');
+            if (!/^\\d+\\.?\\d*$/.test(c) || parseFloat(c) <= 1) continue;
+            const el = n.parentElement;
+            if (!el) continue;
             const rect = el.getBoundingClientRect();
-            if (rect.y > 100) {
-                return { x: 0, y: Math.floor(rect.y), found: true };
-            }
+            if (rect.height === 0 || rect.y <= 400) continue;
+            const fs = parseFloat(getComputedStyle(el).fontSize);
+            if (fs > bestFs) { best = el; bestFs = fs; }
         }
+        return best;
     }
-    return { x: 0, y: 305, found: false };
-}
-"""
 
-SCRAPE_MARKET_DATA_JS = """
-() => {
-    const result = { value: null, change: null, change_pct: null, debug_texts: [] };
-    const segments = [];
-    const seen = new Set();
-
-    function walk(node) {
-        const tag = node.nodeName.toUpperCase();
-        if (tag === 'SCRIPT' || tag === 'STYLE' || tag === 'NOSCRIPT' || tag === 'SVG') return;
-        if (node.nodeType === Node.TEXT_NODE) {
-            const text = node.textContent.trim();
-            if (text.length >= 1 && text.length <= 50) {
-                const parent = node.parentElement;
-                if (!parent) return;
-                const rect = parent.getBoundingClientRect();
-                if (rect.height === 0) return;
-                const style = getComputedStyle(parent);
-                if (style.display === 'none' || style.visibility === 'hidden') return;
-                const key = text + '|' + Math.round(rect.x) + '|' + Math.round(rect.y);
-                if (!seen.has(key)) {
-                    seen.add(key);
-                    segments.push({
-                        text: text, x: rect.x, y: rect.y,
-                        fontSize: parseFloat(style.fontSize),
-                        color: style.color,
-                    });
+    function chartSignature() {
+        const parts = [];
+        for (const c of document.querySelectorAll('canvas')) {
+            if (c.width < 100 || c.height < 100) continue;
+            let sig = c.width + 'x' + c.height;
+            try {
+                const ctx = c.getContext('2d');
+                if (ctx) {
+                    let sum = 0;
+                    for (const f of [0.25, 0.5, 0.75]) {
+                        const row = ctx.getImageData(0, Math.floor(c.height * f), c.width, 1).data;
+                        for (let i = 0; i < row.length; i += 16) sum = (sum * 31 + row[i]) | 0;
+                    }
+                    sig += ':' + sum;
                 }
-            }
+            } catch (e) { /* cross-origin canvas は寸法のみで判定 */ }
+            parts.push(sig);
         }
-        for (const child of node.childNodes) walk(child);
-    }
-    walk(document.body);
-    segments.sort((a, b) => a.y - b.y || a.x - b.x);
-
-    const chartSegs = segments.filter(s => s.y > 400);
-    result.debug_texts = chartSegs.slice(0, 30).map(
-        s => '[y=' + Math.round(s.y) + ' x=' + Math.round(s.x)
-             + ' fs=' + s.fontSize + ' c=' + s.color.slice(0,20)
-             + '] "' + s.text + '"'
-    );
-
-    // Price: largest-font pure number in chart area
-    let maxFs = 0;
-    let priceX = 0, priceY = 0;
-    for (const s of chartSegs) {
-        const c = s.text.replace(/[,\\s]/g, '');
-        if (/^\\d+\\.?\\d*$/.test(c) && s.fontSize > maxFs) {
-            const v = parseFloat(c);
-            if (v > 1) { result.value = v; maxFs = s.fontSize; priceX = s.x; priceY = s.y; }
+        for (const svg of document.querySelectorAll('svg')) {
+            if (svg.getBoundingClientRect().height < 100) continue;
+            parts.push(svg.childElementCount + ':' + svg.innerHTML.length);
         }
+        return parts.join('|');
     }
 
-    // Combine decimal part for price (e.g. "47,405" + ".20" → 47405.20)
-    if (result.value !== null && result.value === Math.floor(result.value)) {
-        for (const s of chartSegs) {
-            if (/^\\.\\d+$/.test(s.text.trim())
-                && Math.abs(s.y - priceY) < 40
-                && s.x > priceX && s.x < priceX + 300
-                && s.fontSize > maxFs * 0.4) {
-                result.value = parseFloat(result.value.toString() + s.text.trim());
-                break;
-            }
+    let lastSig = null, stable = 0, frame = 0;
+    while (performance.now() - start < deadlineMs) {
+        await nextFrame();
+        frame++;
+        if (!priceNode || !priceNode.isConnected || frame % 10 === 0) priceNode = findPriceNode();
+        const price = priceNode ? priceNode.textContent.trim() : '';
+        const sig = price + '#' + chartSignature();
+        stable = (price && sig === lastSig) ? stable + 1 : 0;
+        lastSig = sig;
+        if (stable >= stableFrames && performance.now() - start >= minWaitMs) {
+            return { ready: true, elapsed_ms: performance.now() - start, frames: frame };
         }
     }
+    return { ready: false, elapsed_ms: performance.now() - start, frames: frame };
+}
+"""
 
-    // Change: red/green colored number or signed number in chart area (fs >= 20)
-    function parseColor(c) {
-        const m = c.match(/rgb\\((\\d+),\\s*(\\d+),\\s*(\\d+)\\)/);
-        if (!m) return null;
-        return { r: parseInt(m[1]), g: parseInt(m[2]), b: parseInt(m[3]) };
-    }
-    let changeSeg = null;
-    for (const s of chartSegs) {
-        if (s.fontSize < 20) continue;
-        const c = s.text.replace(/[,\\s]/g, '');
-        const m = c.match(/^([+-]?\\d+\\.?\\d*)$/);
-        if (!m) continue;
-        const v = parseFloat(m[1]);
-        if (v === result.value || v === 0) continue;
-        const rgb = parseColor(s.color);
-        if (!rgb) continue;
-        const isRed = rgb.r > 150 && rgb.g < 100;
-        const isGreen = rgb.g > 100 && rgb.r < 80;
-        if (c.startsWith('+') || c.startsWith('-')) {
-            result.change = v; changeSeg = s; break;
-        }
-        if (isRed) {
-            result.change = -Math.abs(v); changeSeg = s; break;
-        }
-        if (isGreen) {
-            result.change = Math.abs(v); changeSeg = s; break;
-        }
-    }
+# 固定スリープだった各待機の上限（ms）。readiness 判定が早く満たされればその時点で抜ける
+CSS_SETTLE_MS = 500
+READY_STABLE_FRAMES = 12
+READY_MIN_WAIT_MS = 250
 
-    // Combine decimal part for change
-    if (changeSeg && result.change === Math.floor(result.change)) {
-        for (const s of chartSegs) {
-            if (/^\\.\\d+$/.test(s.text.trim())
-                && Math.abs(s.y - changeSeg.y) < 30
-                && s.x > changeSeg.x && s.x < changeSeg.x + 200
-                && s.fontSize < changeSeg.fontSize) {
-                const sign = result.change < 0 ? -1 : 1;
-                result.change = sign * parseFloat(Math.abs(result.change).toString() + s.text.trim());
-                break;
-            }
-        }
+
+async def wait_for_chart_ready(
+    page, budget_ms: int, min_wait_ms: int = READY_MIN_WAIT_MS
+) -> dict:
+    """チャートの描画完了を待ち、固定スリープに比べて短縮できた時間を返す
+
+    budget_ms は従来の固定待機時間で、判定が成立しなくてもそこで打ち切る。
+    クリックでページ遷移した場合は読み込み完了を待って残り時間で再判定する。
+    """
+    started = time.perf_counter()
+    ready = False
+    for _ in range(2):
+        remaining = budget_ms - (time.perf_counter() - started) * 1000
+        if remaining <= 0:
+            break
+        try:
+            res = await page.evaluate(WAIT_CHART_READY_JS, {
+                "deadlineMs": remaining,
+                "stableFrames": READY_STABLE_FRAMES,
+                "minWaitMs": min_wait_ms,
+            })
+            ready = bool(res.get("ready"))
+            break
+        except Exception:
+            # 実行コンテキストが破棄された（遷移中）: 読み込みを待って再試行
+            try:
+                await page.wait_for_load_state("load", timeout=max(remaining, 1))
+            except Exception:
+                break
+
+    waited_ms = (time.perf_counter() - started) * 1000
+    return {
+        "ready": ready,
+        "waited_ms": round(waited_ms),
+        "budget_ms": budget_ms,
+        "saved_ms": round(max(budget_ms - waited_ms, 0)),
     }
 
-    // Percentage: medium-font number < 100, not the price or change
-    for (const s of chartSegs) {
-        if (s.fontSize < 20 || s.fontSize >= maxFs) continue;
-        const c = s.text.replace(/[,\\s%]/g, '');
-        if (/^\\d+\\.\\d+$/.test(c)) {
-            const v = parseFloat(c);
-            if (v < 100 && v > 0
-                && v !== Math.abs(result.value || 0)
-                && v !== Math.abs(result.change || 0)) {
-                result.change_pct = (result.change !== null && result.change < 0) ? -v : v;
-                break;
-            }
-        }
+
+# 閉じるべきオーバーレイとチャートタブを1回の evaluate で探し、クリック対象に印を付けて返す
+RESOLVE_ACTIONS_JS = """
+({dismiss, tabs, tabSelector}) => {
+    const ATTR = 'data-sunday-action';
+    document.querySelectorAll('[' + ATTR + ']').forEach(el => el.removeAttribute(ATTR));
+
+    function visible(el) {
+        if (!el.getClientRects().length) return false;
+        const st = getComputedStyle(el);
+        return st.visibility !== 'hidden' && st.display !== 'none' && st.opacity !== '0';
+    }
+    function mark(el, ref) {
+        el.setAttribute(ATTR, ref);
+        return '[' + ATTR + '="' + ref + '"]';
     }
 
-    return result;
+    const plan = [];
+    const used = new Set();
+    dismiss.forEach((entry, i) => {
+        let nodes;
+        try { nodes = document.querySelectorAll(entry.selector); } catch (e) { return; }
+        const needle = (entry.text || '').toLowerCase();
+        for (const el of nodes) {
+            if (used.has(el)) continue;
+            if (needle && !(el.textContent || '').toLowerCase().includes(needle)) continue;
+            if (!visible(el)) continue;
+            used.add(el);
+            plan.push({ kind: 'dismiss', name: entry.selector, selector: mark(el, 'd' + i) });
+            break;
+        }
+    });
+
+    const candidates = Array.from(document.querySelectorAll(tabSelector));
+    tabs.forEach((tab, i) => {
+        const exact = candidates.filter(el => (el.textContent || '').trim() === tab.text);
+        // 同じテキストの入れ子は最も内側の要素を選ぶ
+        const el = exact.find(e => visible(e) && !exact.some(o => o !== e && e.contains(o)));
+        if (el) {
+            plan.push({ kind: 'tab', name: tab.name, selector: mark(el, 't' + i),
+                        settle_ms: tab.settle_ms });
+        }
+    });
+    return plan;
 }
 """
 
+TAB_CANDIDATE_SELECTOR = "a, button, span, div"
 
-def _try_close_popups(page) -> None:
-    """Cookie バナーやポップアップを閉じる"""
-    selectors = [
-        "button:has-text('同意')",
-        "button:has-text('OK')",
-        "button:has-text('Accept')",
-        "button:has-text('閉じる')",
-        ".cookie-close",
-        "[class*='cookie'] button",
-    ]
-    for sel in selectors:
-        try:
-            el = page.locator(sel).first
-            if el.is_visible(timeout=1000):
-                el.click()
-                page.wait_for_timeout(300)
-        except Exception:
-            pass
+
+async def resolve_actions(page, actions: dict, tabs: list[dict] | None = None) -> list[dict]:
+    """操作プロファイルから実行プラン [{"kind", "name", "selector", "settle_ms"}] を作る"""
+    return await page.evaluate(RESOLVE_ACTIONS_JS, {
+        "dismiss": actions["dismiss"] if tabs is None else [],
+        "tabs": actions["tabs"] if tabs is None else tabs,
+        "tabSelector": TAB_CANDIDATE_SELECTOR,
+    })
 
 
-def _try_select_ig_chart(page) -> bool:
-    """IG チャートタブがあればクリックして選択する"""
+async def _click(page, selector: str) -> bool:
+    """印を付けた要素をクリックする（消えていれば False）"""
     try:
-        candidates = page.locator("a, button, span, div").filter(has_text="IG")
-        for i in range(candidates.count()):
-            el = candidates.nth(i)
-            text = (el.text_content() or "").strip()
-            if text == "IG" and el.is_visible(timeout=1000):
-                el.click()
-                page.wait_for_timeout(3000)
-                print("    Selected IG chart view")
-                return True
+        await page.click(selector, timeout=1000)
+        return True
     except Exception:
-        pass
-    return False
+        return False
 
 
-def _try_select_1day(page) -> bool:
-    """1日チャートタブがあればクリックして選択する"""
-    try:
-        candidates = page.locator("a, button, span, div").filter(has_text="１日")
-        for i in range(candidates.count()):
-            el = candidates.nth(i)
-            text = (el.text_content() or "").strip()
-            if text == "１日" and el.is_visible(timeout=1000):
-                el.click()
-                page.wait_for_timeout(2000)
-                print("    Selected 1-day view")
-                return True
-    except Exception:
-        pass
-    return False
+async def run_actions(page, actions: dict, timed, log: str) -> dict[str, dict]:
+    """プランを実行する（ポップアップを閉じてからタブを順にクリックする）
 
+    タブのクリックで DOM が作り直され、印を付けた要素が消えた場合は
+    残りのタブだけを解決し直す（1回まで）。
+
+    Returns:
+        タブ名 → wait_for_chart_ready の結果
+    """
+    waits: dict[str, dict] = {}
+    with timed("resolve_actions"):
+        plan = await resolve_actions(page, actions)
+
+    with timed("popups"):
+        dismissed = 0
+        for step in (s for s in plan if s["kind"] == "dismiss"):
+            dismissed += await _click(page, step["selector"])
+        if dismissed:
+            print(f"{log} Dismissed {dismissed} overlay(s)")
+            await page.wait_for_timeout(actions["dismiss_settle_ms"])
+
+    tabs = [s for s in plan if s["kind"] == "tab"]
+    retried = False
+    for i, step in enumerate(tabs):
+        with timed(step["name"]):
+            clicked = await _click(page, step["selector"])
+            if not clicked and not retried:
+                retried = True
+                names = {s["name"] for s in tabs[i:]}
+                fresh = {s["name"]: s for s in await resolve_actions(
+                    page, actions, [t for t in actions["tabs"] if t["name"] in names]
+                )}
+                tabs[i:] = [fresh.get(s["name"], s) for s in tabs[i:]]
+                step = tabs[i]
+                clicked = step["name"] in fresh and await _click(page, step["selector"])
+            if clicked:
+                print(f"{log} Selected {step['name']}")
+                waits[step["name"]] = await wait_for_chart_ready(page, step["settle_ms"])
+    return waits
+
+
+# DOM スナップショット: script を除き、canvas は画像に置き換えた静的 HTML にする
+SNAPSHOT_DOM_JS = """
+() => {
+    const root = document.documentElement.cloneNode(true);
+    root.querySelectorAll('script, noscript').forEach(el => el.remove());
+    const live = document.querySelectorAll('canvas');
+    root.querySelectorAll('canvas').forEach((clone, i) => {
+        try {
+            const img = document.createElement('img');
+            img.src = live[i].toDataURL();
+            img.width = live[i].width;
+            img.height = live[i].height;
+            img.style.cssText = live[i].style.cssText;
+            clone.replaceWith(img);
+        } catch (e) { /* cross-origin canvas はそのまま */ }
+    });
+    return '<!DOCTYPE html>\n' + root.outerHTML;
+}
+"""
 
-def scrape_market_data(page, target_name: str) -> dict | None:
-    """ページから現在値・変動額・変動率をスクレイピングする"""
+
+def new_session(
+    output_dir: Path,
+    chart_timeout_ms: int = 8000,
+    target_timeout_sec: float = 90,
+    network_policy: dict | None = None,
+    capture_mode: str = "screenshot",
+    record_dir: Path | None = None,
+    replay_url: str | None = None,
+    snapshot: bool = False,
+    report: RunReport | None = None,
+) -> dict:
+    """1回の実行で全ターゲットが共有する設定をまとめる"""
+    return {
+        "output_dir": output_dir,
+        "chart_timeout_ms": chart_timeout_ms,
+        "target_timeout_sec": target_timeout_sec,
+        "network_policy": network_policy or load_network_policy(),
+        "capture_mode": capture_mode,
+        "record_dir": record_dir,
+        "record_manifest": load_manifest(record_dir) if record_dir else None,
+        "replay_url": replay_url,
+        "snapshot": snapshot and record_dir is not None,
+        "report": report,
+    }
+
+
+async def launch_browser_context(p) -> tuple:
+    """キャプチャ用のブラウザとコンテキストを起動する"""
+    browser = await p.chromium.launch(headless=True)
+    context = await browser.new_context(
+        viewport={"width": 1280, "height": 900},
+        locale="ja-JP",
+        timezone_id="Asia/Tokyo",
+    )
+    return browser, context
+
+
+def require_playwright() -> bool:
+    """playwright が使えるか確認し、なければメッセージを出す"""
+    if async_playwright is None:
+        print("ERROR: playwright is not installed. Run: pip install playwright")
+        return False
+    return True
+
+
+@contextmanager
+def _timed(timings: dict, phase: str, report: RunReport | None = None, target: str | None = None):
+    """with ブロックの所要時間（ms）を timings[phase] に加算し、report があればスパンも記録する"""
+    started = time.perf_counter()
+    status = "ok"
     try:
-        raw = page.evaluate(SCRAPE_MARKET_DATA_JS)
-        debug = raw.get("debug_texts", [])
-        value = raw.get("value")
-        change = raw.get("change")
-        change_pct = raw.get("change_pct")
-
-        if debug and value is None:
-            print(f"    Scrape debug ({len(debug)} chart segments):")
-            for line in debug[:20]:
-                print(f"      {line}")
-
-        if value is not None:
-            data = {"value": value}
-            if change is not None:
-                data["change"] = change
-            if change_pct is not None:
-                data["change_pct"] = change_pct
-            print(f"    Scraped: value={value}, change={change}, pct={change_pct}")
-            return data
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timings[phase] = timings.get(phase, 0) + elapsed_ms
+        if report is not None:
+            report.add_span(phase, elapsed_ms, target=target, start=started, status=status)
+
+
+async def _open_target_page(context, target: dict, session: dict) -> tuple:
+    """ページを開き、読み込み・ポップアップ処理・チャートタブ選択までを行う
+
+    Returns:
+        (page, {"network": 通信集計, "payloads": 価格系列候補, "waits": 待機結果,
+                "timings": フェーズ別所要時間 ms})
+    """
+    log = f"    [{target['name']}]"
+    waits: dict[str, dict] = {}
+    timings: dict[str, float] = {}
+    report = session.get("report")
+
+    def timed(phase: str):
+        return _timed(timings, phase, report, target["name"])
+
+    page = await context.new_page()
+    if session.get("replay_url"):
+        await install_replay_routes(page, session["replay_url"])
+    network = await install_request_filter(page, session["network_policy"], target["url"])
+    payloads = await install_response_capture(page, session)
+    try:
+        with timed("goto"):
+            await page.goto(target["url"], wait_until="networkidle", timeout=30000)
+        with timed("ready"):
+            waits["load"] = await wait_for_chart_ready(page, session["chart_timeout_ms"])
 
-        print(f"    Scrape: no price found for {target_name}")
-        return None
-    except Exception as e:
-        print(f"    Scrape error: {e}")
-        return None
+        waits.update(await run_actions(page, target.get("actions") or DEFAULT_ACTIONS, timed, log))
+    except BaseException:
+        await page.close()
+        raise
+    return page, {"network": network, "payloads": payloads, "waits": waits, "timings": timings}
 
 
-def capture_charts(
-    output_dir: Path, chart_timeout_ms: int = 8000
-) -> tuple[list[Path], dict]:
-    """各サンデー指数のチャートをキャプチャし、数値データもスクレイピングする"""
-    output_dir.mkdir(parents=True, exist_ok=True)
-    screenshots: list[Path] = []
-    market_data: dict = {}
+async def _capture_target(
+    context, target: dict, session: dict, profile: dict | None = None
+) -> dict:
+    """1ターゲット分のページを開き、スクレイピングとスクリーンショットを行う
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1280, "height": 900},
-            locale="ja-JP",
-            timezone_id="Asia/Tokyo",
-        )
+    capture_mode が network の場合は DOM スクレイピングとスクリーンショットを省き、
+    レスポンスの価格系列から数値を求めてチャートを自前で描画する。
+    """
+    log = f"    [{target['name']}]"
+    output_dir = session["output_dir"]
+    mode = session["capture_mode"]
+    page, state = await _open_target_page(context, target, session)
+    network, payloads, waits = state["network"], state["payloads"], state["waits"]
+    timings = state["timings"]
 
-        for target in TARGETS:
-            print(f"\n  Capturing: {target['name']}")
-            print(f"    URL: {target['url']}")
-            page = context.new_page()
+    def timed(phase: str):
+        return _timed(timings, phase, session.get("report"), target["name"])
 
-            try:
-                page.goto(target["url"], wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(chart_timeout_ms)
-
-                _try_close_popups(page)
-                _try_select_ig_chart(page)
-                _try_select_1day(page)
-
-                data = scrape_market_data(page, target["name"])
-                if data:
-                    market_data[target["name"]] = data
-
-                page.add_style_tag(content=CLEANUP_CSS)
-                page.wait_for_timeout(500)
-
-                bounds = page.evaluate(FIND_CHART_BOUNDS_JS)
-                chart_y = bounds.get("y", 305)
-                print(f"    Chart top: y={chart_y} (auto-detected={bounds.get('found', False)})")
-
-                filepath = output_dir / target["filename"]
-                clip_x = 85
-                clip_w = min(1280 - clip_x, 610)
-                clip_h = min(900 - chart_y, 430)
-                page.screenshot(
-                    path=str(filepath),
+    try:
+        if session.get("snapshot"):
+            html = await page.evaluate(SNAPSHOT_DOM_JS)
+            record_response(
+                session["record_dir"], session["record_manifest"], target["url"],
+                html.encode("utf-8"), content_type="text/html; charset=utf-8",
+            )
+
+        data = None
+        image = None
+        filepath = output_dir / target["filename"]
+        if mode in ("network", "both"):
+            with timed("network_series"):
+                data, series = network_market_data(target, payloads, output_dir)
+
+        if mode == "network":
+            with timed("render"):
+                if series and render_series_chart(series["ticks"], filepath, target["is_fx"]):
+                    image = filepath.read_bytes()
+                else:
+                    filepath = None
+        else:
+            with timed("scrape"):
+                dom_data, profile = await scrape_market_data(page, target["name"], profile)
+            data = data or dom_data
+
+            with timed("css"):
+                await page.add_style_tag(content=CLEANUP_CSS)
+                waits["css"] = await wait_for_chart_ready(page, CSS_SETTLE_MS, min_wait_ms=0)
+
+            with timed("bounds"):
+                bounds = await find_chart_bounds(page, profile)
+            chart_y = bounds.get("y", 305)
+            print(f"{log} Chart top: y={chart_y} (auto-detected={bounds.get('found', False)})")
+
+            clip_x = 85
+            clip_w = min(1280 - clip_x, 610)
+            clip_h = min(900 - chart_y, 430)
+            with timed("screenshot"):
+                image = await page.screenshot(
                     clip={
                         "x": clip_x,
                         "y": max(chart_y - 5, 0),
@@ -369,19 +499,327 @@ def capture_charts(
                         "height": clip_h,
                     },
                 )
+            # 画像はメモリ上のバイト列で扱い、ファイルは確認・artifact 用に書き出すだけ
+            filepath.write_bytes(image)
+
+        for phase, w in waits.items():
+            status = "ready" if w["ready"] else "deadline"
+            print(f"{log} Wait {phase}: {w['waited_ms']}ms/{w['budget_ms']}ms ({status})")
+
+        if filepath:
+            print(f"{log} Saved: {filepath.name} ({len(image) / 1024:.0f} KB)")
+        print(f"{log} Network: {format_network_stats(network)}")
+        return {
+            "screenshot": filepath,
+            "image": image,
+            "data": data,
+            "wait_saved_ms": sum(w["saved_ms"] for w in waits.values()),
+            "network": network,
+            "profile": profile,
+            "timings": timings,
+        }
+    finally:
+        await page.close()
+
+
+async def _capture_target_isolated(
+    semaphore: asyncio.Semaphore,
+    context,
+    target: dict,
+    session: dict,
+    profile: dict | None = None,
+) -> dict | None:
+    """同時実行数とタイムアウトを適用し、失敗を他のターゲットに波及させない"""
+    timeout = target.get("timeout_sec") or session["target_timeout_sec"]
+    async with semaphore:
+        print(f"\n  Capturing: {target['name']}")
+        print(f"    URL: {target['url']}")
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            result = await asyncio.wait_for(
+                _capture_target(context, target, session, profile),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"    [{target['name']}] ERROR: timed out after {timeout:.0f}s")
+            status, result = "timeout", None
+        except Exception as e:
+            print(f"    [{target['name']}] ERROR: {e}")
+            status, result = "error", None
+        elapsed = time.perf_counter() - started
+        if session.get("report") is not None:
+            session["report"].add_span(
+                "target", elapsed * 1000, target=target["name"], start=started, status=status
+            )
+        if result is not None:
+            print(f"    [{target['name']}] Done in {elapsed:.1f}s")
+        return result
+
+
+async def capture_charts_async(
+    output_dir: Path,
+    targets: list[dict],
+    chart_timeout_ms: int = 8000,
+    concurrency: int = 3,
+    target_timeout_sec: float = 90,
+    network_policy: dict | None = None,
+    profile_path: Path | None = None,
+    capture_mode: str = "screenshot",
+    record_dir: Path | None = None,
+    replay_url: str | None = None,
+    snapshot: bool = False,
+    report: RunReport | None = None,
+) -> tuple[list[Path], dict, dict[str, bytes]]:
+    """1つのブラウザで最大 concurrency ページを並列に開き、全ターゲットをキャプチャする
+
+    snapshot が真なら record_dir に各ページの DOM スナップショットと、
+    その時点の抽出値を expectations.json として保存する（sunday_bench.py 用）。
+    report を渡すとフェーズごとのスパンを記録する。
+    """
+    profiles = load_scrape_profiles(profile_path) if profile_path else {}
+    output_dir.mkdir(parents=True, exist_ok=True)
+    session = new_session(
+        output_dir,
+        chart_timeout_ms=chart_timeout_ms,
+        target_timeout_sec=target_timeout_sec,
+        network_policy=network_policy,
+        capture_mode=capture_mode,
+        record_dir=record_dir,
+        replay_url=replay_url,
+        snapshot=snapshot,
+        report=report,
+    )
+    screenshots: list[Path] = []
+    market_data: dict = {}
+    images: dict[str, bytes] = {}
 
-                size_kb = filepath.stat().st_size / 1024
-                print(f"    Saved: {filepath.name} ({size_kb:.0f} KB)")
-                screenshots.append(filepath)
+    async with async_playwright() as p:
+        with report.span("browser_launch") if report else nullcontext():
+            browser, context = await launch_browser_context(p)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
 
+        try:
+            results = await asyncio.gather(*(
+                _capture_target_isolated(
+                    semaphore, context, target, session, profiles.get(target["url"])
+                )
+                for target in targets
+            ))
+        finally:
+            await browser.close()
+
+    if record_dir:
+        write_manifest(record_dir, session["record_manifest"])
+        print(f"\nRecorded {len(session['record_manifest'])} responses to {record_dir}")
+    if session["snapshot"]:
+        expectations = {
+            t["name"]: {"url": t["url"], **r["data"]}
+            for t, r in zip(targets, results) if r and r["data"]
+        }
+        with open(record_dir / "expectations.json", "w", encoding="utf-8") as f:
+            json.dump(expectations, f, ensure_ascii=False, indent=2)
+        print(f"Saved expectations for {len(expectations)} targets")
+
+    # gather は入力順を保つので、ターゲット定義の順に並ぶ
+    for target, result in zip(targets, results):
+        if result is None:
+            continue
+        if result["screenshot"]:
+            screenshots.append(result["screenshot"])
+            images[result["screenshot"].name] = result["image"]
+        if result["data"]:
+            market_data[target["name"]] = result["data"]
+        if result["profile"]:
+            profiles[target["url"]] = result["profile"]
+        elif capture_mode != "network":
+            profiles.pop(target["url"], None)
+
+    if profile_path:
+        save_scrape_profiles(profile_path, profiles)
+
+    saved = {t["name"]: r["wait_saved_ms"] for t, r in zip(targets, results) if r}
+    if saved:
+        print("\nReadiness wait saved vs fixed sleeps:")
+        for name, ms in saved.items():
+            print(f"  {name}: {ms / 1000:.1f}s")
+
+    network = [r["network"] for r in results if r]
+    if network:
+        total = {
+            "requests": sum(n["requests"] for n in network),
+            "blocked": sum(n["blocked"] for n in network),
+            "blocked_by_reason": {},
+            "bytes_transferred": sum(n["bytes_transferred"] for n in network),
+            "bytes_avoided_est": sum(n["bytes_avoided_est"] for n in network),
+        }
+        for n in network:
+            for reason, count in n["blocked_by_reason"].items():
+                total["blocked_by_reason"][reason] = total["blocked_by_reason"].get(reason, 0) + count
+        print(f"\nNetwork (all targets): {format_network_stats(total)}")
+
+    return screenshots, market_data, images
+
+
+def capture_charts(
+    output_dir: Path,
+    chart_timeout_ms: int = 8000,
+    targets: list[dict] | None = None,
+    concurrency: int = 3,
+    target_timeout_sec: float = 90,
+    network_policy: dict | None = None,
+    profile_path: Path | None = None,
+    capture_mode: str = "screenshot",
+    record_dir: Path | None = None,
+    replay_url: str | None = None,
+    snapshot: bool = False,
+    report: RunReport | None = None,
+) -> tuple[list[Path], dict, dict[str, bytes]]:
+    """各サンデー指数のチャートをキャプチャし、数値データもスクレイピングする
+
+    Returns:
+        (保存した画像のパス, ターゲット名 → 数値データ, ファイル名 → 画像バイト列)
+    """
+    return asyncio.run(capture_charts_async(
+        output_dir,
+        targets if targets is not None else TARGETS,
+        chart_timeout_ms=chart_timeout_ms,
+        concurrency=concurrency,
+        target_timeout_sec=target_timeout_sec,
+        network_policy=network_policy,
+        profile_path=profile_path,
+        capture_mode=capture_mode,
+        record_dir=record_dir,
+        replay_url=replay_url,
+        snapshot=snapshot,
+        report=report,
+    ))
+
+
+async def _sample_target(
+    context, target: dict, session: dict, warm: dict, profiles: dict
+) -> dict | None:
+    """開いたままのページから1サンプルを取得する（取れなければページを開き直して再試行）"""
+    log = f"    [{target['name']}]"
+    for attempt in range(2):
+        if warm.get(target["name"]) is None:
+            try:
+                warm[target["name"]] = await _open_target_page(context, target, session)
             except Exception as e:
-                print(f"    ERROR: {e}")
-            finally:
-                page.close()
+                print(f"{log} ERROR opening page: {e}")
+                return None
+        page, state = warm[target["name"]]
+
+        data = None
+        if session["capture_mode"] != "screenshot":
+            series = best_series(state["payloads"])
+            state["payloads"].clear()
+            if series:
+                data = summarize_series(series)
+        if data is None and session["capture_mode"] != "network":
+            data, profile = await scrape_market_data(page, target["name"], profiles.get(target["url"]))
+            if profile:
+                profiles[target["url"]] = profile
+            if data:
+                data["source"] = "dom"
+        if data:
+            return data
+
+        if attempt == 0:
+            print(f"{log} No sample, reloading page")
+            await page.close()
+            warm[target["name"]] = None
+    return None
 
-        browser.close()
 
-    return screenshots, market_data
+async def _sample_target_isolated(
+    semaphore: asyncio.Semaphore, context, target: dict, session: dict, warm: dict, profiles: dict
+) -> dict | None:
+    """同時実行数とタイムアウトを適用して1サンプルを取得する（時間切れのページは次の周回で開き直す）"""
+    timeout = target.get("timeout_sec") or session["target_timeout_sec"]
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(
+                _sample_target(context, target, session, warm, profiles), timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"    [{target['name']}] ERROR: timed out after {timeout:.0f}s")
+            stale = warm.pop(target["name"], None)
+            if stale is not None:
+                try:
+                    await stale[0].close()
+                except Exception:
+                    pass
+            return None
+
+
+async def record_session_async(
+    targets: list[dict],
+    history_dir: Path,
+    interval_min: float = 5,
+    duration_min: float = 240,
+    chart_timeout_ms: int = 8000,
+    network_policy: dict | None = None,
+    profile_path: Path | None = None,
+    capture_mode: str = "screenshot",
+    replay_url: str | None = None,
+    concurrency: int = 3,
+    target_timeout_sec: float = 90,
+) -> int:
+    """ブラウザとページを開いたまま、interval_min 分ごとに全ターゲットを取得して履歴に追記する
+
+    各周回のターゲットは最大 concurrency 件ずつ、1件 target_timeout_sec 秒までで取得する。
+
+    Returns:
+        追記したサンプル数
+    """
+    store = HistoryStore(history_dir)
+    profiles = load_scrape_profiles(profile_path) if profile_path else {}
+    session = new_session(
+        history_dir,
+        chart_timeout_ms=chart_timeout_ms,
+        network_policy=network_policy,
+        capture_mode=capture_mode,
+        replay_url=replay_url,
+        target_timeout_sec=target_timeout_sec,
+    )
+    warm: dict[str, tuple | None] = {}
+    deadline = time.monotonic() + duration_min * 60
+    total = 0
+    cycle = 0
+
+    async with async_playwright() as p:
+        browser, context = await launch_browser_context(p)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        try:
+            while True:
+                cycle += 1
+                started = time.monotonic()
+                ts = datetime.now(JST).replace(microsecond=0)
+                samples = await asyncio.gather(*(
+                    _sample_target_isolated(semaphore, context, t, session, warm, profiles) for t in targets
+                ), return_exceptions=True)
+
+                written = 0
+                for target, data in zip(targets, samples):
+                    if isinstance(data, BaseException) or not data:
+                        continue
+                    sample = {"ts": ts, "source": data.get("source", capture_mode), **data}
+                    written += store.append(Path(target["filename"]).stem, [sample])
+                total += written
+                print(f"  Cycle {cycle} ({ts.strftime('%H:%M')}): "
+                      f"{written}/{len(targets)} samples in {time.monotonic() - started:.1f}s")
+
+                next_at = started + interval_min * 60
+                if next_at >= deadline:
+                    break
+                await asyncio.sleep(max(next_at - time.monotonic(), 0))
+        finally:
+            await browser.close()
+
+    if profile_path:
+        save_scrape_profiles(profile_path, profiles)
+    return total
 
 
 def _generate_summary(market_data: dict) -> str:
@@ -474,7 +912,7 @@ def _static_tweet_text(date_str: str) -> str:
         f"\n"
         f"#サンデーダウ #投資 #株式投資 #マーケット"
     )
-    if len(tweet) > 280:
+    if weighted_length(tweet) > TWEET_LIMIT:
         tweet = (
             f"📊 サンデー指数（{date_str}）\n\n"
             f"🇺🇸 サンデーダウ\n"
@@ -485,123 +923,224 @@ def _static_tweet_text(date_str: str) -> str:
     return tweet
 
 
-def generate_tweet_text(market_data: dict | None = None) -> str:
-    """ツイート本文を生成する（280文字以内）
+def tweet_sections(
+    market_data: dict | None = None, targets: list[dict] | None = None
+) -> list[dict] | None:
+    """ハイブリッド形式（サマリー＋数値行）の本文のセクション（市場データがなければ None）
 
-    market_data がある場合はハイブリッド形式（サマリー＋数値行）、
-    なければ従来の静的テキストにフォールバックする。
+    数値行は targets のうち post が偽でないものだけを並べる。
+    見出し・数値行・ハッシュタグを必ず入れ、収まればハッシュタグを長い方に、
+    さらに収まればサマリーを足す。
     """
     now = datetime.now(JST)
     date_str = f"{now.month}/{now.day}"
+    post_targets = [t for t in (targets or TARGETS) if t.get("post", True)]
 
     has_data = market_data and any(
-        market_data.get(t["name"]) for t in TARGETS
+        market_data.get(t["name"]) for t in post_targets
     )
     if not has_data:
-        return _static_tweet_text(date_str)
+        return None
 
     summary = _generate_summary(market_data)
 
-    lines = [f"📊 サンデー指数 速報（{date_str}）", ""]
-    if summary:
-        lines.append(summary)
-        lines.append("")
-    for target in TARGETS:
-        lines.append(_format_data_line(target, market_data.get(target["name"])))
-    lines.extend(["", "#サンデーダウ #投資 #株式投資 #マーケット"])
-    tweet = "\n".join(lines)
-
-    if len(tweet) > 280:
-        lines_short = [f"📊 サンデー指数 速報（{date_str}）", ""]
-        for target in TARGETS:
-            lines_short.append(_format_data_line(target, market_data.get(target["name"])))
-        lines_short.extend(["", "#サンデーダウ #投資 #マーケット"])
-        tweet = "\n".join(lines_short)
-
-    if len(tweet) > 280:
-        return _static_tweet_text(date_str)
+    return [
+        section(f"📊 サンデー指数 速報（{date_str}）", required=True),
+        section(summary or [], priority=2),
+        section(
+            [_format_data_line(t, market_data.get(t["name"])) for t in post_targets],
+            required=True,
+        ),
+        section(
+            variants=["#サンデーダウ #投資 #株式投資 #マーケット", "#サンデーダウ #投資 #マーケット"],
+            required=True, priority=1,
+        ),
+    ]
 
-    return tweet
 
+def generate_tweet_text(
+    market_data: dict | None = None, targets: list[dict] | None = None
+) -> str:
+    """ツイート本文を生成する（X の重み付き文字数で280以内）
 
-def upload_media(
-    image_path: Path,
-    api_key: str,
-    api_secret: str,
-    access_token: str,
-    access_token_secret: str,
-) -> str | None:
-    """画像をアップロードして media_id を返す"""
-    try:
-        auth = tweepy.OAuth1UserHandler(
-            api_key, api_secret, access_token, access_token_secret
-        )
-        api = tweepy.API(auth)
-        media = api.media_upload(filename=str(image_path))
-        print(f"    Uploaded: {image_path.name} (media_id: {media.media_id})")
-        return str(media.media_id)
-    except tweepy.TweepyException as e:
-        print(f"    WARNING: Failed to upload {image_path.name}: {e}")
-        return None
+    market_data がある場合はハイブリッド形式（tweet_sections()）、
+    なければ、または収まらなければ従来の静的テキストにフォールバックする。
+    """
+    now = datetime.now(JST)
+    date_str = f"{now.month}/{now.day}"
+    sections = tweet_sections(market_data, targets)
+    if sections is None:
+        return _static_tweet_text(date_str)
+
+    tweet = compose(sections)
+    if weighted_length(tweet) > TWEET_LIMIT:
+        return _static_tweet_text(date_str)
+
+    return tweet
 
 
 def post_to_x(
-    tweet: str, screenshots: list[Path], dry_run: bool = False
+    tweet: str,
+    media: list[tuple[str, bytes]],
+    dry_run: bool = False,
+    report: RunReport | None = None,
+    upload_stats: dict | None = None,
+    reuse_ids: dict[str, str] | None = None,
 ) -> bool:
-    """X に画像付きで投稿する"""
+    """X に画像付きで投稿する（report があればアップロードと投稿をスパンとして記録する）
+
+    media は prepare_media() が返す (ファイル名, バイト列) のリスト。
+    reuse_ids（ファイル名 → media_id）にある画像はアップロードせずその id を使う。
+    それ以外の画像は x_client で同時にアップロードする（upload_ms は全体の経過時間）。
+    upload_stats を渡すと、アップロード回数・所要時間（ms）・ファイル名ごとの media_id を書き込む。
+    """
+
+    def span(name: str, target: str | None = None):
+        return report.span(name, target=target) if report else nullcontext()
+
     if dry_run:
         print("\n=== DRY RUN MODE ===")
-        print(f"Tweet ({len(tweet)} chars):\n{tweet}")
-        print(f"\nImages ({len(screenshots)}):")
-        for s in screenshots:
-            print(f"  - {s}")
+        print(f"Tweet ({weighted_length(tweet)} chars):\n{tweet}")
+        print(f"\nImages ({len(media)}):")
+        for name, data in media:
+            print(f"  - {name} ({len(data) / 1024:.0f} KB)")
         return True
 
-    api_key = os.environ.get("X_API_KEY")
-    api_secret = os.environ.get("X_API_SECRET")
-    access_token = os.environ.get("X_ACCESS_TOKEN")
-    access_token_secret = os.environ.get("X_ACCESS_TOKEN_SECRET")
-
-    if not all([api_key, api_secret, access_token, access_token_secret]):
-        print("ERROR: Missing X API credentials")
-        print("Required: X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET")
+    client = shared_client()
+    if client is None:
         return False
 
     try:
-        media_ids = []
-        for img in screenshots:
-            if img.exists():
-                mid = upload_media(
-                    img, api_key, api_secret, access_token, access_token_secret
-                )
-                if mid:
-                    media_ids.append(mid)
-
+        for name in (reuse_ids or {}):
+            print(f"    Reusing: {name} (media_id: {reuse_ids[name]})")
+        to_upload = [(name, data) for name, data in media if not (reuse_ids and name in reuse_ids)]
+
+        started = time.perf_counter()
+        results = client.upload_many(to_upload)
+        upload_ms = (time.perf_counter() - started) * 1000
+        uploaded: dict[str, str] = {}
+        for r in results:
+            if report:
+                report.add_span("media_upload", r["elapsed_ms"], target=r["name"], start=r["start"],
+                                status="ok" if r["media_id"] else "error")
+            if r["media_id"]:
+                uploaded[r["name"]] = r["media_id"]
+        if upload_stats is not None:
+            upload_stats.update({
+                "uploads": len(to_upload),
+                "upload_ms": round(upload_ms, 1),
+                "media_ids": uploaded,
+            })
+
+        # 添付順は media の順に揃える
+        media_ids = [(reuse_ids or {}).get(name) or uploaded.get(name) for name, _ in media]
+        media_ids = [mid for mid in media_ids if mid]
         if not media_ids:
             print("WARNING: No images uploaded successfully, posting text only")
 
-        client = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret,
-        )
-
-        kwargs = {"text": tweet}
-        if media_ids:
-            kwargs["media_ids"] = media_ids
-
-        response = client.create_tweet(**kwargs)
-        print(f"\nSuccessfully posted tweet: {response.data['id']}")
+        with span("create_tweet"):
+            tweet_id = client.create_tweet(tweet, media_ids)
+        print(f"\nSuccessfully posted tweet: {tweet_id}")
         return True
 
-    except tweepy.Forbidden:
-        print("WARNING: 403 Forbidden — likely a duplicate tweet")
+    except XError as e:
+        if e.status == 403:
+            print("WARNING: 403 Forbidden — likely a duplicate tweet")
+        else:
+            print(f"ERROR: Failed to post tweet: {e}")
         return False
 
-    except tweepy.TweepyException as e:
-        print(f"ERROR: Failed to post tweet: {e}")
-        return False
+
+def load_post_state(path: Path) -> dict:
+    """前回投稿時の状態を読み込む（なければ空）
+
+    {"posted_at", "targets": {名前: {"value", "change", "change_pct", "phash", "sha256"}},
+     "media": {ファイル名: {"sha256", "media_id", "uploaded_at"}}}
+    """
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"WARNING: Ignoring unreadable post state {path}: {e}")
+        return {}
+
+
+def save_post_state(path: Path, state: dict) -> None:
+    """投稿時の状態を保存する"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def snapshot_targets(post_targets: list[dict], market_data: dict, images: dict[str, bytes]) -> dict:
+    """投稿対象ターゲットの数値と画像のハッシュ（知覚ハッシュと SHA-256）をまとめる"""
+    snapshot = {}
+    for t in post_targets:
+        data = market_data.get(t["name"]) or {}
+        image = images.get(t["filename"])
+        snapshot[t["name"]] = {
+            "value": data.get("value"),
+            "change": data.get("change"),
+            "change_pct": data.get("change_pct"),
+            "phash": perceptual_hash(image) if image else None,
+            "sha256": hashlib.sha256(image).hexdigest() if image else None,
+        }
+    return snapshot
+
+
+def changed_targets(previous: dict, current: dict) -> list[str]:
+    """前回投稿時から数値または画像が変わったターゲット名を返す
+
+    数値がすべて同じで、画像の知覚ハッシュが PHASH_TOLERANCE 以内なら変化なしとみなす。
+    知覚ハッシュがない（Pillow がない・計算に失敗した）ときは SHA-256 の一致で比べ、
+    どちらのハッシュもないときだけ変化ありとする。
+    ターゲットの顔ぶれが違う場合はすべて変化ありとする。
+    """
+    if set(previous) != set(current):
+        return list(current)
+    changed = []
+    for name, cur in current.items():
+        prev = previous[name]
+        same_values = all(prev.get(k) == cur[k] for k in ("value", "change", "change_pct"))
+        distance = hash_distance(prev.get("phash"), cur["phash"])
+        if distance is not None:
+            same_image = distance <= PHASH_TOLERANCE
+        else:
+            same_image = cur.get("sha256") is not None and prev.get("sha256") == cur["sha256"]
+        if not (same_values and same_image):
+            changed.append(name)
+    return changed
+
+
+def reusable_media(state: dict, media: list[tuple[str, bytes]]) -> dict[str, str]:
+    """前回アップロードした画像とバイト列が同じものがあれば、その media_id を返す（ファイル名 → id）
+
+    知覚ハッシュが近いだけの画像は数値やラベルが違うことがあるので、SHA-256 の一致だけを見る。
+    """
+    reuse = {}
+    now = datetime.now(JST)
+    for name, data in media:
+        entry = state.get("media", {}).get(name)
+        if not entry or not entry.get("media_id"):
+            continue
+        age_h = (now - datetime.fromisoformat(entry["uploaded_at"])).total_seconds() / 3600
+        if age_h < MEDIA_REUSE_HOURS and entry.get("sha256") == hashlib.sha256(data).hexdigest():
+            reuse[name] = entry["media_id"]
+    return reuse
+
+
+def _write_run_report(report: RunReport, output_dir: Path, state_dir: Path) -> None:
+    """実行レポートを出力ディレクトリと状態ディレクトリ（run_report.py compare 用）に保存する"""
+    path = output_dir / "run_report.json"
+    report.write(path)
+    history_dir = state_dir / "reports"
+    report.write(history_dir / f"run_report-{report.started_at.strftime('%Y%m%dT%H%M%S')}.json")
+    for old in sorted(history_dir.glob("run_report-*.json"))[:-RUN_REPORT_HISTORY]:
+        old.unlink()
+    report.write_github(path)
+    print(f"\nRun report: {path}")
 
 
 def main():
@@ -609,6 +1148,12 @@ def main():
         description="Capture Sunday market indices and post to X"
     )
     parser.add_argument("--dry-run", action="store_true", help="Test without posting")
+    parser.add_argument(
+        "--platforms",
+        type=str,
+        default=",".join(PLATFORMS),
+        help=f"Comma-separated platforms; unconfigured ones are skipped (default: {','.join(PLATFORMS)})",
+    )
     parser.add_argument(
         "--capture-only", action="store_true", help="Capture screenshots only (no posting)"
     )
@@ -619,7 +1164,96 @@ def main():
         "--chart-timeout",
         type=int,
         default=8000,
-        help="Wait time in ms for chart rendering (default: 8000)",
+        help="Max wait in ms for chart rendering; returns early once the chart is ready (default: 8000)",
+    )
+    parser.add_argument(
+        "--targets",
+        type=str,
+        default=None,
+        help=f"Target registry JSON (default: {DEFAULT_TARGETS_FILE.name})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=3,
+        help="Max pages captured in parallel (default: 3)",
+    )
+    parser.add_argument(
+        "--target-timeout",
+        type=float,
+        default=90,
+        help="Per-target capture timeout in seconds (default: 90)",
+    )
+    parser.add_argument(
+        "--state-dir",
+        type=str,
+        default=None,
+        help="Directory for state kept between runs (default: tmp/sunday_state)",
+    )
+    parser.add_argument(
+        "--capture-mode",
+        choices=["screenshot", "network", "both"],
+        default="screenshot",
+        help="screenshot: DOM scrape + screenshot (default); network: values from chart "
+             "XHR/JSON responses and a self-rendered chart; both: network values, DOM fallback",
+    )
+    parser.add_argument(
+        "--record-responses",
+        type=str,
+        default=None,
+        help="Save every response to this directory (serve it with recorded_responses.py)",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        type=str,
+        default=None,
+        help="Record responses plus a static DOM snapshot and expectations.json per target "
+             "into this directory (input for sunday_bench.py)",
+    )
+    parser.add_argument(
+        "--replay-server",
+        type=str,
+        default=None,
+        help="Answer all page requests from a recorded_responses.py server at this base URL",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Keep the browser warm and append samples to the history store (no posting)",
+    )
+    parser.add_argument(
+        "--record-interval",
+        type=float,
+        default=5,
+        help="Minutes between samples in --record mode (default: 5)",
+    )
+    parser.add_argument(
+        "--record-duration",
+        type=float,
+        default=240,
+        help="Total minutes to record in --record mode (default: 240)",
+    )
+    parser.add_argument(
+        "--history-dir",
+        type=str,
+        default=None,
+        help="Parquet history store for --record (default: tmp/sunday_history)",
+    )
+    parser.add_argument(
+        "--image-layout",
+        choices=["collage", "separate"],
+        default="collage",
+        help="collage: one composed image per tweet (default); separate: one upload per chart",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Post even if values and charts are unchanged since the last successful post",
+    )
+    parser.add_argument(
+        "--no-block",
+        action="store_true",
+        help="Disable request filtering (load ads/fonts/trackers as a normal browser)",
     )
     args = parser.parse_args()
 
@@ -627,43 +1261,199 @@ def main():
         output_dir = Path(args.output_dir)
     else:
         output_dir = Path(__file__).parent.parent.parent / "tmp" / "sunday_markets"
+    if args.state_dir:
+        state_dir = Path(args.state_dir)
+    else:
+        state_dir = Path(__file__).parent.parent.parent / "tmp" / "sunday_state"
+
+    if not require_playwright():
+        sys.exit(1)
+
+    targets_file = Path(args.targets) if args.targets else None
+    targets = load_targets(targets_file)
+    network_policy = load_network_policy(targets_file, enabled=not args.no_block)
+    if not targets:
+        print("ERROR: No capture targets configured")
+        sys.exit(1)
 
     print("=" * 50)
     print("Sunday Markets Capture & Post")
     print("=" * 50)
     print(f"Time (JST): {datetime.now(JST).strftime('%Y-%m-%d %H:%M')}")
     print(f"Output dir:  {output_dir}")
-    print(f"Chart wait:  {args.chart_timeout}ms")
+    print(f"Chart wait:  up to {args.chart_timeout}ms (readiness-based)")
+    print(f"Targets:     {len(targets)} (concurrency {args.concurrency})")
+    print(f"Req filter:  {'on' if network_policy['enabled'] else 'off'}")
+    print(f"Capture:     {args.capture_mode}"
+          f"{' (replay: ' + args.replay_server + ')' if args.replay_server else ''}")
     print(f"Mode:        {'dry-run' if args.dry_run else 'capture-only' if args.capture_only else 'live'}")
 
-    screenshots, market_data = capture_charts(output_dir, chart_timeout_ms=args.chart_timeout)
-    print(f"\nCaptured {len(screenshots)}/{len(TARGETS)} charts")
+    if args.record:
+        if not require_pyarrow():
+            sys.exit(1)
+        if args.history_dir:
+            history_dir = Path(args.history_dir)
+        else:
+            history_dir = Path(__file__).parent.parent.parent / "tmp" / "sunday_history"
+        print(f"Recording:   every {args.record_interval:g} min for {args.record_duration:g} min "
+              f"-> {history_dir}")
+        total = asyncio.run(record_session_async(
+            targets,
+            history_dir,
+            interval_min=args.record_interval,
+            duration_min=args.record_duration,
+            chart_timeout_ms=args.chart_timeout,
+            network_policy=network_policy,
+            profile_path=state_dir / "scrape_profiles.json",
+            capture_mode=args.capture_mode,
+            replay_url=args.replay_server,
+            concurrency=args.concurrency,
+            target_timeout_sec=args.target_timeout,
+        ))
+        print(f"\nRecorded {total} samples to {history_dir}")
+        sys.exit(0 if total else 1)
+
+    record_dir = args.snapshot_dir or args.record_responses
+    record_dir = Path(record_dir) if record_dir else None
+
+    report = RunReport("sunday_markets")
+    report.meta.update({
+        "mode": "dry-run" if args.dry_run else "capture-only" if args.capture_only else "live",
+        "capture_mode": args.capture_mode,
+        "targets": len(targets),
+        "concurrency": args.concurrency,
+        "replay": bool(args.replay_server),
+    })
+
+    started = time.perf_counter()
+    screenshots, market_data, images = capture_charts(
+        output_dir,
+        chart_timeout_ms=args.chart_timeout,
+        targets=targets,
+        concurrency=args.concurrency,
+        target_timeout_sec=args.target_timeout,
+        network_policy=network_policy,
+        profile_path=state_dir / "scrape_profiles.json",
+        capture_mode=args.capture_mode,
+        record_dir=record_dir,
+        replay_url=args.replay_server,
+        snapshot=bool(args.snapshot_dir),
+        report=report,
+    )
+    report.meta.update({"captured": len(screenshots), "scraped": len(market_data)})
+    print(f"\nCaptured {len(screenshots)}/{len(targets)} charts "
+          f"in {time.perf_counter() - started:.1f}s")
 
     if market_data:
-        print(f"\nMarket data ({len(market_data)}/{len(TARGETS)}):")
+        print(f"\nMarket data ({len(market_data)}/{len(targets)}):")
         for name, d in market_data.items():
             print(f"  {name}: value={d.get('value')}, change={d.get('change')}, pct={d.get('change_pct')}")
     else:
         print("\nNo market data scraped (will use static text)")
 
-    if not screenshots:
+    if not screenshots and (args.capture_mode == "screenshot" or not market_data):
         print("ERROR: No charts were captured")
+        _write_run_report(report, output_dir, state_dir)
         sys.exit(1)
 
     if args.capture_only:
         print("\nCapture-only mode — skipping post")
+        _write_run_report(report, output_dir, state_dir)
+        sys.exit(0)
+
+    # X への通信を始める前に、前回投稿から変化があるかを判定する
+    state_path = state_dir / "last_post.json"
+    post_state = load_post_state(state_path)
+    post_targets = [t for t in targets if t.get("post", True)]
+    current = snapshot_targets(post_targets, market_data, images)
+    changed = changed_targets(post_state.get("targets", {}), current)
+    report.meta["changed_targets"] = changed
+    if post_state and not changed and not args.force:
+        print(f"\nNo change since the last post at {post_state.get('posted_at')} — skipping "
+              f"(use --force to post anyway)")
+        gh_output = os.environ.get("GITHUB_OUTPUT")
+        if gh_output:
+            with open(gh_output, "a") as f:
+                f.write("posted=false\n")
+                f.write("skipped=unchanged\n")
+        report.meta["posted"] = False
+        _write_run_report(report, output_dir, state_dir)
         sys.exit(0)
+    if post_state:
+        print(f"\nChanged since last post: {', '.join(changed) or '(none, forced)'}")
+
+    tweet = generate_tweet_text(market_data, targets)
+    print(f"\nTweet ({weighted_length(tweet)} chars):\n{tweet}\n")
 
-    tweet = generate_tweet_text(market_data)
-    print(f"\nTweet ({len(tweet)} chars):\n{tweet}\n")
+    post_files = {t["filename"] for t in post_targets}
+    post_images = [s for s in screenshots if s.name in post_files][:MAX_TWEET_IMAGES]
 
-    success = post_to_x(tweet, screenshots, dry_run=args.dry_run)
+    with report.span("prepare_media"):
+        media, media_stats = prepare_media(
+            [(s.name, images[s.name]) for s in post_images],
+            layout=args.image_layout,
+            collage_name=COLLAGE_FILENAME,
+        )
+    print(f"Media: {format_media_stats(media_stats)}")
+    for name, data in media:
+        if name not in images:
+            (output_dir / name).write_bytes(data)
+
+    # --force は前回と同じ内容でも投稿し直す指定なので、画像もアップロードし直す
+    reuse_ids = {} if args.force else reusable_media(post_state, media)
+    upload_stats: dict = {}
+
+    def x_post(text, media):
+        ok = post_to_x(
+            text, media, dry_run=args.dry_run, report=report,
+            upload_stats=upload_stats, reuse_ids=reuse_ids,
+        )
+        return ok, 200 if ok else 0, None
+
+    # X と設定済みの他の投稿先に同時に投稿する（成否と状態の保存は X の結果で決める）
+    publishers = build_publishers(args.platforms.split(","), x_post, dry_run=args.dry_run)
+    with report.span("publish"):
+        results = publish(
+            make_post(tweet, tweet_sections(market_data, targets), media), publishers, dry_run=args.dry_run,
+        )
+    success = primary_result(results)["ok"]
+    report.meta["platforms"] = {
+        name: {"ok": r["ok"], "latency_ms": r["latency_ms"]} for name, r in results.items()
+    }
+    if upload_stats.get("uploads"):
+        per_upload_ms = upload_stats["upload_ms"] / upload_stats["uploads"]
+        skipped = media_stats["source_images"] - upload_stats["uploads"]
+        media_stats["upload_ms"] = upload_stats["upload_ms"]
+        media_stats["upload_ms_saved_est"] = round(per_upload_ms * skipped, 1)
+        print(f"Uploads: {upload_stats['uploads']} in {upload_stats['upload_ms']:.0f}ms "
+              f"(~{media_stats['upload_ms_saved_est']:.0f}ms saved vs one upload per chart)")
+    report.meta["media"] = media_stats
+    report.meta["posted"] = success
+
+    if success and not args.dry_run:
+        now = datetime.now(JST).isoformat(timespec="seconds")
+        previous_media = post_state.get("media", {})
+        media_state = {}
+        for name, data in media:
+            if name in upload_stats.get("media_ids", {}):
+                media_state[name] = {
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "media_id": upload_stats["media_ids"][name],
+                    "uploaded_at": now,
+                }
+            elif name in reuse_ids:
+                media_state[name] = previous_media[name]
+        save_post_state(state_path, {"posted_at": now, "targets": current, "media": media_state})
+    _write_run_report(report, output_dir, state_dir)
 
     gh_output = os.environ.get("GITHUB_OUTPUT")
     if gh_output:
         with open(gh_output, "a") as f:
             f.write(f"posted={'true' if success else 'false'}\n")
-            f.write(f"image_count={len(screenshots)}\n")
+            f.write(f"image_count={len(post_images)}\n")
+            f.write(f"upload_count={len(media)}\n")
+            f.write(f"upload_bytes_saved={media_stats['source_bytes'] - media_stats['upload_bytes']}\n")
+            f.write(f"platforms={format_results(results)}\n")
 
     if success:
         print("\nDone!")
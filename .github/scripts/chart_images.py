@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+チャート画像のメモリ上での加工（コラージュ合成・減色圧縮・知覚ハッシュ）
+
+capture_sunday_markets.py がスクリーンショットのバイト列をそのまま受け取り、
+複数チャートを1枚のコラージュにまとめてから圧縮し、X へのアップロードを1回に減らす。
+知覚ハッシュは前回投稿からの変化検出に使う。Pillow がなければ元の画像をそのまま使う。
+
+使用方法（保存済みの PNG で効果を確認）:
+    python chart_images.py tmp/sunday_markets/sunday_*.png
+    python chart_images.py tmp/sunday_markets/sunday_*.png --layout separate
+"""
+
+import io
+import os
+import math
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+COLLAGE_GAP = 8
+# X / Bluesky はプレビューを 16:9 前後に切り抜くので、コラージュはこの比に近く 2:1 以下の並べ方にする
+COLLAGE_ASPECT = 16 / 9
+COLLAGE_MAX_ASPECT = 2.0
+COLLAGE_BACKGROUND = "white"
+QUANTIZE_COLORS = 256
+PHASH_SIZE = 8
+
+
+def collage_grid(count: int, cell_w: int, cell_h: int, gap: int = COLLAGE_GAP) -> tuple[int, int]:
+    """count 枚を並べる (列数, 行数) を選ぶ
+
+    縦横比が COLLAGE_MAX_ASPECT 以下の並べ方のうち COLLAGE_ASPECT に最も近いもの
+    （3枚のチャートなら横一列の 4.3:1 ではなく 2 列 x 2 行）。
+    """
+    def aspect(columns: int) -> float:
+        rows = -(-count // columns)
+        return (columns * cell_w + (columns - 1) * gap) / (rows * cell_h + (rows - 1) * gap)
+
+    fits = [c for c in range(1, count + 1) if aspect(c) <= COLLAGE_MAX_ASPECT] or [1]
+    columns = min(fits, key=lambda c: abs(math.log(aspect(c) / COLLAGE_ASPECT)))
+    return columns, -(-count // columns)
+
+
+def compose_collage(images: list[bytes], gap: int = COLLAGE_GAP) -> bytes | None:
+    """画像を格子状に並べた PNG を返す（Pillow がなければ None）
+
+    並べ方は collage_grid で決め、最後の行が埋まらないときはその行を中央に寄せる。
+    """
+    if Image is None or not images:
+        return None
+    tiles = [Image.open(io.BytesIO(data)).convert("RGB") for data in images]
+    cell_w = max(t.width for t in tiles)
+    cell_h = max(t.height for t in tiles)
+    columns, rows = collage_grid(len(tiles), cell_w, cell_h, gap)
+    width = columns * cell_w + (columns - 1) * gap
+    canvas = Image.new("RGB", (width, rows * cell_h + (rows - 1) * gap), COLLAGE_BACKGROUND)
+    for i, tile in enumerate(tiles):
+        row, col = divmod(i, columns)
+        in_row = min(columns, len(tiles) - row * columns)
+        offset = (width - (in_row * cell_w + (in_row - 1) * gap)) // 2
+        canvas.paste(tile, (offset + col * (cell_w + gap), row * (cell_h + gap)))
+    buf = io.BytesIO()
+    canvas.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def compress_png(data: bytes, colors: int = QUANTIZE_COLORS) -> bytes:
+    """パレット減色 + optimize で PNG を圧縮する（小さくならなければ元のまま）"""
+    if Image is None:
+        return data
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    buf = io.BytesIO()
+    img.quantize(colors=colors, method=Image.Quantize.MEDIANCUT).save(
+        buf, format="PNG", optimize=True
+    )
+    compressed = buf.getvalue()
+    return compressed if len(compressed) < len(data) else data
+
+
+def compress_all(images: list[bytes], workers: int | None = None) -> list[bytes]:
+    """複数の画像をプロセスプールで並列に圧縮する（順序は入力と同じ）"""
+    if Image is None or not images:
+        return list(images)
+    if len(images) == 1:
+        return [compress_png(images[0])]
+    workers = min(len(images), workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(compress_png, images))
+
+
+def perceptual_hash(data: bytes) -> str | None:
+    """差分ハッシュ（dHash, 64bit）を16進文字列で返す（Pillow がなければ None）
+
+    縮小したグレースケール画像の隣接画素の明暗だけを見るため、
+    再キャプチャによる微小な描画差やエンコード差では値がほとんど変わらない。
+    """
+    if Image is None:
+        return None
+    img = Image.open(io.BytesIO(data)).convert("L").resize(
+        (PHASH_SIZE + 1, PHASH_SIZE), Image.Resampling.LANCZOS
+    )
+    px = list(img.getdata())
+    bits = 0
+    for row in range(PHASH_SIZE):
+        for col in range(PHASH_SIZE):
+            i = row * (PHASH_SIZE + 1) + col
+            bits = (bits << 1) | (px[i] > px[i + 1])
+    return f"{bits:0{PHASH_SIZE * PHASH_SIZE // 4}x}"
+
+
+def hash_distance(a: str | None, b: str | None) -> int | None:
+    """2つの perceptual_hash のハミング距離（どちらかが None なら None）"""
+    if a is None or b is None:
+        return None
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def prepare_media(
+    images: list[tuple[str, bytes]],
+    layout: str = "collage",
+    collage_name: str = "collage.png",
+    workers: int | None = None,
+) -> tuple[list[tuple[str, bytes]], dict]:
+    """アップロードする画像を用意する
+
+    layout が collage なら1枚に合成してから圧縮し、separate なら各画像を並列に圧縮する。
+    Pillow がない場合は元の画像をそのまま返す。
+
+    Returns:
+        ([(ファイル名, バイト列)], {"layout", "source_images", "uploads",
+                                   "source_bytes", "upload_bytes", "prepare_ms"})
+    """
+    started = time.perf_counter()
+    source_bytes = sum(len(data) for _, data in images)
+    if Image is None:
+        print("WARNING: Pillow not installed, uploading images as captured")
+        layout = "separate"
+        media = list(images)
+    elif layout == "collage" and len(images) > 1:
+        media = [(collage_name, compress_png(compose_collage([d for _, d in images])))]
+    else:
+        layout = "separate"
+        compressed = compress_all([d for _, d in images], workers)
+        media = [(name, data) for (name, _), data in zip(images, compressed)]
+    return media, {
+        "layout": layout,
+        "source_images": len(images),
+        "uploads": len(media),
+        "source_bytes": source_bytes,
+        "upload_bytes": sum(len(data) for _, data in media),
+        "prepare_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def format_media_stats(stats: dict) -> str:
+    """prepare_media の集計を1行で表す"""
+    src, dst = stats["source_bytes"], stats["upload_bytes"]
+    saved_pct = (1 - dst / src) * 100 if src else 0
+    return (
+        f"{stats['uploads']} upload(s) for {stats['source_images']} image(s) ({stats['layout']}), "
+        f"{src / 1024:.0f} KB -> {dst / 1024:.0f} KB ({saved_pct:.0f}% smaller), "
+        f"prepared in {stats['prepare_ms']:.0f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compose and compress chart images")
+    parser.add_argument("images", nargs="+", type=str, help="PNG files")
+    parser.add_argument("--layout", choices=["collage", "separate"], default="collage")
+    parser.add_argument("--output-dir", type=str, default=None, help="Write the results here")
+    args = parser.parse_args()
+
+    if Image is None:
+        print("ERROR: Pillow is not installed. Run: pip install pillow")
+        sys.exit(1)
+
+    images = [(Path(p).name, Path(p).read_bytes()) for p in args.images]
+    media, stats = prepare_media(images, args.layout)
+    print(format_media_stats(stats))
+    if args.output_dir:
+        out = Path(args.output_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        for name, data in media:
+            (out / name).write_bytes(data)
+            print(f"  Wrote {out / name} ({len(data) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
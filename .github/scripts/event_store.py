@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+経済指標イベントのストア（日付順に並べた1つの Parquet ファイル）
+
+post_weekly_calendar.py が JSON / ローカル parquet / Monex の各ソースから読んだ
+イベントを1か所にまとめる。ソースごとに取り込み、同じイベントは正規化した
+(日付, 時刻, サマリー) のキーで1行にまとめる。どのソースから来たかは source 列に残す。
+
+ファイルは date 列の順に小さめの row group で書くので、週の問い合わせは
+row group の統計（min / max）で対象外のブロックを読み飛ばして該当行だけを読む。
+
+    列:         date, datetime, time, summary, importance, source, key
+    優先順位:   json > local > monex（同じキーなら優先度の高いソースの行を残す）
+    メタデータ: ソースごとの {"digest", "window", "events", "merged_at", ...}
+
+使用方法:
+    python event_store.py tmp/calendar_cache/event_store.parquet
+    python event_store.py tmp/calendar_cache/event_store.parquet --week 2026-10-19
+"""
+
+import os
+import sys
+import json
+import argparse
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from importance_classifier import normalize_text
+
+JST = ZoneInfo("Asia/Tokyo")
+
+# 同じキーのイベントが複数のソースにある場合の優先順位（小さいほど優先）
+SOURCE_PRIORITY = {"json": 0, "local": 1, "monex": 2}
+
+# 週の問い合わせで読み飛ばせる単位（1 row group ≒ 数日分）
+ROW_GROUP_SIZE = 256
+
+METADATA_KEY = b"event_store"
+
+
+def _schema():
+    """保存する列の定義"""
+    return pa.schema([
+        ("date", pa.date32()),
+        ("datetime", pa.timestamp("ms", tz="Asia/Tokyo")),
+        ("time", pa.string()),
+        ("summary", pa.string()),
+        ("importance", pa.string()),
+        ("source", pa.string()),
+        ("key", pa.string()),
+    ])
+
+
+def event_key(event: dict) -> str:
+    """重複判定のキー（日付・時刻・NFKC 正規化したサマリー）"""
+    return f"{event['date']:%Y-%m-%d}|{event['time']}|{normalize_text(event['summary'])}"
+
+
+def _row_to_event(row: dict) -> dict:
+    return {
+        "date": row["date"],
+        "datetime": row["datetime"].astimezone(JST),
+        "time": row["time"],
+        "summary": row["summary"],
+        "importance": row["importance"],
+        "source": row["source"],
+    }
+
+
+class EventStore:
+    """ソースごとに取り込み、キーで重複を除くイベントストア"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._rows: list[dict] | None = None
+        self._dates: list[date] = []
+        self._sources: dict[str, dict] | None = None
+
+    def _read_sources(self) -> dict[str, dict]:
+        if self._sources is None:
+            self._sources = {}
+            if self.path.exists():
+                metadata = pq.read_schema(self.path).metadata or {}
+                if METADATA_KEY in metadata:
+                    self._sources = json.loads(metadata[METADATA_KEY])
+        return self._sources
+
+    def _load_rows(self) -> list[dict]:
+        """全行を読み込む（取り込み時のみ。問い合わせだけならファイルから直接読む）"""
+        if self._rows is None:
+            self._rows = []
+            if self.path.exists():
+                self._rows = [_row_to_event(r) | {"key": r["key"]}
+                              for r in pq.read_table(self.path).to_pylist()]
+            self._dates = [r["date"] for r in self._rows]
+        return self._rows
+
+    def source_info(self, source: str) -> dict | None:
+        """前回そのソースを取り込んだときの情報"""
+        return self._read_sources().get(source)
+
+    def merge(
+        self,
+        events: list[dict],
+        source: str,
+        window: tuple[date, date] | None = None,
+        digest: str | None = None,
+        extra: dict | None = None,
+    ) -> dict:
+        """ソースのイベントを取り込んでファイルを書き直す
+
+        そのソースの既存の行のうち window（None なら全期間）に入るものを今回の内容で
+        置き換える。他のソースと同じキーの行は優先度の高い方だけを残す。
+
+        Returns:
+            {"added", "removed", "shadowed", "total"}
+        """
+        rows = self._load_rows()
+        rank = SOURCE_PRIORITY.get(source, len(SOURCE_PRIORITY))
+
+        def in_window(row):
+            return window is None or window[0] <= row["date"] <= window[1]
+
+        kept = [r for r in rows if not (r["source"] == source and in_window(r))]
+        removed = len(rows) - len(kept)
+        by_key = {r["key"]: r for r in kept}
+
+        added = shadowed = 0
+        for event in events:
+            if window and not (window[0] <= event["date"] <= window[1]):
+                continue
+            key = event_key(event)
+            current = by_key.get(key)
+            if current and SOURCE_PRIORITY.get(current["source"], len(SOURCE_PRIORITY)) <= rank:
+                shadowed += 1
+                continue
+            by_key[key] = {
+                "date": event["date"],
+                "datetime": event["datetime"].astimezone(JST),
+                "time": event["time"],
+                "summary": event["summary"],
+                "importance": event["importance"],
+                "source": source,
+                "key": key,
+            }
+            added += 1
+
+        self._rows = sorted(by_key.values(), key=lambda r: (r["datetime"], r["key"]))
+        self._dates = [r["date"] for r in self._rows]
+
+        sources = self._read_sources()
+        sources[source] = {
+            "digest": digest,
+            "window": [d.isoformat() for d in window] if window else None,
+            "events": sum(1 for r in self._rows if r["source"] == source),
+            "merged_at": datetime.now(JST).isoformat(timespec="seconds"),
+            **(extra or {}),
+        }
+        self._write()
+        return {"added": added, "removed": removed, "shadowed": shadowed, "total": len(self._rows)}
+
+    def _write(self) -> None:
+        table = pa.Table.from_pylist(self._rows, schema=_schema())
+        table = table.replace_schema_metadata({
+            METADATA_KEY: json.dumps(self._sources, ensure_ascii=False).encode("utf-8"),
+        })
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp, self.path)
+
+    def query(self, start: date, end: date, source: str | None = None) -> list[dict]:
+        """期間 [start, end] のイベントを日時順に返す（source を指定するとそのソースの行だけ）"""
+        if self._rows is not None:
+            lo, hi = bisect_left(self._dates, start), bisect_right(self._dates, end)
+            return [
+                {k: v for k, v in r.items() if k != "key"}
+                for r in self._rows[lo:hi]
+                if source is None or r["source"] == source
+            ]
+        if not self.path.exists():
+            return []
+        filters = [("date", ">=", start), ("date", "<=", end)]
+        if source is not None:
+            filters.append(("source", "==", source))
+        table = pq.read_table(
+            self.path,
+            columns=["date", "datetime", "time", "summary", "importance", "source"],
+            filters=filters,
+        )
+        return [_row_to_event(r) for r in table.to_pylist()]
+
+
+def open_event_store(path: str) -> EventStore | None:
+    """pyarrow があればストアを開く（なければ None を返し、呼び出し側はストアなしで動く）"""
+    if pa is None:
+        print("WARNING: pyarrow not installed, event store disabled")
+        return None
+    return EventStore(Path(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the economic event store")
+    parser.add_argument("path", type=str, help="Event store file")
+    parser.add_argument("--week", type=str, default=None, help="Show the week starting at YYYY-MM-DD")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("ERROR: pyarrow is not installed. Run: pip install pyarrow")
+        sys.exit(1)
+    if not os.path.exists(args.path):
+        print(f"No event store at {args.path}")
+        sys.exit(0)
+
+    store = EventStore(Path(args.path))
+    meta = pq.ParquetFile(args.path).metadata
+    print(f"{args.path}: {meta.num_rows} events in {meta.num_row_groups} row groups")
+    for source, info in sorted(store._read_sources().items()):
+        window = "..".join(info["window"]) if info.get("window") else "all"
+        print(f"  {source:<6} {info['events']:>6} events  window {window}  "
+              f"merged {info['merged_at']}  digest {(info.get('digest') or '-')[:12]}")
+
+    if args.week:
+        start = datetime.strptime(args.week, "%Y-%m-%d").date()
+        for e in store.query(start, start + timedelta(days=6)):
+            print(f"  {e['datetime']:%m/%d %H:%M} [{e['importance']:<6}] {e['summary']}  ({e['source']})")
+
+
+if __name__ == "__main__":
+    main()
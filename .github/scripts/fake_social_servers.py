@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Bluesky / Mastodon API のローカルなスタンドインサーバー
+
+publishers.py が使うエンドポイントだけを実装する。BLUESKY_SERVICE / MASTODON_BASE_URL を
+このサーバーに向ければ、実際のアカウントに投稿せずに同時投稿を確かめられる。
+
+    Bluesky:  POST /xrpc/com.atproto.server.createSession
+              POST /xrpc/com.atproto.repo.uploadBlob      （1MB を超えると 400）
+              POST /xrpc/com.atproto.repo.createRecord    （300 書記素を超えると 400）
+    Mastodon: POST /api/v2/media
+              POST /api/v1/statuses  （文字数の上限を超えると 422。同じ Idempotency-Key は同じ投稿を返す）
+    共通:     GET  /stats
+
+使用方法:
+    python fake_social_servers.py --bluesky-port 8767 --mastodon-port 8768 --latency-ms 100
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tweet_composer import BLUESKY_LIMIT, MASTODON_LIMIT, grapheme_length, mastodon_length
+from fake_x_server import parse_form
+
+BLUESKY_MAX_BLOB_BYTES = 1_000_000
+ACCESS_JWT = "fake-access-jwt"
+
+
+class SocialState:
+    """両サーバーで共有する設定と、受け取った投稿・カウンタ"""
+
+    def __init__(self, latency_ms: float = 0, mastodon_limit: int = MASTODON_LIMIT):
+        self.latency_ms = latency_ms
+        self.mastodon_limit = mastodon_limit
+        self.lock = threading.Lock()
+        self.next_id = 100_000
+        self.posts: dict[str, list[dict]] = {"bluesky": [], "mastodon": []}
+        self.idempotency: dict[str, dict] = {}
+        self.stats = {"requests": 0, "blobs": 0, "media": 0, "posts": 0, "rejected": 0}
+
+    def new_id(self) -> str:
+        with self.lock:
+            self.next_id += 1
+            return str(self.next_id)
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: SocialState
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _handle(self):
+        self.state.count("requests")
+        body = self._body() if self.command == "POST" else b""
+        if self.path == "/stats":
+            with self.state.lock:
+                self._send(200, dict(self.state.stats))
+            return
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+        status, payload = self.route(body)
+        if status >= 400:
+            self.state.count("rejected")
+        self._send(status, payload)
+
+    def route(self, body: bytes) -> tuple[int, dict]:
+        raise NotImplementedError
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BlueskyHandler(_JSONHandler):
+    def route(self, body: bytes) -> tuple[int, dict]:
+        nsid = self.path.removeprefix("/xrpc/")
+        if nsid == "com.atproto.server.createSession":
+            creds = json.loads(body)
+            if not (creds.get("identifier") and creds.get("password")):
+                return 401, {"error": "AuthenticationRequired"}
+            return 200, {"did": f"did:plc:{creds['identifier'].split('.')[0]}",
+                         "handle": creds["identifier"], "accessJwt": ACCESS_JWT, "refreshJwt": "r"}
+        if self.headers.get("Authorization") != f"Bearer {ACCESS_JWT}":
+            return 401, {"error": "AuthenticationRequired"}
+
+        if nsid == "com.atproto.repo.uploadBlob":
+            if len(body) > BLUESKY_MAX_BLOB_BYTES:
+                return 400, {"error": "BlobTooLarge"}
+            self.state.count("blobs")
+            return 200, {"blob": {"$type": "blob", "ref": {"$link": f"bafk{self.state.new_id()}"},
+                                  "mimeType": self.headers.get("Content-Type"), "size": len(body)}}
+        if nsid == "com.atproto.repo.createRecord":
+            request = json.loads(body)
+            record = request.get("record", {})
+            if grapheme_length(record.get("text", "")) > BLUESKY_LIMIT:
+                return 400, {"error": "InvalidRecord", "message": "text too long"}
+            text_bytes = len(record.get("text", "").encode("utf-8"))
+            for facet in record.get("facets", []):
+                if not 0 <= facet["index"]["byteStart"] < facet["index"]["byteEnd"] <= text_bytes:
+                    return 400, {"error": "InvalidRecord", "message": "facet out of range"}
+            rkey = self.state.new_id()
+            with self.state.lock:
+                self.state.posts["bluesky"].append(record)
+            self.state.count("posts")
+            return 200, {"uri": f"at://{request['repo']}/app.bsky.feed.post/{rkey}", "cid": f"bafy{rkey}"}
+        return 404, {"error": "MethodNotImplemented"}
+
+
+class MastodonHandler(_JSONHandler):
+    def route(self, body: bytes) -> tuple[int, dict]:
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            return 401, {"error": "The access token is invalid"}
+        if self.path == "/api/v2/media":
+            form = parse_form(self.headers.get("Content-Type", ""), body)
+            if not isinstance(form.get("file"), bytes):
+                return 422, {"error": "file is required"}
+            self.state.count("media")
+            media_id = self.state.new_id()
+            return 200, {"id": media_id, "type": "image", "url": f"https://files.example/{media_id}.png"}
+        if self.path == "/api/v1/statuses":
+            request = json.loads(body)
+            key = self.headers.get("Idempotency-Key")
+            with self.state.lock:
+                if key and key in self.state.idempotency:
+                    return 200, self.state.idempotency[key]
+            if mastodon_length(request.get("status", "")) > self.state.mastodon_limit:
+                return 422, {"error": "Validation failed: Text character limit exceeded"}
+            status_id = self.state.new_id()
+            status = {"id": status_id, "url": f"https://mastodon.example/@bench/{status_id}",
+                      "content": request["status"], "media_attachments": request.get("media_ids", [])}
+            with self.state.lock:
+                self.state.posts["mastodon"].append(request)
+                if key:
+                    self.state.idempotency[key] = status
+            self.state.count("posts")
+            return 200, status
+        return 404, {"error": "Record not found"}
+
+
+def _start(handler: type, state: SocialState, port: int) -> tuple[ThreadingHTTPServer, str]:
+    bound = type(handler.__name__, (handler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), bound)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_bluesky(state: SocialState, port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Bluesky のスタンドインをバックグラウンドで起動し、(server, base_url) を返す"""
+    return _start(BlueskyHandler, state, port)
+
+
+def start_mastodon(state: SocialState, port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """Mastodon のスタンドインをバックグラウンドで起動し、(server, base_url) を返す"""
+    return _start(MastodonHandler, state, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for Bluesky and Mastodon")
+    parser.add_argument("--bluesky-port", type=int, default=8767)
+    parser.add_argument("--mastodon-port", type=int, default=8768)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay per request")
+    args = parser.parse_args()
+
+    state = SocialState(args.latency_ms)
+    _, bsky = start_bluesky(state, args.bluesky_port)
+    _, masto = start_mastodon(state, args.mastodon_port)
+    print(f"Bluesky stand-in at {bsky}  (BLUESKY_SERVICE={bsky})")
+    print(f"Mastodon stand-in at {masto}  (MASTODON_BASE_URL={masto})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"stats: {state.stats}")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
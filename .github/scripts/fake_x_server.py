@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+X API のローカルなスタンドインサーバー（負荷試験とリトライの確認用）
+
+x_client.py が使うエンドポイントだけを実装する。X_API_BASE / X_UPLOAD_BASE を
+このサーバーに向ければ、投稿スクリプトを実際の X に接続せずに動かせる。
+
+    POST /1.1/media/upload.json   単純アップロード（multipart の media）と
+                                  command=INIT / APPEND / FINALIZE、GET の command=STATUS
+    POST /2/tweets                {"text", "media": {"media_ids"}}。同じ本文は 403（重複）
+    GET  /stats                   受けたリクエスト・接続・429・503 の数
+
+OAuth 署名の中身は検証せず、Authorization: OAuth ... があるかだけを見る。
+負荷の条件は引数で指定する:
+    --latency-ms        1リクエストごとの処理時間
+    --connect-ms        新しい接続ごとの確立コスト（TLS ハンドシェイクの代わり）
+    --rate-limit / --window   エンドポイントごとのウィンドウ内の上限（超えると 429 と x-rate-limit-reset）
+    --fail-rate         アップロードに 503 を返す確率
+
+使用方法:
+    python fake_x_server.py --port 8766 --latency-ms 40 --rate-limit 10 --window 5
+    X_API_BASE=http://127.0.0.1:8766 X_UPLOAD_BASE=http://127.0.0.1:8766 \\
+        X_API_KEY=k X_API_SECRET=s X_ACCESS_TOKEN=t X_ACCESS_TOKEN_SECRET=ts \\
+        python post_to_x.py --type tidytuesday --ledger tmp/fake_ledger.jsonl
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+UPLOAD_PATH = "/1.1/media/upload.json"
+TWEETS_PATH = "/2/tweets"
+
+
+class FakeXState:
+    """サーバーの設定と、受け取った画像・ツイート・カウンタ"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        connect_ms: float = 0,
+        rate_limit: int = 0,
+        window: float = 900,
+        fail_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        self.latency_ms = latency_ms
+        self.connect_ms = connect_ms
+        self.rate_limit = rate_limit
+        self.window = window
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.next_id = 1_000_000_000_000_000_000
+        self.media: dict[str, dict] = {}
+        self.tweets: dict[str, dict] = {}
+        self.texts: set[str] = set()
+        self.windows: dict[str, tuple[float, int]] = {}
+        self.stats = {"connections": 0, "requests": 0, "uploads": 0, "chunks": 0,
+                      "tweets": 0, "rate_limited": 0, "failed": 0, "duplicates": 0}
+
+    def new_id(self) -> str:
+        with self.lock:
+            self.next_id += 1
+            return str(self.next_id)
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def take(self, endpoint: str) -> tuple[bool, int, int]:
+        """レート制限の枠を1つ使う。(許可, 残り, リセット時刻の epoch 秒) を返す"""
+        now = time.time()
+        start = now - now % self.window
+        reset = math.ceil(start + self.window)
+        if not self.rate_limit:
+            return True, 0, reset
+        with self.lock:
+            window_start, used = self.windows.get(endpoint, (start, 0))
+            if window_start != start:
+                used = 0
+            if used >= self.rate_limit:
+                self.stats["rate_limited"] += 1
+                return False, 0, reset
+            self.windows[endpoint] = (start, used + 1)
+            return True, self.rate_limit - used - 1, reset
+
+
+def parse_form(content_type: str, body: bytes) -> dict:
+    """multipart/form-data と urlencoded のフォームを {name: bytes | str} にする"""
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+        )
+        form = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            form[name] = payload if part.get_filename() else payload.decode("utf-8")
+        return form
+    return {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+
+
+def _make_handler(state: FakeXState):
+    """状態を共有するリクエストハンドラを作る"""
+
+    class FakeXHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            state.count("connections")
+            if state.connect_ms:
+                time.sleep(state.connect_ms / 1000)
+
+        def _send(self, status: int, payload: dict | None = None, headers: dict | None = None):
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, str(v))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _handle(self):
+            state.count("requests")
+            body = self._body() if self.command == "POST" else b""
+            parts = urlsplit(self.path)
+            if parts.path == "/stats":
+                with state.lock:
+                    self._send(200, dict(state.stats))
+                return
+            if not (self.headers.get("Authorization") or "").startswith("OAuth "):
+                self._send(401, {"title": "Unauthorized"})
+                return
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+
+            endpoint = {UPLOAD_PATH: "upload", TWEETS_PATH: "tweets"}.get(parts.path)
+            if endpoint is None:
+                self._send(404, {"title": "Not Found"})
+                return
+            allowed, remaining, reset = state.take(endpoint)
+            limit_headers = {
+                "x-rate-limit-limit": state.rate_limit or 0,
+                "x-rate-limit-remaining": remaining,
+                "x-rate-limit-reset": reset,
+            }
+            if not allowed:
+                self._send(429, {"title": "Too Many Requests"}, limit_headers)
+                return
+
+            if endpoint == "upload":
+                with state.lock:
+                    fail = state.fail_rate and state.rng.random() < state.fail_rate
+                if fail:
+                    state.count("failed")
+                    self._send(503, {"title": "Service Unavailable"}, limit_headers)
+                    return
+                status, payload = self._upload(parts.query, body)
+            else:
+                status, payload = self._tweet(body)
+            self._send(status, payload, limit_headers)
+
+        def _upload(self, query: str, body: bytes) -> tuple[int, dict | None]:
+            if self.command == "GET":
+                params = {k: v[0] for k, v in parse_qs(query).items()}
+                media = state.media.get(params.get("media_id", ""))
+                if params.get("command") != "STATUS" or media is None:
+                    return 400, {"error": "bad STATUS request"}
+                return 200, {"media_id_string": params["media_id"],
+                             "processing_info": {"state": "succeeded", "progress_percent": 100}}
+
+            form = parse_form(self.headers.get("Content-Type", ""), body)
+            command = form.get("command")
+            if command is None:
+                data = form.get("media")
+                if not isinstance(data, bytes):
+                    return 400, {"error": "media is required"}
+                media_id = state.new_id()
+                with state.lock:
+                    state.media[media_id] = {"size": len(data), "received": len(data), "finalized": True}
+                state.count("uploads")
+                return 200, {"media_id": int(media_id), "media_id_string": media_id, "size": len(data)}
+
+            if command == "INIT":
+                media_id = state.new_id()
+                with state.lock:
+                    state.media[media_id] = {"size": int(form["total_bytes"]), "received": 0,
+                                             "finalized": False}
+                return 202, {"media_id": int(media_id), "media_id_string": media_id,
+                             "expires_after_secs": 86400}
+            media = state.media.get(form.get("media_id", ""))
+            if media is None:
+                return 400, {"error": "unknown media_id"}
+            if command == "APPEND":
+                with state.lock:
+                    media["received"] += len(form.get("media") or b"")
+                state.count("chunks")
+                return 204, None
+            if command == "FINALIZE":
+                if media["received"] != media["size"]:
+                    return 400, {"error": f"received {media['received']} of {media['size']} bytes"}
+                media["finalized"] = True
+                state.count("uploads")
+                return 201, {"media_id": int(form["media_id"]), "media_id_string": form["media_id"],
+                             "size": media["size"]}
+            return 400, {"error": f"unknown command {command}"}
+
+        def _tweet(self, body: bytes) -> tuple[int, dict]:
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                return 400, {"title": "Invalid Request"}
+            text = payload.get("text", "")
+            media_ids = (payload.get("media") or {}).get("media_ids", [])
+            for media_id in media_ids:
+                media = state.media.get(media_id)
+                if media is None or not media["finalized"]:
+                    return 400, {"title": "Invalid Request", "detail": f"media {media_id} is not ready"}
+            with state.lock:
+                if text in state.texts:
+                    state.stats["duplicates"] += 1
+                    return 403, {"detail": "You are not allowed to create a Tweet with duplicate content."}
+                state.texts.add(text)
+            tweet_id = state.new_id()
+            state.tweets[tweet_id] = {"text": text, "media_ids": media_ids}
+            state.count("tweets")
+            return 201, {"data": {"id": tweet_id, "text": text}}
+
+        do_GET = _handle
+        do_POST = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeXHandler
+
+
+def start_server(state: FakeXState, port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """サーバーをバックグラウンドスレッドで起動し、(server, base_url) を返す"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the X API")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay per request")
+    parser.add_argument("--connect-ms", type=float, default=0, help="Delay per new connection")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per window per endpoint (0: off)")
+    parser.add_argument("--window", type=float, default=900, help="Rate limit window in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of uploads answered with 503")
+    args = parser.parse_args()
+
+    state = FakeXState(args.latency_ms, args.connect_ms, args.rate_limit, args.window, args.fail_rate)
+    server, base_url = start_server(state, args.port)
+    print(f"Fake X API at {base_url}")
+    print(f"Use: X_API_BASE={base_url} X_UPLOAD_BASE={base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"stats: {state.stats}")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
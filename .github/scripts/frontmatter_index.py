@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+記事（index.qmd）の YAML frontmatter のインデックス
+
+post_to_x.py が記事を走査するときに使う。frontmatter は閉じの `---` までしか読まず、
+本文（数百行のコードやテキスト）は読まない。パースした結果はパス・mtime・サイズ・
+frontmatter の SHA-1 と一緒に JSON のサイドカーに保存し、次回は変わったファイルだけ読み直す。
+actions/checkout 直後のように mtime だけが変わった場合は、frontmatter を読んで SHA-1 が
+同じならパースし直さずに前回の結果を使う。
+
+サイドカーの形式:
+    {"version": 2, "entries": {"<相対パス>": {"mtime_ns": ..., "size": ..., "sha1": ..., "fm": {...}}}}
+
+使用方法（インデックスの更新と確認）:
+    python frontmatter_index.py scripts/by_timeSeries/quarto/posts tmp/frontmatter_index.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from fnmatch import fnmatch
+from pathlib import Path
+
+INDEX_VERSION = 2
+
+FRONTMATTER_KEYS = ("title", "description", "date", "x-posted")
+
+_KEY_RES = {
+    key: re.compile(rf'^{re.escape(key)}:\s*["\']?(.+?)["\']?\s*$', re.MULTILINE)
+    for key in FRONTMATTER_KEYS
+}
+_TWITTER_DESC_RE = re.compile(
+    r'twitter-card:.*?description:\s*["\']?(.+?)["\']?\s*$', re.DOTALL | re.MULTILINE,
+)
+
+
+def read_frontmatter_text(path: Path) -> str | None:
+    """先頭の `---` から閉じの `---` までの行を返す（本文は読まない。なければ None）"""
+    with open(path, "r", encoding="utf-8") as f:
+        if f.readline().rstrip("\r\n") != "---":
+            return None
+        lines = []
+        for line in f:
+            if line.startswith("---"):
+                text = "".join(lines)
+                return text[:-1] if text.endswith("\n") else text
+            lines.append(line)
+    return None
+
+
+def parse_frontmatter(yaml_text: str) -> dict:
+    """frontmatter から title / description / date / x-posted と twitter-card の description を取り出す"""
+    fm = {}
+    for key, pattern in _KEY_RES.items():
+        m = pattern.search(yaml_text)
+        if m:
+            val = m.group(1).strip("\"'")
+            if key == "x-posted":
+                fm[key] = val.lower() == "true"
+            else:
+                fm[key] = val
+
+    twitter_desc = _TWITTER_DESC_RE.search(yaml_text)
+    if twitter_desc:
+        fm["twitter_description"] = twitter_desc.group(1).strip("\"'")
+    return fm
+
+
+def read_frontmatter(path: Path) -> dict:
+    """QMD ファイルの frontmatter をパースする（frontmatter がなければ空の辞書）"""
+    yaml_text = read_frontmatter_text(path)
+    return parse_frontmatter(yaml_text) if yaml_text is not None else {}
+
+
+class FrontmatterIndex:
+    """パス・mtime・サイズ（変わっていれば frontmatter の SHA-1）で無効化する frontmatter のキャッシュ"""
+
+    def __init__(self, index_path: Path | None, root: Path):
+        self.index_path = Path(index_path) if index_path else None
+        self.root = Path(root)
+        self.entries: dict[str, dict] = {}
+        self.stats = {"hits": 0, "rehashed": 0, "misses": 0, "removed": 0}
+        self._dirty = False
+        if self.index_path and self.index_path.exists():
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def key(self, path: Path) -> str:
+        """サイドカーのキー（root からの相対パス）"""
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def get(self, path: Path) -> dict:
+        """frontmatter を返す
+
+        mtime とサイズが前回と同じならファイルを開かない。変わっていても frontmatter の
+        SHA-1 が前回と同じならパースし直さない。
+        """
+        st = path.stat()
+        key = self.key(path)
+        entry = self.entries.get(key)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            self.stats["hits"] += 1
+            return entry["fm"]
+        yaml_text = read_frontmatter_text(path)
+        digest = hashlib.sha1(yaml_text.encode("utf-8")).hexdigest() if yaml_text is not None else None
+        if entry and entry["sha1"] == digest:
+            self.stats["rehashed"] += 1
+            fm = entry["fm"]
+        else:
+            self.stats["misses"] += 1
+            fm = parse_frontmatter(yaml_text) if yaml_text is not None else {}
+        self.entries[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": digest, "fm": fm}
+        self._dirty = True
+        return fm
+
+    def forget(self, path: Path) -> None:
+        """書き換えたファイルのエントリを捨てる（次回読み直す）"""
+        if self.entries.pop(self.key(path), None) is not None:
+            self._dirty = True
+
+    def prune(self, seen: set[str], pattern: str = "*") -> None:
+        """pattern に合うキーのうち、今回見つからなかったファイルのエントリを削除する"""
+        for key in [k for k in self.entries if k not in seen and fnmatch(k, pattern)]:
+            del self.entries[key]
+            self.stats["removed"] += 1
+            self._dirty = True
+
+    def save(self) -> None:
+        """変更があればサイドカーを書き直す"""
+        if not (self.index_path and self._dirty):
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+        self._dirty = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh and show the frontmatter index")
+    parser.add_argument("posts_dir", type=str, help="Directory containing <post>/index.qmd")
+    parser.add_argument("index", type=str, help="Index sidecar file")
+    args = parser.parse_args()
+
+    posts_dir = Path(args.posts_dir)
+    if not posts_dir.is_dir():
+        print(f"ERROR: {posts_dir} is not a directory")
+        sys.exit(1)
+
+    index = FrontmatterIndex(Path(args.index), posts_dir)
+    started = time.perf_counter()
+    seen = set()
+    for qmd in sorted(posts_dir.glob("*/index.qmd")):
+        index.get(qmd)
+        seen.add(index.key(qmd))
+    index.prune(seen)
+    index.save()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    s = index.stats
+    print(f"{len(seen)} posts in {elapsed_ms:.1f}ms "
+          f"(reused {s['hits']}, rehashed {s['rehashed']}, read {s['misses']}, removed {s['removed']}) "
+          f"-> {args.index}")
+
+
+if __name__ == "__main__":
+    main()
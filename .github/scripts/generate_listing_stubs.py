@@ -4,6 +4,10 @@ Used by CI to ensure the Quarto listing page (analysis.qmd) includes
 all posts, even those whose source is gitignored (e.g. weekly reviews).
 
 Reads metadata from search.json and creates frontmatter-only stubs.
+
+CI normally updates the listing in place with listing_index.py; these
+stubs are only needed when analysis.html has to be rendered by Quarto
+(e.g. the first render, or after analysis.qmd itself changes).
 """
 
 import json
@@ -41,7 +45,10 @@ def main():
         src_qmd = src_posts / post_dir / "index.qmd"
         if src_qmd.exists():
             continue
-        if not (docs_posts / post_dir / "index.html").exists():
+        # Weekly reviews may keep only their thumbnail; search.json still lists them
+        if not (docs_posts / post_dir / "index.html").exists() and not (
+            post_dir in meta and (docs_posts / post_dir).is_dir()
+        ):
             continue
 
         src_qmd.parent.mkdir(parents=True, exist_ok=True)
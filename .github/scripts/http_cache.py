@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+ETag / Last-Modified を使うディスク上の HTTP キャッシュと、複数ミラーの同時取得
+
+post_weekly_calendar.py が Monex の iCal フィードを取得するときに使う。
+前回のレスポンスの検証子（ETag / Last-Modified）を送り、フィードが変わっていなければ
+304 だけで済ませてキャッシュ済みの本文を返す。
+
+ディレクトリ構成:
+    <cache_dir>/<sha1(url)>.meta.json   {"url", "etag", "last_modified", "fetched_at", "bytes"}
+    <cache_dir>/<sha1(url)>.body        レスポンス本文
+
+使用方法（キャッシュの状態を確認）:
+    python http_cache.py tmp/calendar_cache
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:
+    print("ERROR: requests is not installed. Run: pip install requests")
+    sys.exit(1)
+
+
+def _paths(cache_dir: Path, url: str) -> tuple[Path, Path]:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return cache_dir / f"{key}.meta.json", cache_dir / f"{key}.body"
+
+
+def load_cached(cache_dir: Path, url: str) -> tuple[dict, bytes] | None:
+    """キャッシュ済みのメタデータと本文を返す（なければ None）"""
+    meta_path, body_path = _paths(cache_dir, url)
+    if not (meta_path.exists() and body_path.exists()):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f), body_path.read_bytes()
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def store_cached(cache_dir: Path, url: str, response: requests.Response) -> None:
+    """レスポンスの本文と検証子を保存する"""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    meta_path, body_path = _paths(cache_dir, url)
+    body_path.write_bytes(response.content)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "bytes": len(response.content),
+        }, f, ensure_ascii=False, indent=2)
+
+
+def conditional_get(
+    url: str,
+    cache_dir: Path | None,
+    timeout: float = 15,
+    headers: dict | None = None,
+) -> tuple[bytes, dict]:
+    """検証子付きで GET し、(本文, 取得情報) を返す
+
+    304 ならキャッシュ済みの本文を返す。取得情報は
+    {"url", "status", "cache": "hit" | "miss" | "off", "elapsed_ms", "bytes", "digest"}。
+    HTTP エラーや通信エラーは requests.RequestException として送出する。
+    """
+    request_headers = dict(headers or {})
+    cached = load_cached(cache_dir, url) if cache_dir else None
+    if cached:
+        meta, _ = cached
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    started = time.perf_counter()
+    response = requests.get(url, timeout=timeout, headers=request_headers)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    if response.status_code == 304 and cached:
+        body = cached[1]
+        cache_state = "hit"
+    else:
+        response.raise_for_status()
+        body = response.content
+        cache_state = "miss" if cache_dir else "off"
+        if cache_dir:
+            store_cached(cache_dir, url, response)
+
+    return body, {
+        "url": url,
+        "status": response.status_code,
+        "cache": cache_state,
+        "elapsed_ms": elapsed_ms,
+        "bytes": len(response.content),
+        "digest": hashlib.sha1(body).hexdigest(),
+    }
+
+
+def race_get(
+    urls: list[str],
+    cache_dir: Path | None,
+    validate=None,
+    timeout: float = 15,
+    headers: dict | None = None,
+) -> tuple[bytes | None, dict | None, list[str]]:
+    """複数の URL を同時に取得し、最初に validate(body) を満たしたレスポンスを返す
+
+    残りのリクエストの完了は待たない。
+
+    Returns:
+        (本文, 取得情報, 失敗した URL ごとのエラーメッセージ)
+        どれも成功しなければ (None, None, errors)
+    """
+    errors: list[str] = []
+    pool = ThreadPoolExecutor(max_workers=max(1, len(urls)))
+    futures = {pool.submit(conditional_get, url, cache_dir, timeout, headers): url for url in urls}
+    try:
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                body, info = future.result()
+            except requests.RequestException as e:
+                errors.append(f"{url}: {e}")
+                continue
+            if validate and not validate(body):
+                errors.append(f"{url}: invalid response body")
+                continue
+            return body, info, errors
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return None, None, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the on-disk HTTP cache")
+    parser.add_argument("cache_dir", type=str)
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir)
+    metas = []
+    for path in sorted(cache_dir.glob("*.meta.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        # 同じディレクトリには解析済みイベントなど別形式のファイルも置かれる
+        if isinstance(meta, dict) and "url" in meta:
+            metas.append(meta)
+    if not metas:
+        print(f"No cached responses in {cache_dir}")
+        sys.exit(0)
+    for meta in metas:
+        print(f"{meta['url']}\n  fetched {meta.get('fetched_at')}, {meta.get('bytes')} bytes, "
+              f"etag={meta.get('etag')}, last-modified={meta.get('last_modified')}")
+
+
+if __name__ == "__main__":
+    main()
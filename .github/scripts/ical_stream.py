@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+期間を絞って VEVENT を読むストリーミング iCal リーダー
+
+post_weekly_calendar.py が Monex の経済指標フィードを読むときに使う。
+フィード全体をオブジェクトツリーにせず、VEVENT ブロックを1つずつ走査して
+DTSTART だけを先に解釈し、対象期間外のイベントはそれ以上何も作らずに読み飛ばす。
+
+対応している DTSTART の形式:
+    DTSTART;TZID=Asia/Tokyo:20261020T223000   タイムゾーン付き
+    DTSTART:20261020T133000Z                  UTC
+    DTSTART:20261020T223000                   フローティング（default_tz とみなす）
+    DTSTART;VALUE=DATE:20261020               終日
+"""
+
+import io
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+JST = ZoneInfo("Asia/Tokyo")
+
+_ESCAPES = {"n": "\n", "N": "\n", ",": ",", ";": ";", "\\": "\\"}
+
+
+def unfold_lines(text: str) -> Iterator[str]:
+    """RFC 5545 の折り返し（行頭の空白・タブ）を戻しながら1行ずつ返す"""
+    current = None
+    for raw in io.StringIO(text):
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def unescape_text(value: str) -> str:
+    """TEXT 値のエスケープ（\\n, \\, \\; \\\\）を戻す"""
+    if "\\" not in value:
+        return value
+    out = []
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch == "\\" and i + 1 < len(value):
+            out.append(_ESCAPES.get(value[i + 1], value[i + 1]))
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _split_property(line: str) -> tuple[str, dict, str]:
+    """'NAME;P1=a;P2=b:value' を (NAME, {P1: a, P2: b}, value) に分ける"""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+
+def _zone(tzid: Optional[str], default_tz) -> object:
+    if not tzid:
+        return default_tz
+    try:
+        return ZoneInfo(tzid.strip('"'))
+    except (ZoneInfoNotFoundError, ValueError):
+        return default_tz
+
+
+def parse_dtstart(params: dict, value: str, default_tz=JST) -> Optional[tuple[datetime, bool]]:
+    """DTSTART を (default_tz の datetime, 終日か) にする（解釈できなければ None）"""
+    value = value.strip()
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            d = datetime.strptime(value[:8], "%Y%m%d")
+            return d.replace(tzinfo=default_tz), True
+        if value.endswith("Z"):
+            dt = datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+        else:
+            dt = datetime.strptime(value, "%Y%m%dT%H%M%S").replace(
+                tzinfo=_zone(params.get("TZID"), default_tz)
+            )
+    except ValueError:
+        return None
+    return dt.astimezone(default_tz), False
+
+
+def iter_vevents(
+    content: bytes,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    default_tz=JST,
+) -> Iterator[dict]:
+    """期間 [start, end]（default_tz での日付）に入る VEVENT を順に返す
+
+    DTSTART の日付文字列を前後1日の余裕を持って文字列比較し、明らかに期間外なら
+    他のプロパティを解釈せずに読み飛ばす。範囲に近いものだけ datetime を作って厳密に判定する。
+
+    Yields:
+        {"datetime", "all_day", "summary", "description"}
+    """
+    lo = (start - timedelta(days=1)).strftime("%Y%m%d") if start else None
+    hi = (end + timedelta(days=1)).strftime("%Y%m%d") if end else None
+
+    in_event = False
+    props: list[str] = []
+    for line in unfold_lines(content.decode("utf-8", errors="replace")):
+        if not in_event:
+            if line == "BEGIN:VEVENT":
+                in_event = True
+                props = []
+            continue
+        if line != "END:VEVENT":
+            props.append(line)
+            continue
+        in_event = False
+
+        dtstart = next((p for p in props if p[:7].upper() == "DTSTART"), None)
+        if dtstart is None:
+            continue
+        name, params, value = _split_property(dtstart)
+        if name != "DTSTART":
+            continue
+        day = value.strip()[:8]
+        if (lo and day < lo) or (hi and day > hi):
+            continue
+        parsed = parse_dtstart(params, value, default_tz)
+        if parsed is None:
+            continue
+        dt, all_day = parsed
+        if (start and dt.date() < start) or (end and dt.date() > end):
+            continue
+
+        text = {"SUMMARY": "", "DESCRIPTION": ""}
+        for prop in props:
+            if prop[:1].upper() not in ("S", "D"):
+                continue
+            name, _, value = _split_property(prop)
+            if name in text:
+                text[name] = unescape_text(value)
+        summary, description = text["SUMMARY"], text["DESCRIPTION"]
+        yield {
+            "datetime": dt,
+            "all_day": all_day,
+            "summary": summary,
+            "description": description,
+        }
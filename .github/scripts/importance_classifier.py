@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+経済指標イベントの重要度判定
+
+キーワードと重みの表（.github/data/importance_keywords.json）を国名とキーワードの1本の正規表現に
+まとめ、サマリー + 説明文に一致したキーワードの重みを合計して重要度を決める。
+
+- 国を限定した表（"country": "US" など）は、テキストから読み取った国がその国のときだけ使う。
+  国が読み取れないイベントにはすべての表を使う。"*" の表は国を問わない。
+- 同じカテゴリで複数のキーワードに一致した場合は重い方だけを数え（"CPI" と "消費者物価" を
+  二重に数えない）、カテゴリごとの重みを合計して thresholds と比べる。
+
+サマリー・説明文ごとの一致の並びと、一致の並びごとの重要度をメモ化する。
+キーワードは空白を含まないので、サマリーと説明文を別々に走査しても一致は変わらない。
+
+キーワード表の形式:
+    {"thresholds": {"high": 3, "medium": 2},
+     "countries": {"US": ["米国"], "JP": ["日本"], ...},
+     "tables": [{"country": "US", "category": "employment", "keywords": {"雇用統計": 3}}, ...]}
+
+使用方法:
+    python importance_classifier.py "米国 雇用統計" "日本 鉱工業生産"
+"""
+
+import re
+import sys
+import json
+import unicodedata
+from itertools import chain
+from pathlib import Path
+from typing import Iterable
+
+DEFAULT_KEYWORDS_FILE = Path(__file__).parent.parent / "data" / "importance_keywords.json"
+
+# キーワード表がない場合の既定値（国を限定しない、以前のキーワードリストと同じ判定）
+DEFAULT_TABLES = {
+    "thresholds": {"high": 3, "medium": 2},
+    "tables": [
+        {"country": "*", "category": "high", "keywords": {
+            k: 3 for k in ("FRB", "FOMC", "政策金利", "雇用統計", "NFP", "非農業部門", "CPI",
+                           "消費者物価", "GDP", "ECB", "BOJ", "日銀", "失業率", "英中銀")
+        }},
+        {"country": "*", "category": "medium", "keywords": {
+            k: 2 for k in ("ISM", "PMI", "小売売上", "鉱工業生産", "住宅", "貿易収支",
+                           "景気指数", "製造業", "PPI", "生産者物価")
+        }},
+    ],
+}
+
+MEMO_SIZE = 65536
+
+# classify_many() で複数のテキストをつなぐ区切りと、一致をつなぐ区切り
+# （どちらもキーワードにもテキストにもまず現れない）
+_SEPARATOR = "\x00"
+_JOINER = "\x01"
+
+# 全角英数字と半角カナ
+_NEEDS_NFKC = re.compile("[０-９Ａ-Ｚａ-ｚ\uff61-\uff9f]")
+
+
+def normalize_text(text: str) -> str:
+    """NFKC 正規化・大文字化・空白の圧縮（全角英数字も半角のキーワードに一致させる）"""
+    return " ".join(unicodedata.normalize("NFKC", text).upper().split())
+
+
+def _fold(text: str) -> str:
+    """判定用の正規化: 全角英数字・半角カナを含むときだけ NFKC を掛けて大文字化する
+
+    キーワードは空白を含まないので空白の圧縮は省く。キーワードの一致に影響する互換文字は
+    実質的にこの2種類だけなので、全角の括弧などしか含まないテキストには NFKC を掛けない。
+    """
+    if _NEEDS_NFKC.search(text):
+        text = unicodedata.normalize("NFKC", text)
+    return text.upper()
+
+
+class _Resolved(dict):
+    """一致の並び → 重要度の辞書。ない並びは引いたときに計算して覚える"""
+
+    def __init__(self, resolve):
+        super().__init__()
+        self._resolve = resolve
+
+    def __missing__(self, key: tuple[str, str]) -> str:
+        level = self[key] = self._resolve(key)
+        return level
+
+
+class ImportanceClassifier:
+    """重み付きキーワード表から作る重要度判定器"""
+
+    def __init__(self, config: dict):
+        thresholds = config.get("thresholds", {})
+        self.high = thresholds.get("high", 3)
+        self.medium = thresholds.get("medium", 2)
+
+        # 国名 → 国コード
+        self.countries: dict[str, str] = {}
+        for code, names in config.get("countries", {}).items():
+            for name in names:
+                key = _fold(name)
+                if key:
+                    self.countries[key] = code
+
+        # キーワード → [(重み, 国, カテゴリ), ...]（同じキーワードが複数の表にあってもよい）
+        self.keywords: dict[str, list[tuple[int, str, str]]] = {}
+        for table in config.get("tables", []):
+            country = table.get("country", "*")
+            category = table.get("category", "")
+            for keyword, weight in table.get("keywords", {}).items():
+                key = _fold(keyword)
+                if key:
+                    self.keywords.setdefault(key, []).append((weight, country, category))
+
+        # 国名とキーワードをまとめた1本の正規表現（長いものを先に並べる）。
+        # 先頭の区切り文字は classify_many() で複数のテキストを1回で走査するためのもの
+        terms = sorted(set(self.countries) | set(self.keywords), key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, [_SEPARATOR] + terms)))
+
+        # サマリー・説明文 → 一致の並び（_JOINER でつないだ文字列）。MEMO_SIZE を超えたら作り直す
+        self._hits: dict[str, str] = {}
+        # (サマリーの一致の並び, 説明文の一致の並び) → 重要度。
+        # 並びの種類は少ないので、テキストが違っても使い回せる
+        self._resolved = _Resolved(self._resolve_hits)
+
+    def _count(self, hits: Iterable[str]) -> tuple[str | None, list[tuple[str, int, str, str]]]:
+        """一致の並びから (国, 数えた一致 [(キーワード, 重み, 国, カテゴリ), ...]) を求める"""
+        hits = list(hits)
+        country = next((self.countries[h] for h in hits if h in self.countries), None)
+        best: dict[str, tuple[str, int, str, str]] = {}
+        for hit in hits:
+            for weight, scope, category in self.keywords.get(hit, ()):
+                if scope != "*" and country is not None and scope != country:
+                    continue
+                if category not in best or weight > best[category][1]:
+                    best[category] = (hit, weight, scope, category)
+        return country, list(best.values())
+
+    def _resolve_hits(self, key: tuple[str, str]) -> str:
+        hits = _JOINER.join(key).split(_JOINER)
+        score = sum(m[1] for m in self._count(filter(None, hits))[1])
+        if score >= self.high:
+            return "high"
+        if score >= self.medium:
+            return "medium"
+        return "low"
+
+    def _scan(self, texts: list[str]) -> None:
+        """texts の一致の並びを求めて self._hits に入れる（件数の上限は呼び出し側で見る）
+
+        区切り文字でつないで、1回の大文字化と1回の正規表現の走査で済ませる。
+        """
+        blob = _SEPARATOR.join(texts)
+        if blob.count(_SEPARATOR) != len(texts) - 1:
+            # テキスト自体に区切り文字が含まれる場合は1件ずつ
+            groups = [_JOINER.join(self._pattern.findall(_fold(t))) for t in texts]
+        else:
+            if _NEEDS_NFKC.search(blob):
+                # NFKC は必要なテキストだけに掛ける（まとめて掛けるとかえって遅い）
+                blob = _SEPARATOR.join(map(_fold, texts))
+            groups = _JOINER.join(self._pattern.findall(blob.upper())).split(_SEPARATOR)
+        self._hits.update(zip(texts, groups))
+
+    def _field_hits(self, text: str) -> str:
+        joined = self._hits.get(text)
+        if joined is None:
+            if len(self._hits) >= MEMO_SIZE:
+                self._hits.clear()
+            self._scan([text])
+            joined = self._hits[text]
+        return joined
+
+    def matches(self, summary: str, description: str = "") -> tuple[str | None, list[dict]]:
+        """読み取った国と、重みに数えたキーワード・重み・国・カテゴリを返す（確認用）"""
+        country, counted = self._count(self._pattern.findall(_fold(f"{summary} {description}")))
+        return country, [
+            {"keyword": k, "weight": w, "country": c, "category": cat}
+            for k, w, c, cat in counted
+        ]
+
+    def classify(self, summary: str, description: str = "") -> str:
+        """1件の重要度（"high" / "medium" / "low"）"""
+        return self._resolved[self._field_hits(summary), self._field_hits(description)]
+
+    def classify_many(self, items: Iterable[tuple[str, str]]) -> list[str]:
+        """(サマリー, 説明文) の列をまとめて判定する
+
+        まだ見ていないサマリー・説明文だけをまとめて1回で走査する（同じテキストは1回だけ）。
+        """
+        items = list(items)
+        hits = self._hits
+        fields = set(chain.from_iterable(items))
+        pending = fields.difference(hits)
+        if pending:
+            if len(hits) + len(pending) > MEMO_SIZE:
+                hits.clear()
+                pending = fields
+            self._scan(list(pending))
+        resolved = self._resolved
+        return [resolved[hits[s], hits[d]] for s, d in items]
+
+    def cache_info(self):
+        """(一致の並びを覚えているテキストの件数, 覚えている一致の並びの件数)"""
+        return len(self._hits), len(self._resolved)
+
+    def cache_clear(self) -> None:
+        """メモを空にする（正規表現はそのまま）"""
+        self._hits.clear()
+        self._resolved.clear()
+
+
+def load_classifier(path: Path | None = None) -> ImportanceClassifier:
+    """キーワード表を読み込んで判定器を作る（ファイルがなければ既定の表）"""
+    path = path or DEFAULT_KEYWORDS_FILE
+    if not path.exists():
+        return ImportanceClassifier(DEFAULT_TABLES)
+    with open(path, "r", encoding="utf-8") as f:
+        return ImportanceClassifier(json.load(f))
+
+
+_default: ImportanceClassifier | None = None
+
+
+def default_classifier() -> ImportanceClassifier:
+    """既定のキーワード表の判定器（プロセス内で1つだけ作る）"""
+    global _default
+    if _default is None:
+        _default = load_classifier()
+    return _default
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: importance_classifier.py "<summary>" [...]')
+        sys.exit(1)
+    classifier = default_classifier()
+    for text in sys.argv[1:]:
+        country, counted = classifier.matches(text)
+        matched = ", ".join(f"{m['keyword']}({m['weight']},{m['country']}/{m['category']})"
+                            for m in counted)
+        print(f"{classifier.classify(text):<6} {text}  [country={country or '?'}; {matched or '-'}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+"""
+記事一覧ページ（analysis.html）のリスティングを Quarto を使わずに更新する
+
+render-posts.yml では、ソースのない記事（週間レビューなど）のスタブ index.qmd を
+generate_listing_stubs.py で作り、`quarto render analysis.qmd` で一覧全体を作り直していた。
+このスクリプトは記事ごとのリスティング項目（タイトル・日付・説明・カテゴリ・サムネイル）を
+ソースの frontmatter、なければレンダリング済み index.html の先頭から取り出してインデックスに保存し、
+analysis.html のカード一覧とカテゴリ一覧、listings.json を直接書き換える。
+Quarto と同じく、ソースの記事ディレクトリにあるドキュメント（.qmd / .md など）は1ファイルにつき1件として一覧に載せる。
+ソースのない記事（週間レビューなど）は、前回の Quarto のレンダリングで analysis.html に出たカードから項目を作る。
+サムネイルしか残っていない記事（index.html もない週間レビュー）も search.json に載っていれば一覧に含め、
+カードがなければ generate_listing_stubs.py のスタブと同じく search.json のタイトルから項目を作る。
+
+インデックスはソースのドキュメントごとに元ファイルの mtime・サイズ・SHA-1 を持つ。
+mtime とサイズが同じならファイルを開かず、違っても内容のハッシュが同じなら読み直さない
+（CI のチェックアウトで mtime だけ変わった場合）。変わった記事の項目だけを作り直す。
+
+analysis.html の枠（ヘッダー・スタイル・page-size など）はそのまま使うので、
+analysis.qmd や _quarto.yml を変えたとき、インデックスがないとき、analysis.html がまだないときは
+Quarto でレンダリングする（その場合は終了コード 2 を返す）。analysis.qmd と _quarto.yml の SHA-1 は
+インデックスに保存して、次の実行で変わったかどうかを比べる。
+search.json に載っている記事や前回の analysis.html にあった記事（ディレクトリが残っているもの）が
+一覧から漏れるときも、件数が前回のレンダリングと合わないので Quarto に回す。
+
+カードの file-modified / reading-time / word-count の並べ替え用の属性は Quarto にしか作れない
+（ソースの mtime と本文の語数から作られる）ので、前回 Quarto が出した同じページのカードから引き継ぐ。
+書き直す前に、各カードを前回と同じ位置に置いたときに Quarto のカードとバイト単位で一致するかを確かめ、
+一致しない記事（新しい記事・タイトルや説明を変えた記事）があれば Quarto に回す。
+つまり Quarto を使わずに済むのは、記事を消したときと一覧が変わらないときで、カードの中身が変わるときは Quarto が作る。
+--check は書き込まずに、コミット済みの analysis.html と全カード・カテゴリ一覧・listings.json を比べる。
+
+インデックスの形式:
+    {"version": 3, "templates": {"analysis.qmd": sha1, "_quarto.yml": sha1},
+     "entries": {"<記事ディレクトリ名>/<ソースのファイル名>": {
+        "files": {"src": [mtime_ns, size, sha1], "html": [...]}, "thumbnail": "thumbnail.svg",
+        "item": {"path", "title", "date", "description", "author", "image", "categories"}}}}
+
+使用方法:
+    python listing_index.py docs/quarto/latest scripts/by_timeSeries/quarto/posts
+    python listing_index.py docs/quarto/latest scripts/by_timeSeries/quarto/posts --index tmp/listing_index.json
+    python listing_index.py docs/quarto/latest scripts/by_timeSeries/quarto/posts --check
+"""
+
+import os
+import re
+import sys
+import html
+import json
+import time
+import base64
+import difflib
+import hashlib
+import argparse
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+from zoneinfo import ZoneInfo
+
+from frontmatter_index import read_frontmatter_text
+
+JST = ZoneInfo("Asia/Tokyo")
+
+INDEX_VERSION = 3
+LISTING_INDEX = "tmp/listing_index.json"
+LISTING_PAGE = "analysis.html"
+LISTING_ID = "posts"
+QUARTO_CONFIG = "_quarto.yml"
+DEFAULT_AUTHOR = "chokotto"
+THUMBNAIL_EXTS = ("svg", "jpg", "jpeg", "png")
+# リスティングの contents: posts で一覧に載るソース（Quarto は _ と . で始まるファイルを無視する）
+DOCUMENT_EXTS = (".qmd", ".md", ".Rmd", ".ipynb")
+SEARCH_JSON = "search.json"
+
+_SCALAR_RE = re.compile(r'^(title|description|date|author|image|draft):\s*(.*?)\s*$', re.MULTILINE)
+_CATEGORIES_RE = re.compile(r'^categories:[ \t]*(.*)$((?:\n[ \t]+-[ \t]*.*$)*)', re.MULTILINE)
+_META_RE = re.compile(r'<meta name="(author|dcterms\.date|description)" content="([^"]*)">')
+_OG_IMAGE_RE = re.compile(r'<meta property="og:image" content="[^"]*/([^/"]+)">')
+_H1_RE = re.compile(r'<h1 class="title">(.*?)</h1>')
+_CATEGORY_RE = re.compile(r'<div class="quarto-category">(.*?)</div>')
+_TAG_RE = re.compile(r"<[^>]+>")
+
+_LIST_START = '<div class="list quarto-listing-default">\n'
+_LIST_END = '<div class="listing-no-matching'
+_CATEGORIES_BLOCK_RE = re.compile(
+    r'(<div class="quarto-listing-category category-default">)(?:<div class="category" [^>]*>.*?</div>)*'
+)
+_CARD_START_RE = re.compile(r'(?=<div class="quarto-post image-right")')
+_CARD_PATH_RE = re.compile(r'<a href="\./posts/([^/"]+/[^/"]+\.html)"')
+_CARD_TITLE_RE = re.compile(r'<h3 class="no-anchor listing-title">\n<a [^>]*>(.*?)</a>', re.DOTALL)
+_CARD_DESCRIPTION_RE = re.compile(r'<div class="delink listing-description"><a [^>]*>\n<p>(.*?)</p>', re.DOTALL)
+_CARD_CATEGORY_RE = re.compile(r'<div class="listing-category" onclick="[^"]*">(.*?)</div>')
+_CARD_DATE_RE = re.compile(r'data-listing-date-sort="(\d+)"')
+_CARD_INDEX_RE = re.compile(r'data-index="(\d+)"')
+# date-sort より後ろの並べ替え用の属性（file-modified / date-modified / reading-time / word-count）
+_CARD_SORT_ATTRS_RE = re.compile(r'data-listing-date-sort="\d+"([^>]*)>')
+_CARD_AUTHOR_RE = re.compile(r'<div class="listing-author">\n(.*?)\n</div>', re.DOTALL)
+_CARD_IMAGE_RE = re.compile(r'<img loading="lazy" (?:data-)?src="\./posts/[^/"]+/([^"]+)"')
+_PAGE_SIZE_RE = re.compile(r"^\s*page: (\d+),", re.MULTILINE)
+_IMAGE_HEIGHT_RE = re.compile(r'class="thumbnail-image" style="height: ([^;"]+);"')
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def smart_quotes(text: str) -> str:
+    """Pandoc の smart 拡張と同じく、引用符・ダッシュ・三点リーダーを組版用の文字にする"""
+    text = text.replace("---", "\u2014").replace("--", "\u2013").replace("...", "\u2026")
+    text = re.sub(r"(^|[\s(\[{\u2014\u2013])'", "\\1\u2018", text)
+    text = re.sub(r'(^|[\s(\[{\u2014\u2013])"', "\\1\u201c", text)
+    return text.replace("'", "\u2019").replace('"', "\u201d")
+
+
+def parse_listing_frontmatter(yaml_text: str) -> dict:
+    """frontmatter からリスティングに使うキーを取り出す（トップレベルのキーだけを見る）"""
+    fm = {}
+    for m in _SCALAR_RE.finditer(yaml_text):
+        if m.group(2):
+            fm.setdefault(m.group(1), _unquote(m.group(2)))
+
+    m = _CATEGORIES_RE.search(yaml_text)
+    if m:
+        inline, block = m.group(1).strip(), m.group(2)
+        if inline.startswith("["):
+            fm["categories"] = [_unquote(c) for c in inline.strip("[]").split(",") if c.strip()]
+        elif inline:
+            fm["categories"] = [_unquote(inline)]
+        else:
+            fm["categories"] = [_unquote(line.strip()[1:]) for line in block.strip("\n").splitlines()]
+    return fm
+
+
+def read_rendered_meta(html_path: Path) -> dict:
+    """レンダリング済み index.html のタイトルブロックまでを読み、リスティングのキーを返す"""
+    head = []
+    seen_title = False
+    with open(html_path, "r", encoding="utf-8") as f:
+        for line in f:
+            head.append(line)
+            # サイトのナビゲーションの </header> ではなく、記事のタイトルブロックの終わりで止める
+            seen_title = seen_title or '<h1 class="title">' in line
+            if seen_title and "</header>" in line:
+                break
+    text = "".join(head)
+
+    fm = {}
+    for name, value in _META_RE.findall(text):
+        key = {"dcterms.date": "date"}.get(name, name)
+        fm[key] = html.unescape(value)
+    m = _OG_IMAGE_RE.search(text)
+    if m:
+        fm["image"] = html.unescape(m.group(1))
+    m = _H1_RE.search(text)
+    if m:
+        fm["title"] = html.unescape(_TAG_RE.sub("", m.group(1)))
+    fm["categories"] = [html.unescape(c) for c in _CATEGORY_RE.findall(text)]
+    return fm
+
+
+def search_titles(search_json: Path) -> dict[str, str]:
+    """search.json に載っている記事ページ（posts/ からのパス）とタイトル（ファイルがなければ空）"""
+    if not search_json.exists():
+        return {}
+    with open(search_json, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    titles = {}
+    for e in entries:
+        href = e.get("href", "").split("#")[0]
+        if href.startswith(f"{LISTING_ID}/") and href.count("/") == 2 and href.endswith(".html"):
+            titles.setdefault(href[len(LISTING_ID) + 1:], e.get("title", ""))
+    return titles
+
+
+def rendered_cards(page: str) -> list[tuple[str, str]]:
+    """analysis.html のカードを (記事ページのパス, カード) の並びで返す（前回のレンダリングで一覧に出ていた記事）"""
+    start = page.find(_LIST_START)
+    end = page.find(_LIST_END, start)
+    if start < 0 or end < 0:
+        return []
+    # 最後の "</div>\n" はカードではなく一覧の枠を閉じるもの
+    body = page[start + len(_LIST_START):end].removesuffix("</div>\n")
+    cards = []
+    for card in _CARD_START_RE.split(body)[1:]:
+        m = _CARD_PATH_RE.search(card)
+        if m:
+            cards.append((html.unescape(m.group(1)), card))
+    return cards
+
+
+def card_item(path: str, card: str) -> dict:
+    """analysis.html のカードからリスティング項目を取り出す（render_card の逆）"""
+    def find(regex: re.Pattern, default: str = "") -> str:
+        m = regex.search(card)
+        return html.unescape(m.group(1)) if m else default
+
+    dir_name = path.split("/")[0]
+    m = _CARD_DATE_RE.search(card)
+    date = datetime.fromtimestamp(int(m.group(1)) / 1000, JST).strftime("%Y-%m-%d") if m else dir_name[:10]
+    return {
+        "path": path,
+        "title": find(_CARD_TITLE_RE, dir_name),
+        "date": date,
+        "description": find(_CARD_DESCRIPTION_RE),
+        "author": find(_CARD_AUTHOR_RE, DEFAULT_AUTHOR),
+        "image": find(_CARD_IMAGE_RE, "thumbnail.svg"),
+        "categories": [html.unescape(c) for c in _CARD_CATEGORY_RE.findall(card)],
+    }
+
+
+def template_hashes(project_dir: Path, names: list[str]) -> dict[str, str | None]:
+    """一覧ページの枠を決めるファイルの SHA-1（ファイルがなければ None）"""
+    hashes = {}
+    for name in names:
+        path = project_dir / name
+        hashes[name] = hashlib.sha1(path.read_bytes()).hexdigest() if path.is_file() else None
+    return hashes
+
+
+def _stamp(path: Path, previous: list | None) -> tuple[list, bool]:
+    """[mtime_ns, size, sha1] と「内容が前回と同じか」を返す（mtime とサイズが同じなら読まない）"""
+    st = path.stat()
+    if previous and previous[0] == st.st_mtime_ns and previous[1] == st.st_size:
+        return previous, True
+    digest = hashlib.sha1(path.read_bytes()).hexdigest()
+    return [st.st_mtime_ns, st.st_size, digest], bool(previous) and previous[2] == digest
+
+
+class ListingIndex:
+    """記事ページごとのリスティング項目を、元ファイルが変わったときだけ作り直すインデックス"""
+
+    def __init__(self, index_path: Path | None, docs_posts: Path, src_posts: Path,
+                 titles: dict[str, str] | None = None, cards: list[tuple[str, str]] | None = None):
+        self.index_path = Path(index_path) if index_path else None
+        self.docs_posts = Path(docs_posts)
+        self.src_posts = Path(src_posts)
+        # ソースのない記事の項目の元（search.json のタイトルと前回の analysis.html のカード）
+        self.titles = titles or {}
+        self.cards: dict[str, str] = {}
+        for path, card in cards or []:
+            self.cards.setdefault(path, card)
+        self.entries: dict[str, dict] = {}
+        self.templates: dict[str, str | None] = {}
+        self.cold = True
+        self.stats = {"hits": 0, "rehashed": 0, "misses": 0, "removed": 0}
+        self._dirty = False
+        if self.index_path and self.index_path.exists():
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self.entries = data.get("entries", {})
+                    self.templates = data.get("templates", {})
+                    self.cold = False
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+                self.templates = {}
+
+    def documents(self) -> list[str]:
+        """一覧に載る記事のソースを「記事ディレクトリ/ファイル名」で返す
+
+        ソースの記事ディレクトリにあるドキュメントはすべて一覧に載る（index.qmd と index.md が
+        両方あれば 2 件）。ソースのない記事は generate_listing_stubs.py と同じく index.qmd を1つ持つとみなし、
+        レンダリング済みの index.html があるか、search.json に載っていてディレクトリが残っているものを含める。
+        """
+        docs, with_source = set(), set()
+        if self.src_posts.is_dir():
+            with os.scandir(self.src_posts) as it:
+                for e in it:
+                    if not e.is_dir() or e.name.startswith(("_", ".")):
+                        continue
+                    names = [n for n in os.listdir(e.path)
+                             if n.endswith(DOCUMENT_EXTS) and not n.startswith(("_", "."))]
+                    docs.update(f"{e.name}/{n}" for n in names)
+                    with_source.update([e.name] if names else [])
+        if self.docs_posts.is_dir():
+            with os.scandir(self.docs_posts) as it:
+                for e in it:
+                    if e.is_dir() and e.name not in with_source and (
+                        (Path(e.path) / "index.html").exists() or f"{e.name}/index.html" in self.titles
+                    ):
+                        docs.add(f"{e.name}/index.qmd")
+        return sorted(docs)
+
+    def _thumbnail(self, dir_name: str) -> str:
+        for ext in THUMBNAIL_EXTS:
+            if (self.docs_posts / dir_name / f"thumbnail.{ext}").exists():
+                return f"thumbnail.{ext}"
+        return "thumbnail.svg"
+
+    def get(self, doc: str) -> dict | None:
+        """記事のリスティング項目を返す（draft: true の記事は None）"""
+        dir_name, name = doc.split("/")
+        sources = {"src": self.src_posts / doc,
+                   "html": self.docs_posts / dir_name / f"{Path(name).stem}.html"}
+        sources = {k: p for k, p in sources.items() if p.exists()}
+        thumbnail = self._thumbnail(dir_name)
+
+        entry = self.entries.get(doc)
+        previous = entry["files"] if entry else {}
+        files = {}
+        unchanged = bool(entry) and set(previous) == set(sources) and entry["thumbnail"] == thumbnail
+        for key, path in sources.items():
+            files[key], same = _stamp(path, previous.get(key))
+            unchanged &= same
+        if unchanged:
+            if files != previous:
+                self.stats["rehashed"] += 1
+                entry["files"] = files
+                self._dirty = True
+            else:
+                self.stats["hits"] += 1
+            return entry["item"]
+
+        self.stats["misses"] += 1
+        item = self._build(doc, sources, thumbnail)
+        self.entries[doc] = {"files": files, "thumbnail": thumbnail, "item": item}
+        self._dirty = True
+        return item
+
+    def _build(self, doc: str, sources: dict[str, Path], thumbnail: str) -> dict | None:
+        dir_name, name = doc.split("/")
+        path = f"{dir_name}/{Path(name).stem}.html"
+        if "src" not in sources and path in self.cards:
+            # ソースのない記事は、前回 Quarto が出したカードをそのまま使う
+            # （index.html から読み直すと、スタブから作ったサムネイルや説明と食い違うことがある）
+            return card_item(path, self.cards[path])
+        if "src" in sources:
+            yaml_text = read_frontmatter_text(sources["src"]) or ""
+            fm = parse_listing_frontmatter(yaml_text)
+            if fm.get("draft", "").lower() == "true":
+                return None
+            fm.update({k: smart_quotes(fm[k]) for k in ("title", "description") if k in fm})
+            fm["categories"] = [smart_quotes(c) for c in fm.get("categories", [])]
+        elif "html" in sources:
+            fm = read_rendered_meta(sources["html"])
+            if not (self.docs_posts / dir_name / fm.get("image", "")).is_file():
+                fm["image"] = thumbnail
+        else:
+            # index.html もソースもなく、search.json にだけ載っている記事（generate_listing_stubs.py のスタブと同じ項目）
+            fm = {"title": smart_quotes(self.titles.get(path) or dir_name)}
+        return {
+            "path": path,
+            "title": fm.get("title", dir_name),
+            "date": fm.get("date", dir_name[:10]),
+            "description": fm.get("description", ""),
+            "author": fm.get("author", DEFAULT_AUTHOR),
+            "image": fm.get("image", thumbnail),
+            "categories": fm.get("categories", []),
+        }
+
+    def items(self) -> list[dict]:
+        """全記事の項目を日付の新しい順に返す（日付が同じならソースのパス順。消えた記事のエントリは捨てる）"""
+        docs = self.documents()
+        seen = set(docs)
+        for name in [k for k in self.entries if k not in seen]:
+            del self.entries[name]
+            self.stats["removed"] += 1
+            self._dirty = True
+        items = [item for item in (self.get(d) for d in docs) if item]
+        items.sort(key=lambda item: item["date"], reverse=True)
+        return items
+
+    def templates_changed(self, current: dict[str, str | None]) -> bool:
+        """枠のファイルが前回と違うか（インデックスがなければ True）。現在のハッシュを記録する"""
+        changed = self.cold or self.templates != current
+        if self.templates != current:
+            self.templates = current
+            self._dirty = True
+        return changed
+
+    def save(self) -> None:
+        """変更があればインデックスを書き直す"""
+        if not (self.index_path and self._dirty):
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "templates": self.templates, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+        self._dirty = False
+
+
+def _category_key(text: str) -> str:
+    """Quarto がカテゴリの絞り込みに使う値（encodeURIComponent の base64）"""
+    return base64.b64encode(quote(text, safe="!*'()").encode("ascii")).decode("ascii")
+
+
+def _date_sort(date: str) -> int:
+    try:
+        day = datetime.strptime(date[:10], "%Y-%m-%d").replace(tzinfo=JST)
+    except ValueError:
+        return 0
+    return int(day.timestamp() * 1000)
+
+
+def _format_date(date: str) -> str:
+    try:
+        day = datetime.strptime(date[:10], "%Y-%m-%d")
+    except ValueError:
+        return date
+    return f"{day:%b} {day.day}, {day.year}"
+
+
+def render_card(item: dict, index: int, page_size: int, image_height: str, sort_attrs: str = "") -> str:
+    """Quarto の default リスティングと同じ形のカード（sort_attrs は前回 Quarto が出したカードから引き継ぐ）"""
+    href = f"./posts/{item['path']}"
+    # 最初のページ分だけすぐ読み込み、残りは data-src で遅延読み込みにする
+    src_attr = "src" if index < page_size else "data-src"
+    categories = "".join(
+        f"\n<div class=\"listing-category\" onclick=\"window.quartoListingCategory('{_category_key(c)}'); "
+        f"return false;\">{html.escape(c, quote=False)}</div>\n"
+        for c in item["categories"]
+    )
+    description = ""
+    if item["description"]:
+        description = (
+            f'<div class="delink listing-description"><a href="{href}" class="no-external">\n'
+            f"<p>{html.escape(item['description'], quote=False)}</p>\n"
+            f"</a></div>\n"
+        )
+    return (
+        f'<div class="quarto-post image-right" data-index="{index}" '
+        f'data-categories="{_category_key(",".join(item["categories"]))}" '
+        f'data-listing-date-sort="{_date_sort(item["date"])}"{sort_attrs}>\n'
+        f'<div class="thumbnail"><a href="{href}" class="no-external">\n\n'
+        f'<img loading="lazy" {src_attr}="./posts/{item["path"].split("/")[0]}/{item["image"]}" class="thumbnail-image" '
+        f'style="height: {image_height};">\n\n'
+        f"</a></div>\n"
+        f'<div class="body">\n'
+        f'<h3 class="no-anchor listing-title">\n'
+        f'<a href="{href}" class="no-external">{html.escape(item["title"], quote=False)}</a>\n'
+        f"</h3>\n"
+        f'<div class="listing-categories">\n{categories}\n</div>\n'
+        f"{description}"
+        f"</div>\n"
+        f'<div class="metadata">\n'
+        f'<a href="{href}" class="no-external">\n'
+        f'<div class="listing-date">\n{_format_date(item["date"])}\n</div>\n'
+        f'<div class="listing-author">\n{html.escape(item["author"], quote=False)}\n</div>\n'
+        f"</a>\n"
+        f"</div>\n"
+        f"</div>\n"
+    )
+
+
+def render_categories(items: list[dict]) -> str:
+    """カテゴリ一覧（All と、名前順のカテゴリごとの件数）"""
+    counts: dict[str, int] = {}
+    for item in items:
+        for c in item["categories"]:
+            counts[c] = counts.get(c, 0) + 1
+    parts = [f'<div class="category" data-category="">All <span class="quarto-category-count">({len(items)})</span></div>']
+    parts += [
+        f'<div class="category" data-category="{_category_key(c)}">{html.escape(c, quote=False)} '
+        f'<span class="quarto-category-count">({counts[c]})</span></div>'
+        for c in sorted(counts)
+    ]
+    return "".join(parts)
+
+
+def update_page(page: str, items: list[dict]) -> tuple[str, list[tuple[str, str, str]]]:
+    """analysis.html のカード一覧とカテゴリ一覧を items で置き換える（枠がなければ ValueError）
+
+    各カードは前回のレンダリングで同じページを指していたカードと突き合わせ、並べ替え用の属性を引き継ぐ。
+    Quarto のカードとバイト単位で一致しないもの（新しい記事・項目が変わった記事・このスクリプトの出力の食い違い）は
+    (パス, Quarto のカード, このスクリプトのカード) として返す（新しい記事の Quarto のカードは空文字列）。
+    """
+    start = page.find(_LIST_START)
+    end = page.find(_LIST_END, start)
+    if start < 0 or end < 0:
+        raise ValueError("listing container not found")
+    m = _PAGE_SIZE_RE.search(page)
+    page_size = int(m.group(1)) if m else len(items)
+    m = _IMAGE_HEIGHT_RE.search(page)
+    image_height = m.group(1) if m else "200px"
+
+    previous: dict[str, list[str]] = {}
+    for path, card in rendered_cards(page):
+        previous.setdefault(path, []).append(card)
+    cards, mismatches = [], []
+    for i, item in enumerate(items):
+        queue = previous.get(item["path"])
+        if not queue:
+            mismatches.append((item["path"], "", render_card(item, i, page_size, image_height)))
+            continue
+        old = queue.pop(0)
+        sort_attrs = _CARD_SORT_ATTRS_RE.search(old).group(1)
+        # 前回と同じ位置に置いたときに Quarto のカードと同じになるかを確かめてから、新しい位置で書き直す
+        mine = render_card(item, int(_CARD_INDEX_RE.search(old).group(1)), page_size, image_height, sort_attrs)
+        if mine != old:
+            mismatches.append((item["path"], old, mine))
+        cards.append(render_card(item, i, page_size, image_height, sort_attrs))
+
+    page = page[:start + len(_LIST_START)] + "".join(cards) + "</div>\n" + page[end:]
+    page, found = _CATEGORIES_BLOCK_RE.subn(
+        lambda m: m.group(1) + render_categories(items), page, count=1,
+    )
+    if not found:
+        raise ValueError("category list not found")
+    return page, mismatches
+
+
+def update_listings_json(path: Path, items: list[dict], listing: str = f"/{LISTING_PAGE}") -> str | None:
+    """listings.json の記事の並びを書き換えた内容を返す（ファイルがなければ None）"""
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        listings = json.load(f)
+    paths = [f"/posts/{item['path']}" for item in items]
+    for entry in listings:
+        if entry.get("listing") == listing:
+            entry["items"] = paths
+            break
+    else:
+        listings.append({"listing": listing, "items": paths})
+    return json.dumps(listings, ensure_ascii=False, indent=2)
+
+
+def _write_if_changed(path: Path, text: str) -> bool:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if f.read() == text:
+            return False
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    return True
+
+
+def _diff(old: str, new: str) -> str:
+    return "\n".join(difflib.unified_diff(old.splitlines(), new.splitlines(), "quarto", "listing_index", lineterm="", n=0))
+
+
+def check(page_path: Path, docs_dir: Path, src_posts: Path) -> int:
+    """インデックスを使わずに全記事の項目を作り、前回の Quarto のレンダリングとカード単位で比べる"""
+    with open(page_path, "r", encoding="utf-8", newline="") as f:
+        page = f.read()
+    index = ListingIndex(None, docs_dir / LISTING_ID, src_posts,
+                         search_titles(docs_dir / SEARCH_JSON), rendered_cards(page))
+    items = index.items()
+    cards = rendered_cards(page)
+    new_page, mismatches = update_page(page, items)
+    for path, old, mine in mismatches[:5]:
+        print(f"✗ {path}: {'not in the last render' if not old else 'card differs'}")
+        if old:
+            print(_diff(old, mine))
+    problems = len(mismatches)
+    if not mismatches and new_page != page:
+        # カードが全部同じでもカテゴリ一覧や件数が違う
+        print(f"✗ {page_path.name}: category list or card count differs")
+        print(_diff(page, new_page))
+        problems += 1
+    listings_path = docs_dir / "listings.json"
+    listings = update_listings_json(listings_path, items, f"/{page_path.name}")
+    if listings is not None and listings != listings_path.read_text(encoding="utf-8"):
+        print(f"✗ {listings_path.name}: item list differs")
+        problems += 1
+    print(f"{len(items)} posts, last render listed {len(cards)}: "
+          f"{'all cards match' if not problems else f'{problems} differences'}")
+    return 1 if problems else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the analysis.html listing without Quarto")
+    parser.add_argument("docs_dir", type=str, help="Rendered site root (contains analysis.html and posts/)")
+    parser.add_argument("src_posts", type=str, help="Source posts directory (contains <post>/index.qmd)")
+    parser.add_argument("--index", type=str, default=LISTING_INDEX, help=f"Index file (default: {LISTING_INDEX})")
+    parser.add_argument("--page", type=str, default=LISTING_PAGE, help=f"Listing page (default: {LISTING_PAGE})")
+    parser.add_argument("--check", action="store_true",
+                        help="Compare the cards with the last Quarto render without writing anything")
+    args = parser.parse_args()
+
+    docs_dir = Path(args.docs_dir)
+    page_path = docs_dir / args.page
+    if not page_path.exists():
+        print(f"ERROR: {page_path} not found, render {Path(args.page).with_suffix('.qmd')} with Quarto first")
+        sys.exit(2)
+    if args.check:
+        sys.exit(check(page_path, docs_dir, Path(args.src_posts)))
+
+    started = time.perf_counter()
+    src_posts = Path(args.src_posts)
+    docs_posts = docs_dir / LISTING_ID
+    with open(page_path, "r", encoding="utf-8", newline="") as f:
+        page = f.read()
+    titles = search_titles(docs_dir / SEARCH_JSON)
+    cards = rendered_cards(page)
+    index = ListingIndex(Path(args.index), docs_posts, src_posts, titles, cards)
+    items = index.items()
+
+    def fallback(reason: str):
+        # 記事の項目だけは次回のために保存しておく
+        index.save()
+        print(f"{reason}, render {page_path.name} with Quarto instead")
+        sys.exit(2)
+
+    # ページの枠を変えたときは Quarto でレンダリングし直す
+    templates = template_hashes(src_posts.parent, [Path(args.page).with_suffix(".qmd").name, QUARTO_CONFIG])
+    edited = [name for name, digest in templates.items() if index.templates.get(name) != digest]
+    if index.templates_changed(templates):
+        fallback("no listing index yet" if index.cold else f"{', '.join(edited)} changed")
+    # 前回のレンダリングや search.json にあって、ディレクトリも残っている記事が一覧から漏れていないか
+    # （同じページのカードが2枚あることもあるので件数で比べる）
+    listed = Counter(item["path"] for item in items)
+    expected = Counter(path for path, _ in cards) | Counter(titles.keys())
+    missing = sorted(path for path, n in expected.items()
+                     if listed[path] < n and (docs_posts / path.split("/")[0]).is_dir())
+    if missing:
+        fallback(f"{len(items)} posts but the last render listed {len(cards)} "
+                 f"({len(missing)} missing: {', '.join(missing[:3])}{', ...' if len(missing) > 3 else ''})")
+    try:
+        page, mismatches = update_page(page, items)
+    except ValueError as e:
+        print(f"ERROR: {page_path}: {e}, render it with Quarto instead")
+        sys.exit(2)
+    # reading-time / word-count など Quarto にしか作れない属性があるので、
+    # 前回の Quarto のカードと同じにならない記事（新しい記事・項目が変わった記事）があれば Quarto に回す
+    if mismatches:
+        fallback(f"{len(mismatches)} cards differ from the last render "
+                 f"({', '.join(path for path, _, _ in mismatches[:3])}{', ...' if len(mismatches) > 3 else ''})")
+    changed = [p.name for p, text in (
+        (page_path, page),
+        (docs_dir / "listings.json", update_listings_json(docs_dir / "listings.json", items, f"/{args.page}")),
+    ) if text is not None and _write_if_changed(p, text)]
+    index.save()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    s = index.stats
+    print(f"{len(items)} posts in {elapsed_ms:.1f}ms (reused {s['hits']}, rehashed {s['rehashed']}, "
+          f"read {s['misses']}, removed {s['removed']})")
+    print(f"Updated: {', '.join(changed)}" if changed else "Listing unchanged")
+
+
+if __name__ == "__main__":
+    main()
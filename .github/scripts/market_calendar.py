@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+市場休場日と定例経済指標の発表日を規則から計算するカレンダー
+
+post_weekly_calendar.py の休場日とフォールバック用イベントに使う。
+休場日と発表日を年の範囲ぶん計算して日付順の配列にしておき、期間の問い合わせは
+bisect で両端を探して切り出す（1回の問い合わせは配列の長さに対して O(log n)）。
+
+    NYSE: 元日・キング牧師記念日・大統領の日・聖金曜日・戦没者追悼記念日・
+          ジューンティーンス・独立記念日・労働者の日・感謝祭・クリスマス
+          （土曜は前の金曜、日曜は翌月曜に振替。ただし土曜の元日は振替なし）
+    JPX:  国民の祝日・振替休日・国民の休日と年末年始（12/31〜1/3）
+    発表: 米国雇用統計（第1金曜、休場なら前営業日）、米国CPI（10日以降の最初の水曜、目安）、
+          FOMC（FOMC_MEETINGS の日程表）。米国の発表時刻は ET を JST に換算する
+
+使用方法:
+    python market_calendar.py 2026-11-23 2026-11-29
+    python market_calendar.py 2027-01-01 2027-12-31 --market JPX
+"""
+
+import sys
+import argparse
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+JST = ZoneInfo("Asia/Tokyo")
+ET = ZoneInfo("America/New_York")
+
+# FOMC の日程（2日目＝声明発表日）。年ごとに FRB の公表に合わせて追加する
+FOMC_MEETINGS = {
+    2026: ["01-28", "03-18", "04-29", "06-17", "07-29", "09-16", "10-28", "12-09"],
+}
+
+OBSERVED_SUFFIX = "（振替）"
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """month の第 n weekday（n = -1 で最終）"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def easter(year: int) -> date:
+    """復活祭（グレゴリオ暦、匿名のアルゴリズム）"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed_us(d: date, name: str, saturday_to_friday: bool = True) -> tuple[date, str] | None:
+    if d.weekday() == 5:
+        return (d - timedelta(days=1), name + OBSERVED_SUFFIX) if saturday_to_friday else None
+    if d.weekday() == 6:
+        return d + timedelta(days=1), name + OBSERVED_SUFFIX
+    return d, name
+
+
+def nyse_holidays(year: int) -> list[tuple[date, str]]:
+    """NYSE の休場日"""
+    rules = [
+        # 土曜の元日は前年の 12/31 に振り替えない（NYSE の規則）
+        _observed_us(date(year, 1, 1), "元日", saturday_to_friday=False),
+        (nth_weekday(year, 1, 0, 3), "キング牧師記念日"),
+        (nth_weekday(year, 2, 0, 3), "大統領の日"),
+        (easter(year) - timedelta(days=2), "聖金曜日"),
+        (nth_weekday(year, 5, 0, -1), "戦没者追悼記念日"),
+        _observed_us(date(year, 6, 19), "ジューンティーンス") if year >= 2022 else None,
+        _observed_us(date(year, 7, 4), "独立記念日"),
+        (nth_weekday(year, 9, 0, 1), "労働者の日"),
+        (nth_weekday(year, 11, 3, 4), "感謝祭"),
+        _observed_us(date(year, 12, 25), "クリスマス"),
+    ]
+    return sorted(r for r in rules if r)
+
+
+def _equinox(year: int, base: float) -> int:
+    # 1980〜2099 年に有効な近似式
+    return int(base + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def japan_holidays(year: int) -> list[tuple[date, str]]:
+    """国民の祝日・振替休日・国民の休日（2022 年以降の祝日法）"""
+    days = {
+        date(year, 1, 1): "元日",
+        nth_weekday(year, 1, 0, 2): "成人の日",
+        date(year, 2, 11): "建国記念の日",
+        date(year, 2, 23): "天皇誕生日",
+        date(year, 3, _equinox(year, 20.8431)): "春分の日",
+        date(year, 4, 29): "昭和の日",
+        date(year, 5, 3): "憲法記念日",
+        date(year, 5, 4): "みどりの日",
+        date(year, 5, 5): "こどもの日",
+        nth_weekday(year, 7, 0, 3): "海の日",
+        date(year, 8, 11): "山の日",
+        nth_weekday(year, 9, 0, 3): "敬老の日",
+        date(year, 9, _equinox(year, 23.2488)): "秋分の日",
+        nth_weekday(year, 10, 0, 2): "スポーツの日",
+        date(year, 11, 3): "文化の日",
+        date(year, 11, 23): "勤労感謝の日",
+    }
+    # 国民の休日: 前後を祝日に挟まれた平日
+    for d in sorted(days):
+        between = d + timedelta(days=1)
+        if between not in days and between + timedelta(days=1) in days and between.weekday() != 6:
+            days[between] = "国民の休日"
+    # 振替休日: 日曜の祝日の後の最初の祝日でない日
+    for d in sorted(days):
+        if d.weekday() == 6:
+            sub = d + timedelta(days=1)
+            while sub in days:
+                sub += timedelta(days=1)
+            days[sub] = "振替休日"
+    return sorted(days.items())
+
+
+def jpx_holidays(year: int) -> list[tuple[date, str]]:
+    """JPX の休場日（祝日と年末年始。土日に重なるものも含む）"""
+    days = dict(japan_holidays(year))
+    for d, name in ((date(year, 1, 2), "年始休業"), (date(year, 1, 3), "年始休業"),
+                    (date(year, 12, 31), "年末休業")):
+        days.setdefault(d, name)
+    return sorted(days.items())
+
+
+HOLIDAY_RULES = {"NYSE": nyse_holidays, "JPX": jpx_holidays}
+
+
+def _us_release(d: date, hour: int, minute: int, summary: str, importance: str) -> dict:
+    """ET の発表時刻を JST のイベントにする"""
+    dt = datetime.combine(d, time(hour, minute), tzinfo=ET).astimezone(JST)
+    return {
+        "date": dt.date(),
+        "datetime": dt,
+        "time": dt.strftime("%H:%M"),
+        "summary": summary,
+        "importance": importance,
+    }
+
+
+def us_releases(year: int, closed: set[date]) -> list[dict]:
+    """米国の定例指標の発表予定（closed は NYSE の休場日）"""
+    def business_day_before(d: date) -> date:
+        while d in closed or d.weekday() >= 5:
+            d -= timedelta(days=1)
+        return d
+
+    events = []
+    for month in range(1, 13):
+        # 雇用統計: 第1金曜（休場日なら前営業日。前営業日が前月になるなら翌週の金曜）
+        first_friday = nth_weekday(year, month, 4, 1)
+        nfp = business_day_before(first_friday)
+        if nfp.month != month:
+            nfp = first_friday + timedelta(days=7)
+        events.append(_us_release(nfp, 8, 30, "米国雇用統計・失業率", "high"))
+        # CPI: 10日以降の最初の水曜を目安にする
+        tenth = date(year, month, 10)
+        cpi = tenth + timedelta(days=(2 - tenth.weekday()) % 7)
+        events.append(_us_release(cpi, 8, 30, "米国消費者物価指数(CPI)", "high"))
+    for md in FOMC_MEETINGS.get(year, []):
+        d = date(year, int(md[:2]), int(md[3:]))
+        events.append(_us_release(d, 14, 0, "FOMC 政策金利発表", "high"))
+    return events
+
+
+class MarketCalendar:
+    """年の範囲ぶんの休場日と発表予定を日付順の配列に持つカレンダー"""
+
+    def __init__(self, first_year: int, last_year: int):
+        self.first_year = first_year
+        self.last_year = last_year
+        years = range(first_year, last_year + 1)
+
+        self._holidays: dict[str, tuple[list[date], list[str]]] = {}
+        for market, rule in HOLIDAY_RULES.items():
+            rows = sorted(row for year in years for row in rule(year))
+            self._holidays[market] = ([d for d, _ in rows], [name for _, name in rows])
+
+        closed = set(self._holidays["NYSE"][0])
+        releases = sorted(
+            (e for year in years for e in us_releases(year, closed)),
+            key=lambda e: e["datetime"],
+        )
+        self._release_dates = [e["date"] for e in releases]
+        self._releases = releases
+
+    def _check(self, start: date, end: date) -> None:
+        if start.year < self.first_year or end.year > self.last_year:
+            raise ValueError(
+                f"{start}..{end} is outside the calendar years {self.first_year}..{self.last_year}"
+            )
+
+    def holidays(self, start: date, end: date, market: str = "NYSE") -> list[tuple[str, str]]:
+        """期間 [start, end] の休場日を [(YYYY-MM-DD, 休場名)] で返す"""
+        self._check(start, end)
+        dates, names = self._holidays[market]
+        lo, hi = bisect_left(dates, start), bisect_right(dates, end)
+        return [(d.strftime("%Y-%m-%d"), name) for d, name in zip(dates[lo:hi], names[lo:hi])]
+
+    def is_trading_day(self, d: date, market: str = "NYSE") -> bool:
+        self._check(d, d)
+        dates = self._holidays[market][0]
+        i = bisect_left(dates, d)
+        return d.weekday() < 5 and not (i < len(dates) and dates[i] == d)
+
+    def releases(self, start: date, end: date) -> list[dict]:
+        """期間 [start, end]（JST の日付）の定例指標の発表予定"""
+        self._check(start, end)
+        lo, hi = bisect_left(self._release_dates, start), bisect_right(self._release_dates, end)
+        return [dict(e) for e in self._releases[lo:hi]]
+
+
+@lru_cache(maxsize=8)
+def _calendar(first_year: int, last_year: int) -> MarketCalendar:
+    return MarketCalendar(first_year, last_year)
+
+
+def calendar_for(start: date, end: date) -> MarketCalendar:
+    """期間を含むカレンダー（前後1年の余裕を持たせ、同じ範囲はプロセス内で使い回す）"""
+    return _calendar(start.year - 1, end.year + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show market holidays and scheduled releases")
+    parser.add_argument("start", type=str, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("end", type=str, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--market", choices=sorted(HOLIDAY_RULES), default="NYSE")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date()
+    if end < start:
+        print("ERROR: end date is before start date")
+        sys.exit(1)
+
+    cal = calendar_for(start, end)
+    print(f"{args.market} holidays:")
+    for day, name in cal.holidays(start, end, args.market) or [("-", "none")]:
+        print(f"  {day}  {name}")
+    print("Scheduled releases (JST):")
+    for e in cal.releases(start, end):
+        print(f"  {e['datetime']:%Y-%m-%d %H:%M}  {e['summary']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+チャートの元データ（XHR/JSON レスポンス）から価格系列を取り出すユーティリティ
+
+capture_sunday_markets.py の --capture-mode network で使用する。
+レスポンスの形式はサイトごとに異なるため、以下のような一般的な形を総当たりで探す。
+
+    [[1700000000, 38000.5], ...]                 # [時刻, 価格]
+    [[1700000000000, o, h, l, c], ...]           # [時刻, 始値, 高値, 安値, 終値]
+    [{"t": "...", "c": 38000.5}, ...]            # オブジェクトの配列
+    {"time": [...], "close": [...]}              # 列ごとの配列
+
+使用方法（記録済みレスポンスから系列を抽出して確認）:
+    python market_series.py response.json
+"""
+
+import re
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+JST = ZoneInfo("Asia/Tokyo")
+
+# これより短い配列は価格系列とみなさない
+MIN_TICKS = 5
+
+TIME_KEYS = ("t", "time", "timestamp", "ts", "date", "datetime", "x")
+PRICE_KEYS = ("c", "close", "price", "value", "last", "y")
+PREV_CLOSE_KEYS = ("prev_close", "previous_close", "previousClose", "prevClose", "pc", "base")
+
+_JSONP_RE = re.compile(r"^[\w.$]+\s*\(\s*(.*)\s*\)\s*;?\s*$", re.DOTALL)
+_TIME_FORMATS = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S",
+                 "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M", "%Y%m%d%H%M%S", "%Y%m%d%H%M")
+
+
+def parse_payload(text: str):
+    """JSON または JSONP のレスポンス本文をパースする（失敗時は None）"""
+    text = text.strip()
+    if not text:
+        return None
+    m = _JSONP_RE.match(text)
+    if m and not text.startswith(("{", "[")):
+        text = m.group(1)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _as_number(value) -> float | None:
+    """数値または数値文字列を float にする"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", ""))
+        except ValueError:
+            return None
+    return None
+
+
+def _as_epoch(value) -> float | None:
+    """時刻らしき値を UNIX 秒に変換する（ミリ秒・日時文字列にも対応）"""
+    num = _as_number(value)
+    if num is not None:
+        if num > 1e12:
+            return num / 1000
+        if num > 1e9:
+            return num
+        return None
+    if isinstance(value, str):
+        text = value.strip().replace("Z", "+00:00")
+        try:
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            dt = None
+            for fmt in _TIME_FORMATS:
+                try:
+                    dt = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+        if dt is None:
+            return None
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=JST)
+        return dt.timestamp()
+    return None
+
+
+def _as_tick(item) -> tuple[float, float] | None:
+    """配列1要素を (時刻, 価格) に変換する"""
+    if isinstance(item, (list, tuple)) and len(item) >= 2:
+        ts = _as_epoch(item[0])
+        price = _as_number(item[4] if len(item) >= 5 else item[1])
+    elif isinstance(item, dict):
+        ts = next((_as_epoch(item[k]) for k in TIME_KEYS if k in item), None)
+        price = next((_as_number(item[k]) for k in PRICE_KEYS if k in item), None)
+    else:
+        return None
+    if ts is None or price is None or price <= 0:
+        return None
+    return ts, price
+
+
+def _series_from_list(items: list) -> list[tuple[float, float]] | None:
+    """リストが時系列なら (時刻, 価格) のリストを返す"""
+    if len(items) < MIN_TICKS:
+        return None
+    ticks = []
+    for item in items:
+        tick = _as_tick(item)
+        if tick is None:
+            return None
+        ticks.append(tick)
+    if any(b[0] < a[0] for a, b in zip(ticks, ticks[1:])):
+        ticks.sort()
+    return ticks
+
+
+def _series_from_columns(obj: dict) -> list[tuple[float, float]] | None:
+    """{"time": [...], "close": [...]} 形式を (時刻, 価格) のリストにする"""
+    times = next((obj[k] for k in TIME_KEYS if isinstance(obj.get(k), list)), None)
+    prices = next((obj[k] for k in PRICE_KEYS if isinstance(obj.get(k), list)), None)
+    if not times or not prices or len(times) != len(prices):
+        return None
+    return _series_from_list([[t, p] for t, p in zip(times, prices)])
+
+
+def find_series(payload) -> list[list[tuple[float, float]]]:
+    """payload 内の価格系列の候補をすべて返す"""
+    found = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            series = _series_from_list(node)
+            if series:
+                found.append(series)
+                continue
+            stack.extend(x for x in node if isinstance(x, (list, dict)))
+        elif isinstance(node, dict):
+            series = _series_from_columns(node)
+            if series:
+                found.append(series)
+            stack.extend(v for v in node.values() if isinstance(v, (list, dict)))
+    return found
+
+
+def find_prev_close(payload) -> float | None:
+    """payload 内の前日終値らしき値を探す"""
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key in PREV_CLOSE_KEYS:
+                value = _as_number(node.get(key))
+                if value is not None and value > 0:
+                    return value
+            stack.extend(v for v in node.values() if isinstance(v, (list, dict)))
+        elif isinstance(node, list):
+            stack.extend(x for x in node if isinstance(x, dict))
+    return None
+
+
+def best_series(payloads: list[tuple[str, object]]) -> dict | None:
+    """(URL, payload) のリストから最も長い価格系列を選ぶ（同数なら後のレスポンス）
+
+    Returns:
+        {"url", "ticks": [{"ts", "price"}], "prev_close"} または None
+    """
+    best = None
+    for url, payload in payloads:
+        for series in find_series(payload):
+            if best is None or len(series) >= len(best["ticks"]):
+                best = {
+                    "url": url,
+                    "ticks": [{"ts": ts, "price": price} for ts, price in series],
+                    "prev_close": find_prev_close(payload),
+                }
+    return best
+
+
+def summarize_series(series: dict) -> dict:
+    """系列から現在値・変動額・変動率を求める
+
+    前日終値がレスポンスにあればそれを基準に、なければ系列の最初の値を基準にする。
+    """
+    ticks = series["ticks"]
+    value = ticks[-1]["price"]
+    base = series.get("prev_close") or ticks[0]["price"]
+    change = value - base
+    return {
+        "value": value,
+        "change": round(change, 4),
+        "change_pct": round(change / base * 100, 2) if base else None,
+        "source": "network",
+        "ticks": len(ticks),
+        "as_of": datetime.fromtimestamp(ticks[-1]["ts"], JST).isoformat(),
+    }
+
+
+def render_series_chart(
+    ticks: list[dict], path: Path, is_fx: bool = False, size: tuple[int, int] = (610, 430)
+) -> bool:
+    """価格系列から簡易ラインチャート PNG を描画する（Pillow が必要）"""
+    if Image is None or len(ticks) < 2:
+        if Image is None:
+            print("WARNING: Pillow not installed, cannot render series chart")
+        return False
+
+    width, height = size
+    pad_l, pad_r, pad_t, pad_b = 10, 80, 20, 30
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+
+    prices = [t["price"] for t in ticks]
+    t0, t1 = ticks[0]["ts"], ticks[-1]["ts"]
+    lo, hi = min(prices), max(prices)
+    span_t = (t1 - t0) or 1
+    span_p = (hi - lo) or 1
+
+    def xy(tick: dict) -> tuple[float, float]:
+        x = pad_l + (tick["ts"] - t0) / span_t * (width - pad_l - pad_r)
+        y = pad_t + (hi - tick["price"]) / span_p * (height - pad_t - pad_b)
+        return x, y
+
+    for frac in (0, 0.25, 0.5, 0.75, 1):
+        y = pad_t + frac * (height - pad_t - pad_b)
+        draw.line([(pad_l, y), (width - pad_r, y)], fill="#e5e5e5")
+        label = hi - frac * span_p
+        draw.text((width - pad_r + 6, y - 6), f"{label:.2f}" if is_fx else f"{label:,.0f}",
+                  fill="#555555")
+
+    color = "#1a9850" if prices[-1] >= prices[0] else "#d73027"
+    draw.line([xy(t) for t in ticks], fill=color, width=2)
+
+    for tick in (ticks[0], ticks[-1]):
+        stamp = datetime.fromtimestamp(tick["ts"], JST).strftime("%m/%d %H:%M")
+        x, _ = xy(tick)
+        draw.text((min(x, width - pad_r - 70), height - pad_b + 8), stamp, fill="#555555")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    img.save(path, format="PNG", optimize=True)
+    return True
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: market_series.py <response.json> [...]")
+        sys.exit(1)
+
+    payloads = []
+    for arg in sys.argv[1:]:
+        payload = parse_payload(Path(arg).read_text(encoding="utf-8"))
+        if payload is None:
+            print(f"WARNING: Not JSON/JSONP: {arg}")
+            continue
+        payloads.append((arg, payload))
+
+    series = best_series(payloads)
+    if not series:
+        print("No price series found")
+        sys.exit(1)
+    print(f"Best series: {series['url']} ({len(series['ticks'])} ticks)")
+    print(json.dumps(summarize_series(series), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+投稿用チャート画像のプリフライト（縮小・圧縮・採点）と、内容ハッシュによるキャッシュ
+
+post_to_x.py が記事の候補画像（figure-html/*.png と chart-1.png）をそのまま上げる代わりに使う。
+各候補を X の推奨サイズ（長辺 1600px）まで縮小し、透過を白で塗りつぶして減色圧縮し、
+MAX_UPLOAD_BYTES に収まらなければさらに縮小する（最後は JPEG）。
+縦横比・描画量・解像度から点数を付け、ソート順ではなく点数の最も高い画像を選ぶ。
+
+結果は元画像の SHA-256 をキーにディスクに保存するので、再実行や再試行で同じ図を
+作り直すことはない（設定を変えるとキャッシュは無効になる）。Pillow がなければ
+候補の先頭をそのまま使う。
+
+ディレクトリ構成:
+    <cache_dir>/<sha256(元画像)>.json   {"settings", "width", "height", "format", "bytes", "quality", ...}
+    <cache_dir>/<sha256(元画像)>.png    プリフライト後の画像（JPEG にしたときは .jpg）
+
+使用方法（候補の採点とキャッシュの効果を確認）:
+    python media_preflight.py docs/quarto/latest/posts/2026-04-28-tidytuesday/index_files/figure-html/*.png
+    python media_preflight.py <画像...> --cache-dir tmp/media_cache --output-dir tmp/preflight
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from chart_images import QUANTIZE_COLORS
+
+MEDIA_CACHE_DIR = "tmp/media_cache"
+
+MAX_WIDTH = 1600   # X の推奨（1600x900）に合わせる。縦長の図は高さ側で揃える
+MAX_HEIGHT = 1600
+MAX_UPLOAD_BYTES = 1_000_000  # X の上限は 5MB だが、Bluesky（1MB）にも同じ画像を送れるように揃える
+MIN_SCALE = 0.4               # これ以上縮めても収まらなければ JPEG にする
+JPEG_QUALITY = 85
+TARGET_ASPECT = 16 / 9        # タイムライン上でトリミングされない縦横比
+TARGET_PIXELS = 1200 * 675    # これ未満の画像は解像度の点を下げる
+INK_SATURATION = 0.3          # 背景以外の画素がこの割合あれば描画量は満点
+PREFERRED_NAMES = ("main", "combined", "overview", "summary", "hero")
+
+SETTINGS = {
+    "version": 1,
+    "max_width": MAX_WIDTH,
+    "max_height": MAX_HEIGHT,
+    "max_bytes": MAX_UPLOAD_BYTES,
+    "colors": QUANTIZE_COLORS,
+    "jpeg_quality": JPEG_QUALITY,
+}
+
+
+def _flatten(img: "Image.Image") -> "Image.Image":
+    """透過を白で塗りつぶした RGB にする（ダークモードで透過部分が黒く見えないように）"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        canvas = Image.new("RGB", rgba.size, "white")
+        canvas.paste(rgba, mask=rgba.getchannel("A"))
+        return canvas
+    return img.convert("RGB")
+
+
+def _encode_png(img: "Image.Image") -> bytes:
+    buf = io.BytesIO()
+    img.quantize(colors=QUANTIZE_COLORS, method=Image.Quantize.MEDIANCUT).save(
+        buf, format="PNG", optimize=True
+    )
+    return buf.getvalue()
+
+
+def _quality(img: "Image.Image") -> float:
+    """画像の内容だけで決まる点数（0〜1）: 縦横比 0.35、描画量 0.35、解像度 0.3"""
+    w, h = img.size
+    aspect = w / h
+    aspect_score = min(aspect, TARGET_ASPECT) / max(aspect, TARGET_ASPECT)
+
+    # 最も多い色を背景とみなし、そこから離れた画素の割合を描画量とする
+    gray = img.convert("L").resize((64, 64), Image.Resampling.BILINEAR)
+    histogram = gray.histogram()
+    background = max(range(256), key=histogram.__getitem__)
+    ink = sum(n for level, n in enumerate(histogram) if abs(level - background) > 16) / (64 * 64)
+    ink_score = min(1.0, ink / INK_SATURATION)
+
+    resolution_score = min(1.0, (w * h) / TARGET_PIXELS)
+    return round(0.35 * aspect_score + 0.35 * ink_score + 0.3 * resolution_score, 3)
+
+
+def preflight(data: bytes) -> tuple[bytes, dict]:
+    """画像を縮小・圧縮し、(バイト列, 情報) を返す
+
+    Returns:
+        (画像, {"width", "height", "format", "bytes", "source_width", "source_height",
+                "source_bytes", "quality"})
+    """
+    src = Image.open(io.BytesIO(data))
+    src.load()
+    img = _flatten(src)
+    # 縮小も透過の塗りつぶしも要らない PNG は、減色しても大きくなるなら元のまま使う
+    reusable = src.format == "PNG" and (
+        src.mode in ("RGB", "L") or (src.mode == "P" and "transparency" not in src.info)
+    )
+    w, h = img.size
+    scale = min(1.0, MAX_WIDTH / w, MAX_HEIGHT / h)
+    while True:
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        resized = img.resize(size, Image.Resampling.LANCZOS) if size != img.size else img
+        out, fmt = _encode_png(resized), "png"
+        if reusable and resized is img and len(data) < len(out):
+            out = data
+        if len(out) <= MAX_UPLOAD_BYTES or scale <= MIN_SCALE:
+            break
+        scale = max(MIN_SCALE, scale * 0.8)
+    if len(out) > MAX_UPLOAD_BYTES:
+        buf = io.BytesIO()
+        resized.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        out, fmt = buf.getvalue(), "jpeg"
+    return out, {
+        "width": resized.width,
+        "height": resized.height,
+        "format": fmt,
+        "bytes": len(out),
+        "source_width": w,
+        "source_height": h,
+        "source_bytes": len(data),
+        "quality": _quality(resized),
+    }
+
+
+class MediaCache:
+    """元画像の SHA-256 をキーにしたプリフライト結果のキャッシュ（cache_dir が None なら保存しない）"""
+
+    def __init__(self, cache_dir: Path | None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.memory: dict[str, tuple[bytes, dict]] = {}
+        self.stats = {"hits": 0, "misses": 0, "encode_ms": 0.0}
+
+    def _paths(self, key: str) -> tuple[Path, Path, Path]:
+        return (self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.png",
+                self.cache_dir / f"{key}.jpg")
+
+    def _load(self, key: str) -> tuple[bytes, dict] | None:
+        if self.cache_dir is None:
+            return None
+        meta_path, png_path, jpg_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("settings") != SETTINGS:
+                return None
+            data = (jpg_path if meta["format"] == "jpeg" else png_path).read_bytes()
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+        return (data, meta) if len(data) == meta["bytes"] else None
+
+    def _store(self, key: str, data: bytes, meta: dict) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        meta_path, png_path, jpg_path = self._paths(key)
+        image_path = jpg_path if meta["format"] == "jpeg" else png_path
+        # 画像を先に置き、メタデータは最後に差し替える（途中で止まっても壊れたヒットにならない）
+        tmp = image_path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, image_path)
+        tmp = meta_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, meta_path)
+
+    def get(self, data: bytes) -> tuple[bytes, dict]:
+        """プリフライト済みの画像と情報を返す（同じ内容の画像は一度しか作らない）"""
+        key = hashlib.sha256(data).hexdigest()
+        cached = self.memory.get(key) or self._load(key)
+        if cached:
+            self.stats["hits"] += 1
+            self.memory[key] = cached
+            return cached
+        self.stats["misses"] += 1
+        started = time.perf_counter()
+        out, info = preflight(data)
+        self.stats["encode_ms"] += (time.perf_counter() - started) * 1000
+        meta = {"settings": SETTINGS, "sha256": key, **info}
+        if self.cache_dir is not None:
+            self._store(key, out, meta)
+        self.memory[key] = (out, meta)
+        return out, meta
+
+
+def upload_name(path: Path, meta: dict) -> str:
+    """アップロード時のファイル名（JPEG にしたときは拡張子も変える）"""
+    return path.with_suffix(".jpg").name if meta.get("format") == "jpeg" else path.name
+
+
+def score(path: Path, meta: dict) -> float:
+    """候補の点数（内容の点数に、メインの図らしいファイル名なら 0.1 を足す）"""
+    bonus = 0.1 if any(word in path.stem.lower() for word in PREFERRED_NAMES) else 0.0
+    return round(meta["quality"] + bonus, 3)
+
+
+def select_image(
+    candidates: list[Path], cache: MediaCache
+) -> tuple[tuple[str, bytes] | None, list[dict]]:
+    """候補をプリフライトして最も点数の高い画像を選ぶ
+
+    Returns:
+        ((ファイル名, バイト列) または None, 点数の高い順の [{"path", "score", ...プリフライト情報}])
+    """
+    if not candidates:
+        return None, []
+    if Image is None:
+        print("WARNING: Pillow not installed, uploading the first chart image as rendered")
+        path = candidates[0]
+        return (path.name, path.read_bytes()), [{"path": path, "score": None}]
+
+    ranked = []
+    for path in candidates:
+        data, meta = cache.get(path.read_bytes())
+        ranked.append({"path": path, "score": score(path, meta), "data": data, **meta})
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    best = ranked[0]
+    return (upload_name(best["path"], best), best["data"]), ranked
+
+
+def format_ranking(ranked: list[dict]) -> str:
+    """select_image の採点結果を1行ずつ表す"""
+    lines = []
+    for i, r in enumerate(ranked):
+        if r["score"] is None:
+            lines.append(f"  * {r['path'].name}")
+            continue
+        lines.append(
+            f"  {'*' if i == 0 else ' '} {r['path'].name:<36} score {r['score']:.3f}  "
+            f"{r['source_width']}x{r['source_height']} {r['source_bytes'] / 1024:5.0f} KB -> "
+            f"{r['width']}x{r['height']} {r['bytes'] / 1024:4.0f} KB ({r['format']})"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preflight and rank chart images for posting")
+    parser.add_argument("images", nargs="+", type=str, help="Candidate PNG files")
+    parser.add_argument("--cache-dir", type=str, default=MEDIA_CACHE_DIR,
+                        help=f"Preflight cache (default: {MEDIA_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    parser.add_argument("--output-dir", type=str, default=None, help="Write the chosen image here")
+    args = parser.parse_args()
+
+    if Image is None:
+        print("ERROR: Pillow is not installed. Run: pip install pillow")
+        sys.exit(1)
+
+    cache = MediaCache(None if args.no_cache else Path(args.cache_dir))
+    started = time.perf_counter()
+    chosen, ranked = select_image([Path(p) for p in args.images], cache)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(format_ranking(ranked))
+    s = cache.stats
+    print(f"{len(ranked)} candidates in {elapsed_ms:.0f}ms "
+          f"(cached {s['hits']}, encoded {s['misses']} in {s['encode_ms']:.0f}ms)")
+    if args.output_dir and chosen:
+        out = Path(args.output_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        name, data = chosen
+        (out / name).write_bytes(data)
+        print(f"Wrote {out / name} ({len(data) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+チャートページ読み込み時のリクエストフィルタ（ネットワークポリシー）
+
+capture_sunday_markets.py がページごとに広告・計測・フォントなどのリクエストを
+ブロックし、リクエスト数・転送量と削減量の見積もりを集計する。
+ポリシーは既定値に registry JSON（sunday_targets.json）の "network" を重ねたもの。
+
+使用方法（URL がブロックされるか確認）:
+    python network_policy.py https://www.googletagmanager.com/gtm.js --type script
+    python network_policy.py https://example.com/a.woff2 --type font --page https://nikkei225jp.com/_ssi/if/?c=731
+"""
+
+import io
+import sys
+import json
+import argparse
+from pathlib import Path
+from urllib.parse import urlsplit
+
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+
+from sunday_targets import DEFAULT_TARGETS_FILE
+
+# ページ読み込み時にブロックするリクエスト（registry JSON の "network" で上書き可能）
+DEFAULT_NETWORK_POLICY = {
+    "block_resource_types": ["font", "media"],
+    "block_third_party": False,
+    "allow_domains": ["nikkei225jp.com"],
+    "deny_domains": [
+        "doubleclick.net", "googlesyndication.com", "googletagservices.com",
+        "googletagmanager.com", "google-analytics.com", "adservice.google.com",
+        "amazon-adsystem.com", "adnxs.com", "criteo.com", "criteo.net",
+        "rubiconproject.com", "pubmatic.com", "taboola.com", "outbrain.com",
+        "scorecardresearch.com", "facebook.net", "platform.twitter.com",
+        "microad.jp", "i-mobile.co.jp", "fluct.jp", "gsspcln.jp",
+        "ad-stir.com", "logly.co.jp", "impact-ad.jp", "adingo.jp",
+        "clarity.ms", "hotjar.com",
+    ],
+}
+
+# ブロックしたリクエストの削減量見積もりに使う典型的なサイズ（bytes）
+TYPICAL_RESOURCE_BYTES = {
+    "font": 40_000,
+    "media": 250_000,
+    "image": 25_000,
+    "script": 60_000,
+    "stylesheet": 20_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "document": 30_000,
+}
+
+
+def load_network_policy(path: Path | None = None, enabled: bool = True) -> dict:
+    """リクエストフィルタの設定を registry JSON の "network" から読み込む"""
+    policy = {k: (list(v) if isinstance(v, list) else v)
+              for k, v in DEFAULT_NETWORK_POLICY.items()}
+    policy["enabled"] = enabled
+    path = path or DEFAULT_TARGETS_FILE
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f).get("network", {})
+        for key, value in overrides.items():
+            if key in policy:
+                policy[key] = value
+            else:
+                print(f"WARNING: Unknown network policy key: {key}")
+    return policy
+
+
+def _domain_matches(host: str, domains: list[str]) -> bool:
+    """host が domains のいずれか（またはそのサブドメイン）に一致するか"""
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def _block_reason(policy: dict, resource_type: str, host: str, first_party: str) -> str | None:
+    """リクエストをブロックする理由を返す（通す場合は None）"""
+    if not policy.get("enabled", True):
+        return None
+    if _domain_matches(host, policy["allow_domains"]) or host == first_party:
+        return "type" if resource_type in policy["block_resource_types"] else None
+    if _domain_matches(host, policy["deny_domains"]):
+        return "deny"
+    if resource_type in policy["block_resource_types"]:
+        return "type"
+    if policy["block_third_party"]:
+        return "third_party"
+    return None
+
+
+async def install_request_filter(page, policy: dict, target_url: str) -> dict:
+    """ページにリクエストフィルタを仕掛け、リクエスト数・転送量の集計 dict を返す"""
+    first_party = urlsplit(target_url).hostname or ""
+    stats = {
+        "requests": 0,
+        "blocked": 0,
+        "blocked_by_reason": {},
+        "bytes_transferred": 0,
+        "bytes_avoided_est": 0,
+    }
+
+    async def handle_route(route):
+        request = route.request
+        stats["requests"] += 1
+        host = urlsplit(request.url).hostname or ""
+        reason = _block_reason(policy, request.resource_type, host, first_party)
+        if reason is None:
+            # 後段のハンドラ（リプレイ）があればそちらへ、なければそのまま通信する
+            await route.fallback()
+            return
+        stats["blocked"] += 1
+        stats["blocked_by_reason"][reason] = stats["blocked_by_reason"].get(reason, 0) + 1
+        stats["bytes_avoided_est"] += TYPICAL_RESOURCE_BYTES.get(request.resource_type, 10_000)
+        await route.abort("blockedbyclient")
+
+    async def on_request_finished(request):
+        try:
+            sizes = await request.sizes()
+            stats["bytes_transferred"] += (
+                sizes["responseBodySize"] + sizes["responseHeadersSize"]
+            )
+        except Exception:
+            pass
+
+    await page.route("**/*", handle_route)
+    page.on("requestfinished", on_request_finished)
+    return stats
+
+
+def format_network_stats(stats: dict) -> str:
+    """ネットワーク集計を1行の文字列にする"""
+    reasons = ", ".join(f"{k}={v}" for k, v in sorted(stats["blocked_by_reason"].items()))
+    return (
+        f"{stats['requests']} requests ({stats['blocked']} blocked"
+        f"{': ' + reasons if reasons else ''}), "
+        f"{stats['bytes_transferred'] / 1024:.0f} KB transferred, "
+        f"~{stats['bytes_avoided_est'] / 1024:.0f} KB avoided (est.)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check which requests the network policy blocks")
+    parser.add_argument("urls", nargs="+", help="Request URLs")
+    parser.add_argument("--type", default="script", help="Resource type (default: script)")
+    parser.add_argument("--page", default="https://nikkei225jp.com/", help="Page URL (first party)")
+    parser.add_argument("--targets", type=Path, default=None, help="Target registry JSON")
+    args = parser.parse_args()
+
+    policy = load_network_policy(args.targets)
+    first_party = urlsplit(args.page).hostname or ""
+    for url in args.urls:
+        reason = _block_reason(policy, args.type, urlsplit(url).hostname or "", first_party)
+        print(f"  {'blocked (' + reason + ')' if reason else 'allowed':<20} {url}")
+
+
+if __name__ == "__main__":
+    main()
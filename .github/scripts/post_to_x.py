@@ -2,72 +2,74 @@
 """
 X (Twitter) 自動投稿スクリプト
 
-各記事の index.qmd の YAML frontmatter (`x-posted: false`) をスキャンし、
-最古の未投稿記事を X に投稿する。投稿後は `x-posted: true` に更新。
+各記事の index.qmd の YAML frontmatter をスキャンし、未投稿の記事を古い順に X に投稿する。
+投稿済みかどうかは投稿台帳（posting_ledger.py、追記のみの JSONL）で判断し、投稿後は
+台帳に1行追記する（index.qmd は書き換えない）。台帳以前の記事は `x-posted: true` を投稿済みとみなす。
+
+複数のタイプ・複数の記事を1回の実行でまとめて投稿できる（投稿の間隔は --interval 秒）。
+添付画像は記事のチャート画像を縮小・圧縮して採点し、最も点数の高いものを選ぶ（media_preflight.py）。
+Bluesky / Mastodon の認証情報があれば同じ記事を同時に投稿する（publishers.py）。
+X に投稿できなかった記事を次の実行で投稿し直すときは、前回投稿できた投稿先には投稿しない。
 
 使用方法:
     python post_to_x.py --type makeover-monday
     python post_to_x.py --type tidytuesday
     python post_to_x.py --type makeover-monday --dry-run
+    python post_to_x.py --type makeover-monday tidytuesday --max-posts 3
 """
 
 import os
-import re
 import sys
+import time
 import argparse
 from pathlib import Path
 
-try:
-    import tweepy
-except ImportError:
-    print("ERROR: tweepy is not installed. Run: pip install tweepy")
-    sys.exit(1)
+from tweet_composer import compose, section, weighted_length
+from frontmatter_index import FrontmatterIndex, read_frontmatter
+from posting_ledger import LEDGER_PATH, PENDING, PostingLedger
+from x_client import XError, shared_client
+from publishers import PLATFORMS, build_publishers, make_post, primary_result, publish
+from media_preflight import MEDIA_CACHE_DIR, MediaCache, format_ranking, select_image
 
 
 QUARTO_POSTS_DIR = "scripts/by_timeSeries/quarto/posts"
 DOCS_POSTS_DIR = "docs/quarto/latest/posts"
 BASE_URL = "https://chiquitos-jp.github.io/trading-dashboard/quarto/latest/posts"
+FRONTMATTER_INDEX = "tmp/frontmatter_index.json"
+POST_TYPES = ["makeover-monday", "tidytuesday"]
+POST_INTERVAL = 60  # 同じ実行内で続けて投稿するときの間隔（秒）
 
 
 def extract_frontmatter(qmd_file: Path) -> dict:
-    """QMD ファイルから YAML frontmatter を簡易パースする。"""
-    content = qmd_file.read_text(encoding="utf-8")
-    match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
-    if not match:
-        return {}
-
-    yaml_text = match.group(1)
-    fm = {}
-    for key in ("title", "description", "date", "x-posted"):
-        m = re.search(rf'^{re.escape(key)}:\s*["\']?(.+?)["\']?\s*$', yaml_text, re.MULTILINE)
-        if m:
-            val = m.group(1).strip("\"'")
-            if key == "x-posted":
-                fm[key] = val.lower() == "true"
-            else:
-                fm[key] = val
-
-    twitter_desc = re.search(
-        r'twitter-card:.*?description:\s*["\']?(.+?)["\']?\s*$',
-        yaml_text, re.DOTALL | re.MULTILINE,
-    )
-    if twitter_desc:
-        fm["twitter_description"] = twitter_desc.group(1).strip("\"'")
+    """QMD ファイルから YAML frontmatter を簡易パースする（閉じの --- までしか読まない）。"""
+    return read_frontmatter(qmd_file)
 
-    return fm
 
+def scan_posts(
+    project_root: Path,
+    post_type: str,
+    index: FrontmatterIndex | None = None,
+    ledger: PostingLedger | None = None,
+) -> list[dict]:
+    """指定タイプの全記事をスキャンし、メタデータのリストを返す。
 
-def scan_posts(project_root: Path, post_type: str) -> list[dict]:
-    """指定タイプの全記事をスキャンし、メタデータのリストを返す。"""
+    index があれば、前回から mtime とサイズが変わっていない記事はファイルを開かない。
+    ledger があれば、台帳に載っている記事も投稿済み（x_posted）とする。
+    """
     pattern = f"*-{post_type}"
     posts_dir = project_root / QUARTO_POSTS_DIR
     results = []
+    seen = set()
 
     for post_dir in sorted(posts_dir.glob(pattern)):
         qmd = post_dir / "index.qmd"
         if not qmd.exists():
             continue
-        fm = extract_frontmatter(qmd)
+        if index is not None:
+            fm = index.get(qmd)
+            seen.add(index.key(qmd))
+        else:
+            fm = extract_frontmatter(qmd)
         if not fm.get("title"):
             continue
         date = fm.get("date", post_dir.name[:10])
@@ -78,139 +80,114 @@ def scan_posts(project_root: Path, post_type: str) -> list[dict]:
             "title": fm["title"],
             "description": fm.get("twitter_description") or fm.get("description", ""),
             "url": f"{BASE_URL}/{post_dir.name}/",
-            "x_posted": fm.get("x-posted", False),
+            "x_posted": fm.get("x-posted", False) or bool(ledger and ledger.is_posted(post_dir.name)),
         })
 
+    if index is not None:
+        index.prune(seen, f"{pattern}/index.qmd")
+        index.save()
+
     results.sort(key=lambda x: x["date"])
     return results
 
 
-def get_oldest_unposted(posts: list[dict]) -> dict | None:
-    """最古の未投稿記事を返す。"""
-    for p in posts:
-        if not p["x_posted"]:
-            return p
-    return None
+def get_unposted(posts: list[dict], limit: int = 1) -> list[dict]:
+    """未投稿記事を古い順に最大 limit 件返す。"""
+    return [p for p in posts if not p["x_posted"]][:limit]
 
 
-def find_chart_image(item: dict, project_root: Path) -> Path | None:
-    """レンダリング済みチャート画像を検索する。"""
+def find_chart_images(item: dict, project_root: Path) -> list[Path]:
+    """レンダリング済みチャート画像の候補（figure-html の PNG と chart-1.png）を返す。"""
     docs_post = project_root / DOCS_POSTS_DIR / item["dir_name"]
 
+    candidates = []
     figure_dir = docs_post / "index_files" / "figure-html"
     if figure_dir.exists():
-        pngs = sorted(figure_dir.glob("*.png"))
-        if pngs:
-            return pngs[0]
+        candidates.extend(sorted(figure_dir.glob("*.png")))
 
     chart = docs_post / "chart-1.png"
     if chart.exists():
-        return chart
-
-    return None
+        candidates.append(chart)
 
+    return candidates
 
-def format_tweet(item: dict, post_type: str) -> str:
-    """ツイート本文を生成する。"""
-    title = item["title"]
-    description = item["description"]
-    url = item["url"]
 
+def tweet_sections(item: dict, post_type: str) -> list[dict]:
+    """投稿本文のセクション（タイトル・URL・ハッシュタグは必須、説明文は切り詰め可）。"""
     if post_type == "makeover-monday":
         hashtags = "#MakeoverMonday #MyMakeoverMonday #DataViz #Python"
     else:
         hashtags = "#TidyTuesday #MyTidyTuesday #DataViz #RStats"
 
-    tweet = f"{title}\n\n{description}\n\n{url}\n\n{hashtags}"
+    return [
+        section(item["title"], required=True),
+        section(item["description"] or [], priority=1, truncatable=True),
+        section(item["url"], required=True),
+        section(hashtags, required=True),
+    ]
 
-    check_length = len(tweet) - len(url) + 23
-    if check_length > 280:
-        max_desc = 280 - len(title) - 23 - len(hashtags) - 10
-        if max_desc > 0:
-            description = description[:max_desc] + "..."
-        tweet = f"{title}\n\n{description}\n\n{url}\n\n{hashtags}"
-
-    return tweet
 
+def format_tweet(item: dict, post_type: str) -> str:
+    """ツイート本文を生成する。収まらない場合は説明文を切り詰める。"""
+    return compose(tweet_sections(item, post_type))
 
-def mark_as_posted(qmd_path: Path) -> None:
-    """index.qmd の x-posted: false を x-posted: true に書き換える。"""
-    content = qmd_path.read_text(encoding="utf-8")
-    updated = re.sub(
-        r'^(x-posted:\s*)false\s*$',
-        r'\g<1>true',
-        content,
-        count=1,
-        flags=re.MULTILINE,
-    )
-    qmd_path.write_text(updated, encoding="utf-8")
-    print(f"Updated {qmd_path}: x-posted -> true")
 
+def post_to_x(
+    tweet: str, media: list[tuple[str, bytes]] | None = None, dry_run: bool = False,
+) -> tuple[bool, int, str | None]:
+    """X に投稿する。(success, http_status, tweet_id) を返す。
 
-def upload_media(image_path: Path, api_key: str, api_secret: str,
-                 access_token: str, access_token_secret: str) -> str | None:
-    """画像をアップロードして media_id を返す。"""
-    try:
-        auth = tweepy.OAuth1UserHandler(api_key, api_secret, access_token, access_token_secret)
-        api = tweepy.API(auth)
-        media = api.media_upload(filename=str(image_path))
-        print(f"Uploaded image: {image_path.name} (media_id: {media.media_id})")
-        return str(media.media_id)
-    except tweepy.TweepyException as e:
-        print(f"WARNING: Failed to upload image: {e}")
-        return None
-
-
-def post_to_x(tweet: str, image_path: Path | None = None, dry_run: bool = False) -> tuple[bool, int]:
-    """X に投稿する。(success, http_status) を返す。"""
+    クライアントはプロセス内で共有するので、バッチ投稿でも接続と認証は1回で済む。
+    """
     if dry_run:
         print("=== DRY RUN MODE ===")
         print(f"Would post:\n{tweet}")
-        print(f"Character count: {len(tweet)}")
-        if image_path:
-            print(f"Would attach image: {image_path}")
-        return True, 200
+        print(f"Character count: {weighted_length(tweet)}")
+        for name, data in media or []:
+            print(f"Would attach image: {name} ({len(data) / 1024:.0f} KB)")
+        return True, 200, None
 
-    api_key = os.environ.get("X_API_KEY")
-    api_secret = os.environ.get("X_API_SECRET")
-    access_token = os.environ.get("X_ACCESS_TOKEN")
-    access_token_secret = os.environ.get("X_ACCESS_TOKEN_SECRET")
-
-    if not all([api_key, api_secret, access_token, access_token_secret]):
-        print("ERROR: Missing X API credentials")
-        return False, 0
+    client = shared_client()
+    if client is None:
+        return False, 0, None
 
     try:
         media_ids = None
-        if image_path and image_path.exists():
-            mid = upload_media(image_path, api_key, api_secret, access_token, access_token_secret)
-            if mid:
-                media_ids = [mid]
-
-        client = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret,
-        )
+        if media:
+            uploaded = client.upload_many(media)
+            media_ids = [u["media_id"] for u in uploaded if u["media_id"]] or None
 
-        response = client.create_tweet(text=tweet, media_ids=media_ids) if media_ids else client.create_tweet(text=tweet)
-        print(f"Successfully posted tweet: {response.data['id']}")
-        return True, 200
+        tweet_id = client.create_tweet(tweet, media_ids)
+        print(f"Successfully posted tweet: {tweet_id}")
+        return True, 200, tweet_id
 
-    except tweepy.Forbidden:
-        print("WARNING: 403 Forbidden — likely a duplicate tweet. Marking as posted to skip.")
-        return False, 403
-
-    except tweepy.TweepyException as e:
-        print(f"ERROR: Failed to post tweet: {e}")
-        return False, 0
+    except XError as e:
+        if e.status == 403:
+            print("WARNING: 403 Forbidden — likely a duplicate tweet. Marking as posted to skip.")
+        elif e.status == 429:
+            print("ERROR: 429 Too Many Requests — rate limit window did not reset in time.")
+        else:
+            print(f"ERROR: Failed to post tweet: {e}")
+        return False, e.status, None
 
 
 def main():
     parser = argparse.ArgumentParser(description="Post to X from index.qmd frontmatter")
-    parser.add_argument("--type", required=True, choices=["makeover-monday", "tidytuesday"])
+    parser.add_argument("--type", required=True, nargs="+", choices=POST_TYPES,
+                        help="Post types to drain, in order")
+    parser.add_argument("--max-posts", type=int, default=1, help="Posts per type in this run (default: 1)")
+    parser.add_argument("--interval", type=float, default=POST_INTERVAL,
+                        help=f"Seconds to wait between posts (default: {POST_INTERVAL})")
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--platforms", default=",".join(PLATFORMS),
+                        help=f"Comma-separated platforms; unconfigured ones are skipped (default: {','.join(PLATFORMS)})")
+    parser.add_argument("--ledger", default=LEDGER_PATH, help=f"Posting ledger (default: {LEDGER_PATH})")
+    parser.add_argument("--index", default=FRONTMATTER_INDEX,
+                        help=f"Frontmatter index sidecar (default: {FRONTMATTER_INDEX})")
+    parser.add_argument("--no-index", action="store_true", help="Read every index.qmd without the index")
+    parser.add_argument("--media-cache", default=MEDIA_CACHE_DIR,
+                        help=f"Preflighted chart image cache (default: {MEDIA_CACHE_DIR})")
+    parser.add_argument("--no-media-cache", action="store_true", help="Preflight chart images without the cache")
     args = parser.parse_args()
 
     script_dir = Path(__file__).parent
@@ -218,43 +195,104 @@ def main():
     quarto_dir = project_root / QUARTO_POSTS_DIR
 
     print(f"Scanning: {quarto_dir}")
-    print(f"Post type: {args.type}")
-
-    posts = scan_posts(project_root, args.type)
-    print(f"Found {len(posts)} posts ({sum(1 for p in posts if p['x_posted'])} posted, "
-          f"{sum(1 for p in posts if not p['x_posted'])} unposted)")
-
-    item = get_oldest_unposted(posts)
-    if not item:
-        print(f"No unposted items for type: {args.type}")
+    print(f"Post types: {', '.join(args.type)} (up to {args.max_posts} each)")
+
+    index = None
+    if not args.no_index:
+        index = FrontmatterIndex(project_root / args.index, quarto_dir)
+    ledger = PostingLedger(project_root / args.ledger)
+    print(f"Ledger: {ledger.path} ({len(ledger.records)} posts recorded)")
+
+    queue = []
+    for post_type in args.type:
+        posts = scan_posts(project_root, post_type, index, ledger)
+        print(f"[{post_type}] Found {len(posts)} posts ({sum(1 for p in posts if p['x_posted'])} posted, "
+              f"{sum(1 for p in posts if not p['x_posted'])} unposted)")
+        queue.extend((post_type, item) for item in get_unposted(posts, args.max_posts))
+    if index is not None:
+        s = index.stats
+        print(f"Frontmatter index: reused {s['hits']}, rehashed {s['rehashed']}, read {s['misses']}, "
+              f"removed {s['removed']}")
+
+    if not queue:
+        print(f"No unposted items for type: {', '.join(args.type)}")
         sys.exit(0)
 
-    print(f"\nNext to post: {item['title']} ({item['date']})")
-
-    image_path = find_chart_image(item, project_root)
-    if image_path:
-        print(f"Found chart image: {image_path}")
-    else:
-        print("No chart image found (text only)")
-
-    tweet = format_tweet(item, args.type)
-    print(f"\nTweet content:\n{tweet}\n")
+    def x_post(text, media):
+        return post_to_x(text, media, dry_run=args.dry_run)
 
-    success, status = post_to_x(tweet, image_path=image_path, dry_run=args.dry_run)
+    publishers = build_publishers(args.platforms.split(","), x_post, dry_run=args.dry_run)
+    media_cache = MediaCache(None if args.no_media_cache else project_root / args.media_cache)
 
-    if success or status == 403:
-        mark_as_posted(item["qmd_path"])
+    posted = duplicates = 0
+    failed = False
+    for i, (post_type, item) in enumerate(queue):
+        if i > 0 and args.interval > 0:
+            if args.dry_run:
+                print(f"(would wait {args.interval:.0f}s)")
+            else:
+                print(f"Waiting {args.interval:.0f}s before the next post...")
+                time.sleep(args.interval)
+
+        print(f"\n[{post_type}] Next to post: {item['title']} ({item['date']})")
+
+        chosen, ranked = select_image(find_chart_images(item, project_root), media_cache)
+        if chosen:
+            print(f"Chart image candidates:\n{format_ranking(ranked)}")
+        else:
+            print("No chart image found (text only)")
+
+        tweet = format_tweet(item, post_type)
+        print(f"\nTweet content:\n{tweet}\n")
+
+        # 前回 X だけ失敗した記事は、投稿済みの投稿先には投稿し直さない
+        done = ledger.posted_platforms(item["dir_name"])
+        targets = [p for p in publishers if p.name not in done]
+        if done:
+            print(f"Already posted to {', '.join(sorted(done))} in an earlier run, skipping")
+        if not targets:
+            continue
 
-        gh_output = os.environ.get("GITHUB_OUTPUT")
-        if gh_output:
-            with open(gh_output, "a") as f:
-                f.write(f"posted=true\n")
-                f.write(f"post_date={item['date']}\n")
-                f.write(f"post_title={item['title']}\n")
-                f.write(f"has_image={'true' if image_path else 'false'}\n")
-                f.write(f"was_duplicate={'true' if status == 403 else 'false'}\n")
-    else:
-        print("Failed to post to X")
+        media = [chosen] if chosen else []
+        results = publish(make_post(tweet, tweet_sections(item, post_type), media), targets,
+                          dry_run=args.dry_run)
+        primary = primary_result(results)
+        success, status, tweet_id = primary["ok"], primary["status"], primary["id"]
+        others = {name: r["id"] if r["ok"] else None for name, r in results.items() if name != "x"}
+        x_done = "x" in results and (success or status == 403)
+
+        if not args.dry_run and (x_done or any(others.values())):
+            # X に投稿できなかったときも、他の投稿先の結果は pending として残す（次回は X だけに投稿する）
+            ledger.record(item["dir_name"], post_type, tweet_id,
+                          ("posted" if success else "duplicate") if x_done else PENDING,
+                          platforms=others)
+            print(f"Recorded {item['dir_name']} in {ledger.path.name}"
+                  f"{'' if x_done else ' (not posted to X yet)'}")
+
+        if success or status == 403:
+            if success:
+                posted += 1
+            else:
+                duplicates += 1
+        else:
+            # 認証エラーやレート制限は続けても失敗するので、残りは次回に回す
+            print(f"Failed to post to X, leaving {len(queue) - i - 1} queued posts for the next run")
+            failed = True
+            break
+
+    print(f"\nPosted {posted}, duplicates {duplicates}, queued {len(queue)}")
+    s = media_cache.stats
+    print(f"Media preflight: cached {s['hits']}, encoded {s['misses']} in {s['encode_ms']:.0f}ms")
+
+    gh_output = os.environ.get("GITHUB_OUTPUT")
+    if gh_output:
+        with open(gh_output, "a") as f:
+            f.write(f"posted={'true' if posted + duplicates else 'false'}\n")
+            f.write(f"posted_count={posted}\n")
+            f.write(f"duplicate_count={duplicates}\n")
+            f.write(f"failed={'true' if failed else 'false'}\n")
+
+    if failed:
         sys.exit(1)
 
 
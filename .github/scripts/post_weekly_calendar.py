@@ -4,10 +4,12 @@
 週間経済指標カレンダー自動投稿スクリプト
 
 毎週日曜日に翌週（月〜日）の重要経済指標と米国市場休場情報をXに投稿する。
+Bluesky / Mastodon の認証情報があれば、それぞれの文字数で組み直して同時に投稿する（publishers.py）。
 
 使用方法:
     python post_weekly_calendar.py
     python post_weekly_calendar.py --dry-run  # テスト実行
+    python post_weekly_calendar.py --platforms x  # X だけに投稿
     python post_weekly_calendar.py --date 2026-02-08  # 特定日付を基準に実行
 """
 
@@ -16,7 +18,12 @@ import sys
 import argparse
 import re
 import io
-from datetime import datetime, timedelta
+import time
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from typing import Optional
 from zoneinfo import ZoneInfo
 
@@ -25,23 +32,14 @@ if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-try:
-    import requests
-except ImportError:
-    print("ERROR: requests is not installed. Run: pip install requests")
-    sys.exit(1)
-
-try:
-    from icalendar import Calendar
-except ImportError:
-    print("ERROR: icalendar is not installed. Run: pip install icalendar")
-    sys.exit(1)
-
-try:
-    import tweepy
-except ImportError:
-    print("ERROR: tweepy is not installed. Run: pip install tweepy")
-    sys.exit(1)
+from http_cache import race_get
+from ical_stream import iter_vevents
+from importance_classifier import default_classifier
+from tweet_composer import compose, section, weighted_length
+from market_calendar import calendar_for
+from event_store import open_event_store
+from x_client import XError, shared_client
+from publishers import PLATFORMS, build_publishers, format_results, make_post, primary_result, publish
 
 
 # Monex経済指標カレンダーのiCal URL（複数のURLを試行）
@@ -53,31 +51,8 @@ MONEX_ICAL_URLS = [
 # 日本標準時
 JST = ZoneInfo("Asia/Tokyo")
 
-# 米国市場休場日（2026-2027年）
-US_MARKET_HOLIDAYS = {
-    # 2026年
-    "2026-01-01": "元日",
-    "2026-01-19": "キング牧師記念日",
-    "2026-02-16": "大統領の日",
-    "2026-04-03": "聖金曜日",
-    "2026-05-25": "戦没者追悼記念日",
-    "2026-06-19": "ジューンティーンス",
-    "2026-07-03": "独立記念日（振替）",
-    "2026-09-07": "労働者の日",
-    "2026-11-26": "感謝祭",
-    "2026-12-25": "クリスマス",
-    # 2027年
-    "2027-01-01": "元日",
-    "2027-01-18": "キング牧師記念日",
-    "2027-02-15": "大統領の日",
-    "2027-03-26": "聖金曜日",
-    "2027-05-31": "戦没者追悼記念日",
-    "2027-06-18": "ジューンティーンス（振替）",
-    "2027-07-05": "独立記念日（振替）",
-    "2027-09-06": "労働者の日",
-    "2027-11-25": "感謝祭",
-    "2027-12-24": "クリスマス（振替）",
-}
+# イベントストアのファイル名（HTTP キャッシュと同じディレクトリに置く）
+EVENT_STORE_NAME = "event_store.parquet"
 
 # 曜日の日本語表記
 WEEKDAY_JA = ["月", "火", "水", "木", "金", "土", "日"]
@@ -103,129 +78,191 @@ def get_week_range(base_date: datetime) -> tuple[datetime, datetime]:
     return week_start, week_end
 
 
-def fetch_monex_calendar() -> list[dict]:
+def parse_ical_events(
+    content: bytes,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[dict]:
     """
-    Monex経済指標カレンダーからイベントを取得する
+    iCalフィードから期間内のイベントを取り出す
+    
+    VEVENT を順に走査し、DTSTART が期間外のイベントは重要度判定などをせずに読み飛ばす。
     
+    Args:
+        content: iCalフィードの本文
+        start: 期間の開始日（None なら制限なし）
+        end: 期間の終了日（None なら制限なし）
+        
     Returns:
-        イベントのリスト（date, time, summary, importance を含む辞書）
+        イベントのリスト（date, datetime, time, summary, importance を含む辞書）
     """
+    vevents = list(iter_vevents(content, start, end, default_tz=JST))
+    importance = default_classifier().classify_many(
+        (v["summary"], v["description"]) for v in vevents
+    )
+    
     events = []
+    for vevent, level in zip(vevents, importance):
+        dt = vevent["datetime"]
+        events.append({
+            "date": dt.date(),
+            "datetime": dt,
+            "time": "終日" if vevent["all_day"] else dt.strftime("%H:%M"),
+            "summary": clean_summary(vevent["summary"]),
+            "importance": level,
+        })
     
-    # 複数のURLを試行
-    for url in MONEX_ICAL_URLS:
-        print(f"Trying to fetch calendar from: {url}")
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    return events
+
+
+def _load_parsed_events(cache_dir: str, key: str) -> Optional[list[dict]]:
+    """フィード本文のハッシュと期間に対応するパース済みイベントを読み込む（なければ None）"""
+    path = os.path.join(cache_dir, f"events-{key}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+    except (OSError, ValueError):
+        return None
+    events = []
+    for item in items:
+        dt = datetime.fromisoformat(item["datetime"]).astimezone(JST)
+        events.append({
+            "date": dt.date(),
+            "datetime": dt,
+            "time": item["time"],
+            "summary": item["summary"],
+            "importance": item["importance"],
+        })
+    return events
+
+
+def _save_parsed_events(cache_dir: str, key: str, events: list[dict]) -> None:
+    """パース済みイベントを保存する（古いフィードの分は削除）"""
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith("events-") and name.endswith(".json"):
+            os.remove(os.path.join(cache_dir, name))
+    with open(os.path.join(cache_dir, f"events-{key}.json"), "w", encoding="utf-8") as f:
+        json.dump([
+            {
+                "datetime": e["datetime"].isoformat(),
+                "time": e["time"],
+                "summary": e["summary"],
+                "importance": e["importance"],
             }
-            response = requests.get(url, timeout=15, headers=headers)
-            response.raise_for_status()
-            
-            cal = Calendar.from_ical(response.content)
-            
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    # 日時を取得
-                    dtstart = component.get("dtstart")
-                    if not dtstart:
-                        continue
-                    
-                    dt = dtstart.dt
-                    # dateオブジェクトの場合はdatetimeに変換
-                    if not isinstance(dt, datetime):
-                        dt = datetime.combine(dt, datetime.min.time())
-                    
-                    # タイムゾーン処理
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=JST)
-                    else:
-                        dt = dt.astimezone(JST)
-                    
-                    summary = str(component.get("summary", ""))
-                    description = str(component.get("description", ""))
-                    
-                    # 重要度を判定
-                    importance = determine_importance(summary, description)
-                    
-                    # 時刻を取得
-                    if component.get("dtstart").params.get("VALUE") == "DATE":
-                        time_str = "終日"
-                    else:
-                        time_str = dt.strftime("%H:%M")
-                    
-                    events.append({
-                        "date": dt.date(),
-                        "datetime": dt,
-                        "time": time_str,
-                        "summary": clean_summary(summary),
-                        "importance": importance,
-                    })
-            
-            if events:
-                print(f"Fetched {len(events)} events from {url}")
-                return events
-                
-        except requests.RequestException as e:
-            print(f"WARNING: Failed to fetch from {url}: {e}")
-            continue
-        except Exception as e:
-            print(f"WARNING: Failed to parse calendar from {url}: {e}")
-            continue
+            for e in events
+        ], f, ensure_ascii=False)
+
+
+def fetch_monex_calendar(
+    cache_dir: Optional[str] = None,
+    fetch_info: Optional[dict] = None,
+    window: Optional[tuple[date, date]] = None,
+) -> list[dict]:
+    """
+    Monex経済指標カレンダーからイベントを取得する
+    
+    MONEX_ICAL_URLS を同時に取得し、最初に返ってきた有効なフィードを使う。
+    cache_dir を指定すると ETag / If-Modified-Since で再検証し、
+    フィードが変わっていなければ（304）前回のパース結果をそのまま使う。
+    
+    Args:
+        cache_dir: HTTPキャッシュのディレクトリ（None ならキャッシュしない）
+        fetch_info: 渡すと取得結果（url, status, cache, elapsed_ms, bytes, parsed）を書き込む。
+            digest はフィードをパースできたときだけ入れる（ないときはフォールバックの推定値）
+        window: (開始日, 終了日)。指定するとその期間のイベントだけをパースする
+        
+    Returns:
+        イベントのリスト（date, time, summary, importance を含む辞書）
+    """
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+    print(f"Fetching calendar from {len(MONEX_ICAL_URLS)} mirrors concurrently")
+    started = time.perf_counter()
+    body, info, errors = race_get(
+        MONEX_ICAL_URLS,
+        Path(cache_dir) if cache_dir else None,
+        validate=lambda b: b"BEGIN:VCALENDAR" in b[:4096],
+        timeout=15,
+        headers=headers,
+    )
+    for error in errors:
+        print(f"WARNING: Failed to fetch from {error}")
+    
+    if body is not None:
+        start, end = window or (None, None)
+        key = info["digest"]
+        if window:
+            key += f"-{start:%Y%m%d}-{end:%Y%m%d}"
+        events = None
+        parsed = "cached"
+        if cache_dir and info["cache"] == "hit":
+            events = _load_parsed_events(cache_dir, key)
+        if events is None:
+            parsed = "parsed"
+            try:
+                events = parse_ical_events(body, start, end)
+            except Exception as e:
+                print(f"WARNING: Failed to parse calendar from {info['url']}: {e}")
+                parsed = "failed"
+            if events is not None and cache_dir:
+                _save_parsed_events(cache_dir, key, events)
+        
+        info["parsed"] = parsed
+        info["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        print(
+            f"Calendar fetch: {info['url']} status={info['status']} cache={info['cache']} "
+            f"({info['bytes']} bytes in {info['elapsed_ms']:.0f}ms, events {parsed}, "
+            f"total {info['total_ms']:.0f}ms)"
+        )
+        if fetch_info is not None:
+            fetch_info.update(info)
+            if events is None:
+                # 呼び出し側が推定値を Monex のイベントとしてストアに取り込まないようにする
+                del fetch_info["digest"]
+        # 期間を絞ってパースしているので、0件でも取得自体は成功として扱う
+        if events is not None:
+            print(f"Fetched {len(events)} events from {info['url']}")
+            return events
     
     # フォールバック: 主要な定例経済指標（毎月の固定イベント）
     print("Using fallback: generating standard monthly economic events")
-    events = generate_fallback_events()
+    events = generate_fallback_events(*(window or (None, None)))
     
     return events
 
 
-def generate_fallback_events() -> list[dict]:
+def generate_fallback_events(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[dict]:
     """
     フォールバック用の定例経済指標イベントを生成する
     
-    毎月の主要な経済指標発表日の目安:
-    - 第1金曜: 米国雇用統計
-    - 第2週: CPI
-    - 第3週: 小売売上高
-    """
-    events = []
-    now = datetime.now(JST)
-    current_year = now.year
-    current_month = now.month
-    
-    # 今月と来月の主要イベントを生成
-    for month_offset in range(3):
-        month = current_month + month_offset
-        year = current_year
-        if month > 12:
-            month -= 12
-            year += 1
-        
-        # 第1金曜日（雇用統計）を計算
-        first_day = datetime(year, month, 1)
-        days_until_friday = (4 - first_day.weekday()) % 7
-        first_friday = first_day + timedelta(days=days_until_friday)
-        
-        events.append({
-            "date": first_friday.date(),
-            "datetime": first_friday.replace(hour=22, minute=30, tzinfo=JST),
-            "time": "22:30",
-            "summary": "米国雇用統計・失業率",
-            "importance": "high",
-        })
-        
-        # 第2週水曜（CPI - 概算）
-        cpi_day = first_day + timedelta(days=10)
-        events.append({
-            "date": cpi_day.date(),
-            "datetime": cpi_day.replace(hour=22, minute=30, tzinfo=JST),
-            "time": "22:30",
-            "summary": "米国消費者物価指数(CPI)",
-            "importance": "high",
-        })
+    market_calendar の発表ルールから計算する:
+    - 第1金曜: 米国雇用統計（休場日なら前営業日）
+    - 10日以降の最初の水曜: CPI（目安）
+    - FOMC: 日程表の声明発表日
     
-    return events
+    Args:
+        start: 期間の開始日（None なら今月1日）
+        end: 期間の終了日（None なら今月から3か月分）
+    """
+    today = datetime.now(JST).date()
+    start = start or today.replace(day=1)
+    end = end or (start.replace(day=1) + timedelta(days=95)).replace(day=1) - timedelta(days=1)
+    return calendar_for(start, end).releases(start, end)
+
+
+def _file_digest(path: str) -> Optional[str]:
+    """ファイル内容の SHA-1（ファイルがなければ None）"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
 
 
 def load_json_calendar(project_root: str) -> tuple[list[dict], list[tuple[str, str]]]:
@@ -302,20 +339,47 @@ def load_json_calendar(project_root: str) -> tuple[list[dict], list[tuple[str, s
         return [], []
 
 
-def load_local_calendar(project_root: str) -> list[dict]:
+LOCAL_CALENDAR_COLUMNS = ["date", "time", "summary", "importance"]
+
+
+def _date_filter_value(field_type, value: date):
+    """parquet の date 列の型に合わせてフィルタ値を変換する"""
+    import pyarrow as pa
+    
+    if pa.types.is_timestamp(field_type):
+        dt = datetime.combine(value, datetime.min.time())
+        return dt.replace(tzinfo=ZoneInfo(field_type.tz)) if field_type.tz else dt
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def load_local_calendar(
+    project_root: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[dict]:
     """
     ローカルのparquetファイルから経済指標データを読み込む
     
+    期間の条件を parquet リーダーに渡して対象外の row group を読み飛ばし、
+    必要な列だけを読む。時刻・重要度・サマリーの正規化は列単位で行い、
+    サマリーの整形は重複を除いた値に対してだけ行う。
+    
     Args:
         project_root: プロジェクトルートパス
+        start: 期間の開始日（None なら制限なし）
+        end: 期間の終了日（None なら制限なし）
         
     Returns:
         イベントのリスト
     """
     try:
-        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
     except ImportError:
-        print("WARNING: pandas not installed, cannot read local parquet")
+        print("WARNING: pyarrow not installed, cannot read local parquet")
         return []
     
     parquet_path = os.path.join(
@@ -329,40 +393,84 @@ def load_local_calendar(project_root: str) -> list[dict]:
     print(f"Loading local calendar from: {parquet_path}")
     
     try:
-        df = pd.read_parquet(parquet_path)
-        events = []
+        schema = pq.read_schema(parquet_path)
+        if "date" not in schema.names:
+            print("WARNING: Local calendar has no 'date' column")
+            return []
+        columns = [c for c in LOCAL_CALENDAR_COLUMNS if c in schema.names]
         
-        for _, row in df.iterrows():
-            dt_date = row.get("date")
-            if dt_date is None:
-                continue
-            
-            # datetime変換
-            if isinstance(dt_date, datetime):
-                dt = dt_date
-            else:
-                dt = datetime.combine(dt_date, datetime.min.time())
-            
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=JST)
-            
-            # 時刻処理
-            time_val = row.get("time", "")
-            if pd.isna(time_val) or time_val in ["終日", ""]:
-                time_str = "終日"
-            else:
-                time_str = str(time_val)
-            
-            summary = str(row.get("summary", ""))
-            importance = str(row.get("importance", "medium"))
-            
-            events.append({
-                "date": dt.date(),
-                "datetime": dt,
-                "time": time_str,
-                "summary": clean_summary(summary),
-                "importance": importance if importance in ["high", "medium", "low"] else "medium",
-            })
+        filters = []
+        date_type = schema.field("date").type
+        if start:
+            filters.append(("date", ">=", _date_filter_value(date_type, start)))
+        if end:
+            filters.append(("date", "<=", _date_filter_value(date_type, end)))
+        
+        table = pq.read_table(parquet_path, columns=columns, filters=filters or None)
+        table = table.filter(pc.is_valid(table["date"]))
+        n = table.num_rows
+        
+        # 日付: 文字列・timestamp・date のいずれでも date に揃える
+        # （timestamp の場合は時刻も含めて datetime に使う）
+        dates = table["date"]
+        stamps = None
+        if pa.types.is_timestamp(dates.type):
+            stamps = pc.cast(dates, pa.timestamp("us", tz=dates.type.tz)).to_pylist()
+        if pa.types.is_string(dates.type) or pa.types.is_large_string(dates.type):
+            dates = pc.strptime(pc.utf8_slice_codeunits(dates, 0, 10), format="%Y-%m-%d", unit="s")
+        if not pa.types.is_date(dates.type):
+            dates = pc.cast(dates, pa.date32())
+        
+        # 時刻: 欠損・空文字は「終日」
+        if "time" in columns:
+            times = pc.cast(table["time"], pa.string())
+            times = pc.if_else(
+                pc.or_kleene(pc.is_null(times), pc.equal(times, "")),
+                pa.scalar("終日"),
+                times,
+            )
+        else:
+            times = pa.array(["終日"] * n, pa.string())
+        
+        # 重要度: 想定外の値は medium
+        if "importance" in columns:
+            importance = pc.cast(table["importance"], pa.string())
+            importance = pc.if_else(
+                pc.is_in(importance, value_set=pa.array(["high", "medium", "low"])),
+                importance,
+                pa.scalar("medium"),
+            )
+            importance = pc.fill_null(importance, "medium")
+        else:
+            importance = pa.array(["medium"] * n, pa.string())
+        
+        # サマリー: 重複を除いた値だけ clean_summary にかける
+        if "summary" in columns:
+            encoded = pc.dictionary_encode(
+                pc.fill_null(pc.cast(table["summary"], pa.string()), "")
+            ).combine_chunks()
+            cleaned = [clean_summary(s) for s in encoded.dictionary.to_pylist()]
+            summaries = [cleaned[i] for i in encoded.indices.to_pylist()]
+        else:
+            summaries = [""] * n
+        
+        if stamps is None:
+            dates = dates.to_pylist()
+            stamps = [datetime.combine(d, datetime.min.time()) for d in dates]
+        else:
+            dates = [dt.date() for dt in stamps]
+        events = [
+            {
+                "date": d,
+                "datetime": dt if dt.tzinfo else dt.replace(tzinfo=JST),
+                "time": t,
+                "summary": s,
+                "importance": imp,
+            }
+            for d, dt, t, s, imp in zip(
+                dates, stamps, times.to_pylist(), summaries, importance.to_pylist()
+            )
+        ]
         
         print(f"Loaded {len(events)} events from local file")
         return events
@@ -376,33 +484,12 @@ def determine_importance(summary: str, description: str) -> str:
     """
     イベントの重要度を判定する
     
+    キーワードと重みは .github/data/importance_keywords.json で設定する。
+    
     Returns:
         "high", "medium", "low"
     """
-    text = (summary + " " + description).upper()
-    
-    # 高重要度のキーワード
-    high_keywords = [
-        "FRB", "FOMC", "政策金利", "雇用統計", "NFP", "非農業部門",
-        "CPI", "消費者物価", "GDP", "ECB", "BOJ", "日銀",
-        "失業率", "英中銀"
-    ]
-    
-    # 中重要度のキーワード
-    medium_keywords = [
-        "ISM", "PMI", "小売売上", "鳴生産", "住宅", "貿易収支",
-        "景気指数", "製造業", "PPI", "生産者物価"
-    ]
-    
-    for keyword in high_keywords:
-        if keyword in text:
-            return "high"
-    
-    for keyword in medium_keywords:
-        if keyword in text:
-            return "medium"
-    
-    return "low"
+    return default_classifier().classify(summary, description)
 
 
 def clean_summary(summary: str) -> str:
@@ -421,19 +508,13 @@ def get_holidays_in_range(start_date: datetime, end_date: datetime) -> list[tupl
     """
     指定期間内の米国市場休場日を取得する
     
+    休場日は market_calendar が規則から計算した日付順の配列を二分探索して取り出す。
+    
     Returns:
         [(日付文字列, 休場名)] のリスト
     """
-    holidays = []
-    current = start_date
-    
-    while current <= end_date:
-        date_str = current.strftime("%Y-%m-%d")
-        if date_str in US_MARKET_HOLIDAYS:
-            holidays.append((date_str, US_MARKET_HOLIDAYS[date_str]))
-        current += timedelta(days=1)
-    
-    return holidays
+    start, end = start_date.date(), end_date.date()
+    return calendar_for(start, end).holidays(start, end, market="NYSE")
 
 
 def format_event_line(event: dict) -> str:
@@ -449,20 +530,26 @@ def format_event_line(event: dict) -> str:
         return f"・{date_str} {event['summary']}"
 
 
-def generate_tweet(
+def tweet_sections(
     week_start: datetime,
     week_end: datetime,
     events: list[dict],
     holidays: list[tuple[str, str]]
-) -> str:
+) -> list[dict]:
     """
-    ツイート本文を生成する（280文字制限を考慮）
+    投稿本文のセクションを作る（compose() で投稿先の文字数に詰める）
+    
+    ヘッダー・休場情報・ハッシュタグは必須。残りの文字数に
+    高重要度（最大5件、最低1件）→ 中重要度（最大3件）の順で詰める。
     """
     # ヘッダー
-    header = f"📅 来週の重要経済指標（{week_start.month}/{week_start.day}〜{week_end.month}/{week_end.day}）\n"
+    header = section(
+        f"📅 来週の重要経済指標（{week_start.month}/{week_start.day}〜{week_end.month}/{week_end.day}）",
+        required=True,
+    )
     
     # フッター（ハッシュタグ）
-    footer = "\n#経済指標 #マーケット"
+    footer = section("#経済指標 #マーケット", required=True, sep="\n")
     
     # 期間内のイベントをフィルタ
     week_events = [
@@ -478,83 +565,39 @@ def generate_tweet(
     high_events = [e for e in week_events if e["importance"] == "high"]
     medium_events = [e for e in week_events if e["importance"] == "medium"]
     
-    # ツイート本文を構築
-    body_parts = []
-    
-    # 高重要度イベント
-    if high_events:
-        body_parts.append("\n🔴 重要")
-        for event in high_events[:5]:  # 最大5件
-            body_parts.append(format_event_line(event))
-    
-    # 中重要度イベント（残り文字数次第）
-    if medium_events:
-        body_parts.append("\n🟡 中程度")
-        for event in medium_events[:3]:  # 最大3件
-            body_parts.append(format_event_line(event))
-    
     # 休場情報
-    if holidays:
-        holiday_str = "、".join([f"{h[1]}" for h in holidays])
-        body_parts.append(f"\n🏦 休場: {holiday_str}")
-    else:
-        body_parts.append("\n🏦 休場: なし")
-    
-    # 本文を結合
-    body = "\n".join(body_parts)
-    tweet = header + body + footer
-    
-    # 280文字を超える場合は中重要度を削減
-    while len(tweet) > 280 and medium_events:
-        medium_events = medium_events[:-1]
-        body_parts = []
-        
-        if high_events:
-            body_parts.append("\n🔴 重要")
-            for event in high_events[:5]:
-                body_parts.append(format_event_line(event))
-        
-        if medium_events:
-            body_parts.append("\n🟡 中程度")
-            for event in medium_events:
-                body_parts.append(format_event_line(event))
-        
-        if holidays:
-            holiday_str = "、".join([f"{h[1]}" for h in holidays])
-            body_parts.append(f"\n🏦 休場: {holiday_str}")
-        else:
-            body_parts.append("\n🏦 休場: なし")
-        
-        body = "\n".join(body_parts)
-        tweet = header + body + footer
-    
-    # それでも超える場合は高重要度も削減
-    while len(tweet) > 280 and high_events and len(high_events) > 1:
-        high_events = high_events[:-1]
-        body_parts = []
-        
-        body_parts.append("\n🔴 重要")
-        for event in high_events:
-            body_parts.append(format_event_line(event))
-        
-        if holidays:
-            holiday_str = "、".join([f"{h[1]}" for h in holidays])
-            body_parts.append(f"\n🏦 休場: {holiday_str}")
-        else:
-            body_parts.append("\n🏦 休場: なし")
-        
-        body = "\n".join(body_parts)
-        tweet = header + body + footer
+    holiday_str = "、".join([f"{h[1]}" for h in holidays])
     
     # イベントがない場合
     if not high_events and not medium_events:
-        body = "\n今週は重要な経済指標の発表予定はありません。"
+        sections = [header, section("今週は重要な経済指標の発表予定はありません。", required=True)]
         if holidays:
-            holiday_str = "、".join([f"{h[1]}" for h in holidays])
-            body += f"\n\n🏦 休場: {holiday_str}"
-        tweet = header + body + footer
-    
-    return tweet
+            sections.append(section(f"🏦 休場: {holiday_str}", required=True))
+        return sections + [footer]
+    
+    return [
+        header,
+        section(
+            [format_event_line(e) for e in high_events[:5]],  # 最大5件
+            heading="🔴 重要", priority=1, min_lines=1,
+        ),
+        section(
+            [format_event_line(e) for e in medium_events[:3]],  # 最大3件
+            heading="🟡 中程度", priority=2,
+        ),
+        section(f"🏦 休場: {holiday_str or 'なし'}", required=True),
+        footer,
+    ]
+
+
+def generate_tweet(
+    week_start: datetime,
+    week_end: datetime,
+    events: list[dict],
+    holidays: list[tuple[str, str]]
+) -> str:
+    """ツイート本文を生成する（X の重み付き文字数で280以内）"""
+    return compose(tweet_sections(week_start, week_end, events, holidays))
 
 
 def post_to_x(tweet: str, dry_run: bool = False) -> tuple[bool, int]:
@@ -562,41 +605,194 @@ def post_to_x(tweet: str, dry_run: bool = False) -> tuple[bool, int]:
     if dry_run:
         print("=== DRY RUN MODE ===")
         print(f"Would post:\n{tweet}")
-        print(f"\nCharacter count: {len(tweet)}")
+        print(f"\nCharacter count: {weighted_length(tweet)}")
         return True, 200
     
-    # 環境変数から認証情報を取得
-    api_key = os.environ.get("X_API_KEY")
-    api_secret = os.environ.get("X_API_SECRET")
-    access_token = os.environ.get("X_ACCESS_TOKEN")
-    access_token_secret = os.environ.get("X_ACCESS_TOKEN_SECRET")
-    
-    if not all([api_key, api_secret, access_token, access_token_secret]):
-        print("ERROR: Missing X API credentials in environment variables")
-        print("Required: X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET")
+    # 環境変数の認証情報で作った共有クライアント（レート制限は x_client が待って再試行する）
+    client = shared_client()
+    if client is None:
         return False, 0
     
     try:
-        # Twitter API v2 クライアントを作成
-        client = tweepy.Client(
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
+        tweet_id = client.create_tweet(tweet)
+        print(f"Successfully posted tweet: {tweet_id}")
+        return True, 200
+    
+    except XError as e:
+        if e.status == 403:
+            print("WARNING: 403 Forbidden — likely a duplicate tweet. Treating as already posted.")
+            return False, 403
+        print(f"ERROR: Failed to post tweet: {e}")
+        return False, e.status
+
+
+def load_calendar_events(
+    args: argparse.Namespace,
+    project_root: str,
+    window: tuple[date, date],
+) -> tuple[list[dict], list[tuple[str, str]]]:
+    """
+    期間内の経済指標イベントを取得する
+    
+    優先順位: JSON（GitHub Actions用） → ローカルparquet → Monex → フォールバック
+    ソースにイベントがなければ（ファイルがない・空）次のソースを試す。JSON にイベントが
+    あれば、期間内に1件もなくても Monex や推定値には進まない。各ソースのイベントは
+    イベントストアに取り込み、期間内のイベントは使ったソースの行だけをストアから読む。
+    
+    Args:
+        args: コマンドライン引数（use_local, cache_dir, no_cache, event_store, no_store）
+        project_root: プロジェクトルートパス
+        window: (開始日, 終了日)
+        
+    Returns:
+        (期間内のイベントのリスト（日時順）, JSONから読んだ休場日のリスト)
+    """
+    store = None
+    if not args.no_store:
+        store = open_event_store(
+            args.event_store or os.path.join(project_root, "tmp", "calendar_cache", EVENT_STORE_NAME)
+        )
+    
+    def in_window(events: list[dict]) -> list[dict]:
+        return sorted(
+            (e for e in events if window[0] <= e["date"] <= window[1]),
+            key=lambda e: e["datetime"],
         )
+    
+    def merge(events: list[dict], source: str, **kwargs) -> list[dict]:
+        """ストアに取り込んで期間内のそのソースのイベントを返す（ストアなしなら期間で絞るだけ）"""
+        if store is None:
+            return in_window(events)
+        stats = store.merge(events, source, **kwargs)
+        print(f"Event store: {source} +{stats['added']} -{stats['removed']} "
+              f"(duplicates {stats['shadowed']}), {stats['total']} events stored")
+        return store.query(*window, source=source)
+    
+    # 1. まずJSONファイルを試行（GitHub Actions環境のメインソース）
+    #    前回取り込んだときから変わっていなければパースせずストアを使う
+    json_digest = _file_digest(os.path.join(project_root, ".github", "data", "upcoming_calendar.json"))
+    json_info = store.source_info("json") if store else None
+    if json_info and json_digest and json_info.get("digest") == json_digest:
+        print("JSON calendar unchanged since the last run, reading the event store")
+        json_holidays = [tuple(h) for h in json_info.get("holidays", [])]
+        source_count = json_info.get("events", 0)
+        window_events = store.query(*window, source="json")
+    else:
+        events, json_holidays = load_json_calendar(project_root)
+        source_count = len(events)
+        window_events = merge(events, "json", digest=json_digest, extra={"holidays": json_holidays})
+    
+    # 2. JSONがない/空の場合、ローカルparquetを試行（--use-local指定時のみ）
+    if not source_count and args.use_local:
+        events = load_local_calendar(project_root, *window)
+        source_count = len(events)
+        window_events = merge(events, "local", window=window)
+    
+    # 3. それでもない場合、Monex/フォールバックを試行
+    if not source_count:
+        if args.no_cache:
+            cache_dir = None
+        else:
+            cache_dir = args.cache_dir or os.path.join(project_root, "tmp", "calendar_cache")
+        fetch_info = {}
+        events = fetch_monex_calendar(cache_dir, fetch_info, window=window)
         
-        # ツイートを投稿
-        response = client.create_tweet(text=tweet)
-        print(f"Successfully posted tweet: {response.data['id']}")
-        return True, 200
+        if fetch_info.get("digest"):
+            window_events = merge(events, "monex", window=window, digest=fetch_info["digest"])
+        else:
+            # フォールバックの推定値はストアに残さない
+            window_events = in_window(events)
+        
+        github_output = os.environ.get("GITHUB_OUTPUT")
+        if github_output and fetch_info:
+            with open(github_output, "a") as f:
+                f.write(f"calendar_cache={fetch_info['cache']}\n")
+                f.write(f"calendar_fetch_ms={fetch_info['total_ms']:.0f}\n")
+    
+    return window_events, json_holidays
+
+
+def select_holidays(
+    json_holidays: list[tuple[str, str]],
+    week_start: datetime,
+    week_end: datetime,
+) -> list[tuple[str, str]]:
+    """
+    対象週の休場日を取得する（JSONから取得した休場日を優先、なければ market_calendar の規則から計算）
+    """
+    if json_holidays:
+        # JSONから取得した休場日を期間でフィルタ
+        return [
+            (date_str, name) for date_str, name in json_holidays
+            if week_start.strftime("%Y-%m-%d") <= date_str <= week_end.strftime("%Y-%m-%d")
+        ]
+    return get_holidays_in_range(week_start, week_end)
+
+
+def run_range(args: argparse.Namespace, project_root: str) -> None:
+    """
+    --range START END: 期間内の各週のツイートをまとめて生成し、1つの JSON ファイルに書く
     
-    except tweepy.Forbidden:
-        print("WARNING: 403 Forbidden — likely a duplicate tweet. Treating as already posted.")
-        return False, 403
+    ソースの読み込みは期間全体で1回だけ行い、週ごとの切り出しは日付順のイベントを
+    二分探索する。投稿はしない。
+    """
+    range_start = datetime.strptime(args.range[0], "%Y-%m-%d")
+    range_end = datetime.strptime(args.range[1], "%Y-%m-%d")
+    if range_end < range_start:
+        print("ERROR: --range END is before START")
+        sys.exit(1)
     
-    except tweepy.TweepyException as e:
-        print(f"ERROR: Failed to post tweet: {e}")
-        return False, 0
+    # START を含む週の月曜から END を含む週の日曜まで
+    first_monday = range_start - timedelta(days=range_start.weekday())
+    last_sunday = range_end + timedelta(days=6 - range_end.weekday())
+    print(f"Range: {first_monday.strftime('%Y-%m-%d')} to {last_sunday.strftime('%Y-%m-%d')}")
+    
+    started = time.perf_counter()
+    events, json_holidays = load_calendar_events(
+        args, project_root, (first_monday.date(), last_sunday.date())
+    )
+    load_ms = (time.perf_counter() - started) * 1000
+    event_dates = [e["date"] for e in events]
+    print(f"Loaded {len(events)} events in {load_ms:.0f}ms")
+    
+    weeks = []
+    week_start = first_monday
+    while week_start <= last_sunday:
+        week_end = week_start + timedelta(days=6)
+        lo = bisect_left(event_dates, week_start.date())
+        hi = bisect_right(event_dates, week_end.date())
+        week_events = events[lo:hi]
+        holidays = select_holidays(json_holidays, week_start, week_end)
+        tweet = generate_tweet(week_start, week_end, week_events, holidays)
+        weeks.append({
+            "base_date": (week_start - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "week_start": week_start.strftime("%Y-%m-%d"),
+            "week_end": week_end.strftime("%Y-%m-%d"),
+            "event_count": len(week_events),
+            "holidays": [name for _, name in holidays],
+            "chars": weighted_length(tweet),
+            "tweet": tweet,
+        })
+        print(f"  {weeks[-1]['week_start']}  {len(week_events):>3} events  {weeks[-1]['chars']:>3} chars")
+        week_start += timedelta(days=7)
+    
+    output_path = args.output or os.path.join(project_root, "tmp", "calendar_range.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "range": [first_monday.strftime("%Y-%m-%d"), last_sunday.strftime("%Y-%m-%d")],
+            "generated_at": datetime.now(JST).isoformat(timespec="seconds"),
+            "load_ms": round(load_ms, 1),
+            "weeks": weeks,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"Wrote {len(weeks)} weeks to {output_path} "
+          f"({(time.perf_counter() - started) * 1000:.0f}ms total)")
+    
+    github_output = os.environ.get("GITHUB_OUTPUT")
+    if github_output:
+        with open(github_output, "a") as f:
+            f.write(f"range_weeks={len(weeks)}\n")
+            f.write(f"range_output={output_path}\n")
 
 
 def main():
@@ -619,6 +815,47 @@ def main():
         action="store_true",
         help="Try to load from local parquet file (for local testing)"
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="HTTP cache directory for the Monex feed (default: tmp/calendar_cache)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download the Monex feed without conditional requests"
+    )
+    parser.add_argument(
+        "--event-store",
+        type=str,
+        default=None,
+        help=f"Event store file (default: tmp/calendar_cache/{EVENT_STORE_NAME})"
+    )
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help="Do not read or update the event store"
+    )
+    parser.add_argument(
+        "--range",
+        nargs=2,
+        metavar=("START", "END"),
+        default=None,
+        help="Generate tweets for every week from START to END (YYYY-MM-DD) without posting"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Output file for --range (default: tmp/calendar_range.json)"
+    )
+    parser.add_argument(
+        "--platforms",
+        type=str,
+        default=",".join(PLATFORMS),
+        help=f"Comma-separated platforms to publish to; unconfigured ones are skipped (default: {','.join(PLATFORMS)})"
+    )
     
     args = parser.parse_args()
     
@@ -626,6 +863,10 @@ def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(script_dir))
     
+    if args.range:
+        run_range(args, project_root)
+        return
+    
     # 基準日を決定
     if args.date:
         base_date = datetime.strptime(args.date, "%Y-%m-%d")
@@ -639,37 +880,14 @@ def main():
     print(f"Target week: {week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}")
     
     # 経済指標カレンダーを取得
-    # 優先順位: JSON（GitHub Actions用） → ローカルparquet → Monex → フォールバック
-    events = []
-    json_holidays = []
-    
-    # 1. まずJSONファイルを試行（GitHub Actions環境のメインソース）
-    events, json_holidays = load_json_calendar(project_root)
-    
-    # 2. JSONがない/空の場合、ローカルparquetを試行（--use-local指定時のみ）
-    if not events and args.use_local:
-        events = load_local_calendar(project_root)
-    
-    # 3. それでもない場合、Monex/フォールバックを試行
-    if not events:
-        events = fetch_monex_calendar()
-    
-    # 期間内のイベント数をカウント
-    week_events = [
-        e for e in events
-        if week_start.date() <= e["date"] <= week_end.date()
-    ]
+    week_events, json_holidays = load_calendar_events(
+        args, project_root, (week_start.date(), week_end.date())
+    )
+    events = week_events
     print(f"Events in target week: {len(week_events)}")
     
-    # 休場日を取得（JSONから取得した休場日を優先、なければハードコード版を使用）
-    if json_holidays:
-        # JSONから取得した休場日を期間でフィルタ
-        holidays = [
-            (date_str, name) for date_str, name in json_holidays
-            if week_start.strftime("%Y-%m-%d") <= date_str <= week_end.strftime("%Y-%m-%d")
-        ]
-    else:
-        holidays = get_holidays_in_range(week_start, week_end)
+    # 休場日を取得
+    holidays = select_holidays(json_holidays, week_start, week_end)
     
     if holidays:
         print(f"Holidays in target week: {[h[1] for h in holidays]}")
@@ -678,12 +896,20 @@ def main():
     
     # ツイート本文を生成
     tweet = generate_tweet(week_start, week_end, events, holidays)
-    print(f"\n--- Generated Tweet ({len(tweet)} chars) ---")
+    print(f"\n--- Generated Tweet ({weighted_length(tweet)} chars) ---")
     print(tweet)
     print("--- End of Tweet ---\n")
     
-    # 投稿
-    success, status = post_to_x(tweet, dry_run=args.dry_run)
+    # 投稿（X と設定済みの他の投稿先に同時に投稿する。成否は X の結果で決める）
+    def x_post(text, media):
+        success, status = post_to_x(text, dry_run=args.dry_run)
+        return success, status, None
+    
+    post = make_post(tweet, sections=tweet_sections(week_start, week_end, events, holidays))
+    publishers = build_publishers(args.platforms.split(","), x_post, dry_run=args.dry_run)
+    results = publish(post, publishers, dry_run=args.dry_run)
+    primary = primary_result(results)
+    success, status = primary["ok"], primary["status"]
     
     if success or status == 403:
         if status == 403:
@@ -700,6 +926,7 @@ def main():
                 f.write(f"week_end={week_end.strftime('%Y-%m-%d')}\n")
                 f.write(f"event_count={len(week_events)}\n")
                 f.write(f"was_duplicate={'true' if status == 403 else 'false'}\n")
+                f.write(f"platforms={format_results(results)}\n")
     else:
         print("Failed to post tweet")
         sys.exit(1)
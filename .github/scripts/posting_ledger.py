@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+X 投稿の記録（追記のみの JSONL 台帳）
+
+post_to_x.py が投稿に成功した記事（または 403 で重複とみなした記事）を1行ずつ追記する。
+「投稿済みかどうか」はこの台帳で判断し、index.qmd は書き換えない。
+台帳ができる前に投稿した記事は frontmatter の `x-posted: true` を投稿済みとして扱う。
+
+X に投稿できなかったときも、他の投稿先に投稿できていれば status "pending" の行を残す。
+次の実行では X と、まだ投稿していない投稿先にだけ投稿する（Bluesky には二重投稿を
+防ぐ仕組みがないため）。
+
+1行の形式:
+    {"dir": "<記事ディレクトリ名>", "type": "makeover-monday", "tweet_id": "...",
+     "status": "posted" | "duplicate" | "pending", "posted_at": "2026-10-19T09:00:12+09:00",
+     "platforms": {"bluesky": "at://...", "mastodon": null}}   # 同時投稿した他の投稿先（失敗は null）
+
+行を追記するだけなので、並行して走った実行の変更は .gitattributes の merge=union で
+そのまま結合できる。同じ記事の行は読み込み時にまとめ、X の結果は最初に X に投稿した行を、
+他の投稿先は最初に成功した行の id を採用する。
+
+使用方法（台帳の確認）:
+    python posting_ledger.py
+    python posting_ledger.py --type tidytuesday
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+JST = ZoneInfo("Asia/Tokyo")
+
+LEDGER_PATH = ".github/data/x_posting_ledger.jsonl"
+
+# X には未投稿で、他の投稿先の結果だけを残した行の status
+PENDING = "pending"
+
+
+class PostingLedger:
+    """記事ディレクトリ名をキーにした投稿記録"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._records: dict[str, dict] | None = None
+
+    @property
+    def records(self) -> dict[str, dict]:
+        if self._records is None:
+            self._records = {}
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for lineno, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            print(f"WARNING: {self.path}:{lineno}: skipping malformed ledger line")
+                            continue
+                        self._merge(record)
+        return self._records
+
+    def _merge(self, record: dict) -> None:
+        """同じ記事の行を1件にまとめる"""
+        current = self._records.get(record["dir"])
+        if current is None:
+            self._records[record["dir"]] = dict(record, platforms=dict(record.get("platforms") or {}))
+            return
+        if current["status"] == PENDING and record["status"] != PENDING:
+            current.update({k: record[k] for k in ("type", "tweet_id", "status", "posted_at")})
+        for name, post_id in (record.get("platforms") or {}).items():
+            if post_id and not current["platforms"].get(name):
+                current["platforms"][name] = post_id
+
+    def is_posted(self, dir_name: str) -> bool:
+        """X に投稿済み（または重複）か"""
+        record = self.records.get(dir_name)
+        return record is not None and record["status"] != PENDING
+
+    def posted_platforms(self, dir_name: str) -> set[str]:
+        """投稿済みの投稿先（X に投稿済みなら "x" も含む）"""
+        record = self.records.get(dir_name)
+        if record is None:
+            return set()
+        done = {name for name, post_id in record["platforms"].items() if post_id}
+        if record["status"] != PENDING:
+            done.add("x")
+        return done
+
+    def record(
+        self,
+        dir_name: str,
+        post_type: str,
+        tweet_id: str | None,
+        status: str = "posted",
+        platforms: dict[str, str | None] | None = None,
+    ) -> dict:
+        """投稿を1行追記する（1件ごとに書き出すので、途中で失敗しても投稿済みの記録は残る）
+
+        X に投稿できず他の投稿先にだけ投稿したときは status="pending"、tweet_id=None で記録する。
+        """
+        entry = {
+            "dir": dir_name,
+            "type": post_type,
+            "tweet_id": tweet_id,
+            "status": status,
+            "posted_at": datetime.now(JST).isoformat(timespec="seconds"),
+        }
+        if platforms:
+            entry["platforms"] = platforms
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        if self.path.exists() and self.path.stat().st_size:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # 途中で切れた最終行に続けて書かない
+                    line = "\n" + line
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+        if self._records is not None:
+            # まだ読み込んでいなければ、次に読むときに今回の行も含めて読む
+            self._merge(entry)
+        return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the X posting ledger")
+    parser.add_argument("--ledger", default=LEDGER_PATH, help=f"Ledger file (default: {LEDGER_PATH})")
+    parser.add_argument("--type", default=None, help="Only show this post type")
+    args = parser.parse_args()
+
+    path = Path(args.ledger)
+    if not path.exists():
+        print(f"No ledger at {path}")
+        sys.exit(0)
+
+    records = [r for r in PostingLedger(path).records.values() if not args.type or r["type"] == args.type]
+    records.sort(key=lambda r: r["posted_at"])
+    for r in records:
+        others = ",".join(name for name, post_id in sorted(r["platforms"].items()) if post_id)
+        print(f"{r['posted_at']}  {r['type']:<16} {r['status']:<9} {r.get('tweet_id') or '-':<20} "
+              f"{others or '-':<17} {r['dir']}")
+    print(f"{len(records)} posts ({sum(1 for r in records if r['status'] == PENDING)} not yet on X)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+記事走査（post_to_x.scan_posts）のベンチマーク
+
+合成した記事ツリー（数千件の <日付>-<タイプ>/index.qmd、本文は 300〜500 行）で、
+ファイル全体を read_text して正規表現をかける従来の方法と、閉じの `---` で読むのを
+やめる frontmatter_index（サイドカーなし / サイドカーあり / 一部の記事を更新）を比較する。
+
+使用方法:
+    python posts_bench.py
+    python posts_bench.py --posts 5000 --touch 0.01 --runs 5
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from statistics import median
+
+import post_to_x
+from post_to_x import QUARTO_POSTS_DIR, scan_posts
+from frontmatter_index import FrontmatterIndex
+
+FRONTMATTER = """---
+title: "{title}"
+description: "{description}"
+date: "{date}"
+x-posted: {posted}
+author: "chokotto"
+categories: ["{kind}", "Data Viz", "Python"]
+image: "thumbnail.svg"
+
+twitter-card:
+  card-type: summary_large_image
+  image: "thumbnail.png"
+  title: "{title}"
+  description: "{twitter}"
+---
+"""
+
+
+def legacy_extract_frontmatter(qmd_file: Path) -> dict:
+    """従来の extract_frontmatter(): ファイル全体を読んでから frontmatter を切り出す"""
+    content = qmd_file.read_text(encoding="utf-8")
+    match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
+    if not match:
+        return {}
+    yaml_text = match.group(1)
+    fm = {}
+    for key in ("title", "description", "date", "x-posted"):
+        m = re.search(rf'^{re.escape(key)}:\s*["\']?(.+?)["\']?\s*$', yaml_text, re.MULTILINE)
+        if m:
+            val = m.group(1).strip("\"'")
+            fm[key] = val.lower() == "true" if key == "x-posted" else val
+    twitter_desc = re.search(
+        r'twitter-card:.*?description:\s*["\']?(.+?)["\']?\s*$', yaml_text, re.DOTALL | re.MULTILINE,
+    )
+    if twitter_desc:
+        fm["twitter_description"] = twitter_desc.group(1).strip("\"'")
+    return fm
+
+
+def build_tree(root: Path, n_posts: int, seed: int = 1) -> None:
+    """合成の記事ツリーを作る"""
+    rng = random.Random(seed)
+    posts_dir = root / QUARTO_POSTS_DIR
+    day = date(2020, 1, 6)
+    for i in range(n_posts):
+        kind = "makeover-monday" if i % 2 == 0 else "tidytuesday"
+        post_dir = posts_dir / f"{day:%Y-%m-%d}-{i:05d}-{kind}"
+        post_dir.mkdir(parents=True)
+        body = []
+        for j in range(rng.randint(300, 500)):
+            if j % 40 == 0:
+                body.append("```{python}\n#| label: chunk-%d\n" % j)
+            body.append(f"df_{j} = df.groupby('region').agg(total=('value', 'sum'))  # データ集計 {j}\n")
+            if j % 40 == 39:
+                body.append("```\n\n")
+        (post_dir / "index.qmd").write_text(FRONTMATTER.format(
+            title=f"{kind}: Post {i}",
+            description=f"Description of post {i}",
+            date=f"{day:%Y-%m-%d}",
+            posted="true" if rng.random() < 0.9 else "false",
+            kind=kind,
+            twitter=f"Twitter description {i}",
+        ) + "".join(body), encoding="utf-8")
+        if i % 2:
+            day += timedelta(days=7)
+
+
+def _timeit(fn, runs: int) -> tuple[float, object]:
+    times = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scanning post frontmatter")
+    parser.add_argument("--posts", type=int, default=4000, help="Posts in the synthetic tree (default: 4000)")
+    parser.add_argument("--touch", type=float, default=0.01,
+                        help="Share of posts modified before the incremental run (default: 0.01)")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions, median is reported (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        build_tree(root, args.posts)
+        posts_dir = root / QUARTO_POSTS_DIR
+        index_path = root / "frontmatter_index.json"
+        size_mb = sum(p.stat().st_size for p in posts_dir.glob("*/index.qmd")) / 1024 / 1024
+        print(f"Synthetic tree: {args.posts} posts, {size_mb:.1f} MB of index.qmd")
+
+        def scan_all(index=None):
+            return [p for t in ("makeover-monday", "tidytuesday") for p in scan_posts(root, t, index)]
+
+        original = post_to_x.extract_frontmatter
+        post_to_x.extract_frontmatter = legacy_extract_frontmatter
+        try:
+            legacy_ms, legacy = _timeit(scan_all, args.runs)
+        finally:
+            post_to_x.extract_frontmatter = original
+        early_ms, early = _timeit(scan_all, args.runs)
+
+        def cold():
+            if index_path.exists():
+                index_path.unlink()
+            return scan_all(FrontmatterIndex(index_path, posts_dir))
+
+        cold_ms, _ = _timeit(cold, args.runs)
+        warm_ms, warm = _timeit(lambda: scan_all(FrontmatterIndex(index_path, posts_dir)), args.runs)
+
+        # actions/checkout 直後と同じく、内容は同じまま全ファイルの mtime を変える
+        for qmd in posts_dir.glob("*/index.qmd"):
+            st = qmd.stat()
+            os.utime(qmd, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        checkout_index = FrontmatterIndex(index_path, posts_dir)
+        started = time.perf_counter()
+        checkout = scan_all(checkout_index)
+        checkout_ms = (time.perf_counter() - started) * 1000
+        checkout_index.save()
+
+        # 一部の記事を書き換えて mtime とサイズを変える
+        touched = random.Random(2).sample(sorted(posts_dir.glob("*/index.qmd")),
+                                          max(1, int(args.posts * args.touch)))
+        for qmd in touched:
+            with open(qmd, "a", encoding="utf-8") as f:
+                f.write("\n")
+        index = FrontmatterIndex(index_path, posts_dir)
+        started = time.perf_counter()
+        incremental = scan_all(index)
+        incr_ms = (time.perf_counter() - started) * 1000
+
+        print(f"  full read_text + regex (legacy): {legacy_ms:9.1f} ms")
+        print(f"  read up to closing ---:          {early_ms:9.1f} ms")
+        print(f"  index, no sidecar (cold):        {cold_ms:9.1f} ms")
+        print(f"  index, sidecar, nothing changed: {warm_ms:9.1f} ms")
+        print(f"  index, fresh checkout (mtimes):  {checkout_ms:9.1f} ms  "
+              f"(read {checkout_index.stats['misses']}, rehashed {checkout_index.stats['rehashed']})")
+        print(f"  {f'index, {len(touched)} posts changed:':<33}{incr_ms:9.1f} ms  "
+              f"(read {index.stats['misses']}, rehashed {index.stats['rehashed']}, reused {index.stats['hits']})")
+        print(f"  sidecar size: {os.path.getsize(index_path) / 1024:.0f} KB")
+
+        same = legacy == early == warm == checkout == incremental
+        print(f"  results identical: {same}")
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+X / Bluesky / Mastodon への同時投稿
+
+post_weekly_calendar.py / capture_sunday_markets.py / post_to_x.py は本文のセクション
+（tweet_composer.section()）と画像を make_post() にまとめて publish() を1回呼ぶ。
+publish() は設定済みの投稿先ごとに本文を組み立て直し、asyncio で同時に投稿して
+投稿先ごとの結果と所要時間を返す。
+
+    X:        script 側の post_to_x()（x_client 経由）をそのまま使う。280（重み付き）
+    Bluesky:  AT Protocol の XRPC（createSession / uploadBlob / createRecord）。300（書記素）。
+              URL とハッシュタグは facets に変換する。1枚 1MB を超える画像は添付しない
+    Mastodon: REST API（/api/v2/media / /api/v1/statuses）。500（URL は 23）。
+              Idempotency-Key を付けるので同じ本文の再送で二重投稿にならない
+
+認証情報（未設定の投稿先は飛ばす。ドライランでは本文の確認だけなので不要）:
+    BLUESKY_HANDLE / BLUESKY_APP_PASSWORD / BLUESKY_SERVICE（既定 https://bsky.social）
+    MASTODON_BASE_URL / MASTODON_ACCESS_TOKEN / MASTODON_CHAR_LIMIT（既定 500）
+
+X が主な投稿先なので、呼び出し側は X の結果で成否を決め、他の投稿先の失敗は警告に
+とどめる（X に投稿済みのまま再実行すると X が二重投稿になるため）。
+
+使用方法（ローカルのスタンドインサーバーに投稿してみる）:
+    python publishers.py "📅 来週の重要経済指標 https://example.com #経済指標"
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import hashlib
+import argparse
+import mimetypes
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import requests
+
+from tweet_composer import (
+    TWEET_LIMIT, BLUESKY_LIMIT, MASTODON_LIMIT,
+    compose, truncate, weighted_length, grapheme_length, mastodon_length,
+)
+
+PLATFORMS = ["x", "bluesky", "mastodon"]
+
+BLUESKY_SERVICE = "https://bsky.social"
+BLUESKY_MAX_IMAGE_BYTES = 1_000_000
+MAX_IMAGES = 4
+MASTODON_MEDIA_TIMEOUT = 30  # 画像の処理（202）を待つ上限（秒）
+
+_LINK_RE = re.compile(r"https?://[^\s　]+")
+_TAG_RE = re.compile(r"(?<!\S)#([^\s#　]+)")
+
+
+class PublishError(Exception):
+    """投稿先の API のエラー（status は HTTP ステータス）"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}")
+        self.status = status
+
+
+def make_post(text: str, sections: list[dict] | None = None, media: list[tuple[str, bytes]] | None = None) -> dict:
+    """投稿の内容（text は X 向けに組み立てた本文。sections があれば投稿先ごとに組み立て直す）"""
+    return {"text": text, "sections": sections, "media": list(media or [])}
+
+
+class Publisher(ABC):
+    """投稿先の共通部分（文字数の数え方と本文の組み立て）。投稿先ごとに publish() を実装する"""
+
+    name = ""
+    limit = TWEET_LIMIT
+
+    def length(self, text: str) -> int:
+        return weighted_length(text)
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    def adapt(self, post: dict) -> str:
+        """この投稿先の文字数制限に合わせた本文"""
+        if post["sections"]:
+            text = compose(post["sections"], self.limit, self.length)
+            if self.length(text) <= self.limit:
+                return text
+        return truncate(post["text"], self.limit, length=self.length)
+
+    @abstractmethod
+    def publish(self, text: str, media: list[tuple[str, bytes]], dry_run: bool = False) -> dict:
+        """投稿して {"status", "id", "url"} を返す（失敗は PublishError）"""
+
+    def _dry_run(self, text: str, media: list[tuple[str, bytes]]) -> dict:
+        print(f"=== DRY RUN MODE ({self.name}) ===")
+        print(f"Would post ({self.length(text)}/{self.limit} chars):\n{text}")
+        for name, data in media:
+            print(f"Would attach image: {name} ({len(data) / 1024:.0f} KB)")
+        return {"status": 200, "id": None, "url": None}
+
+
+class XPublisher(Publisher):
+    """X への投稿（各スクリプトの post_to_x() を呼ぶ）
+
+    post_fn(text, media) は (success, http_status, tweet_id) を返す。ドライランの表示と
+    403（重複）の扱いは post_fn 側で行う。
+    """
+
+    name = "x"
+    limit = TWEET_LIMIT
+
+    def __init__(self, post_fn):
+        self.post_fn = post_fn
+
+    def adapt(self, post: dict) -> str:
+        # X 向けの本文は各スクリプトで組み立て済み（フォールバックも含む）
+        return post["text"]
+
+    def publish(self, text: str, media: list[tuple[str, bytes]], dry_run: bool = False) -> dict:
+        success, status, tweet_id = self.post_fn(text, media)
+        if not success:
+            raise PublishError(status, "X post failed")
+        return {"status": status, "id": tweet_id,
+                "url": f"https://x.com/i/web/status/{tweet_id}" if tweet_id else None}
+
+
+class BlueskyPublisher(Publisher):
+    """Bluesky（AT Protocol）への投稿"""
+
+    name = "bluesky"
+    limit = BLUESKY_LIMIT
+
+    def __init__(self, handle: str | None = None, app_password: str | None = None,
+                 service: str = BLUESKY_SERVICE):
+        self.handle = handle
+        self.app_password = app_password
+        self.service = service.rstrip("/")
+        self.session = requests.Session()
+        self._did: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "BlueskyPublisher":
+        return cls(os.environ.get("BLUESKY_HANDLE"), os.environ.get("BLUESKY_APP_PASSWORD"),
+                   os.environ.get("BLUESKY_SERVICE") or BLUESKY_SERVICE)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.handle and self.app_password)
+
+    def length(self, text: str) -> int:
+        return grapheme_length(text)
+
+    def _xrpc(self, nsid: str, **kwargs) -> dict:
+        response = self.session.post(f"{self.service}/xrpc/{nsid}", timeout=60, **kwargs)
+        if response.status_code >= 400:
+            raise PublishError(response.status_code, f"{nsid}: {response.text[:200]}")
+        return response.json()
+
+    def _login(self) -> None:
+        if self._did:
+            return
+        auth = self._xrpc("com.atproto.server.createSession",
+                          json={"identifier": self.handle, "password": self.app_password})
+        self._did = auth["did"]
+        self.session.headers["Authorization"] = f"Bearer {auth['accessJwt']}"
+
+    @staticmethod
+    def facets(text: str) -> list[dict]:
+        """URL とハッシュタグの facets（位置は UTF-8 のバイト数で指定する）"""
+        def span(start: int, end: int) -> dict:
+            byte_start = len(text[:start].encode("utf-8"))
+            return {"byteStart": byte_start, "byteEnd": byte_start + len(text[start:end].encode("utf-8"))}
+
+        facets = [{"index": span(m.start(), m.end()),
+                   "features": [{"$type": "app.bsky.richtext.facet#link", "uri": m.group()}]}
+                  for m in _LINK_RE.finditer(text)]
+        facets += [{"index": span(m.start(), m.end()),
+                    "features": [{"$type": "app.bsky.richtext.facet#tag", "tag": m.group(1)}]}
+                   for m in _TAG_RE.finditer(text)]
+        return facets
+
+    def publish(self, text: str, media: list[tuple[str, bytes]], dry_run: bool = False) -> dict:
+        if dry_run:
+            return self._dry_run(text, media[:MAX_IMAGES])
+        self._login()
+
+        images = []
+        for name, data in media[:MAX_IMAGES]:
+            if len(data) > BLUESKY_MAX_IMAGE_BYTES:
+                print(f"    WARNING: {name} is {len(data) / 1024:.0f} KB, over the Bluesky image limit; skipped")
+                continue
+            blob = self._xrpc("com.atproto.repo.uploadBlob", data=data, headers={
+                "Content-Type": mimetypes.guess_type(name)[0] or "image/png",
+            })["blob"]
+            images.append({"alt": "", "image": blob})
+
+        record = {
+            "$type": "app.bsky.feed.post",
+            "text": text,
+            "createdAt": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "langs": ["ja"],
+        }
+        facets = self.facets(text)
+        if facets:
+            record["facets"] = facets
+        if images:
+            record["embed"] = {"$type": "app.bsky.embed.images", "images": images}
+        created = self._xrpc("com.atproto.repo.createRecord", json={
+            "repo": self._did, "collection": "app.bsky.feed.post", "record": record,
+        })
+        rkey = created["uri"].rsplit("/", 1)[-1]
+        return {"status": 200, "id": created["uri"],
+                "url": f"https://bsky.app/profile/{self.handle}/post/{rkey}"}
+
+
+class MastodonPublisher(Publisher):
+    """Mastodon への投稿"""
+
+    name = "mastodon"
+
+    def __init__(self, base_url: str | None = None, access_token: str | None = None,
+                 limit: int = MASTODON_LIMIT):
+        self.base_url = (base_url or "").rstrip("/")
+        self.access_token = access_token
+        self.limit = limit
+        self.session = requests.Session()
+        if access_token:
+            self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    @classmethod
+    def from_env(cls) -> "MastodonPublisher":
+        return cls(os.environ.get("MASTODON_BASE_URL"), os.environ.get("MASTODON_ACCESS_TOKEN"),
+                   int(os.environ.get("MASTODON_CHAR_LIMIT") or MASTODON_LIMIT))
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.access_token)
+
+    def length(self, text: str) -> int:
+        return mastodon_length(text)
+
+    def _call(self, method: str, path: str, **kwargs) -> dict:
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=60, **kwargs)
+        if response.status_code >= 400:
+            raise PublishError(response.status_code, f"{path}: {response.text[:200]}")
+        return response.json()
+
+    def publish(self, text: str, media: list[tuple[str, bytes]], dry_run: bool = False) -> dict:
+        if dry_run:
+            return self._dry_run(text, media[:MAX_IMAGES])
+
+        media_ids = []
+        for name, data in media[:MAX_IMAGES]:
+            uploaded = self._call("POST", "/api/v2/media", files={"file": (name, data)})
+            # 202 の場合は処理が終わる（url が入る）まで待つ
+            deadline = time.monotonic() + MASTODON_MEDIA_TIMEOUT
+            while not uploaded.get("url"):
+                if time.monotonic() >= deadline:
+                    raise PublishError(202, f"media {uploaded['id']} not processed after {MASTODON_MEDIA_TIMEOUT}s")
+                time.sleep(1)
+                uploaded = self._call("GET", f"/api/v1/media/{uploaded['id']}")
+            media_ids.append(uploaded["id"])
+
+        status = self._call("POST", "/api/v1/statuses", json={
+            "status": text, "media_ids": media_ids, "visibility": "public", "language": "ja",
+        }, headers={"Idempotency-Key": hashlib.sha1(text.encode("utf-8")).hexdigest()})
+        return {"status": 200, "id": status["id"], "url": status.get("url")}
+
+
+def build_publishers(platforms: list[str], x_post_fn, dry_run: bool = False) -> list[Publisher]:
+    """投稿先のリストを作る（認証情報のない投稿先は、ドライラン以外では飛ばす）"""
+    publishers = []
+    for name in platforms:
+        if name == "x":
+            publisher = XPublisher(x_post_fn)
+        elif name == "bluesky":
+            publisher = BlueskyPublisher.from_env()
+        elif name == "mastodon":
+            publisher = MastodonPublisher.from_env()
+        else:
+            raise ValueError(f"Unknown platform: {name}")
+        if publisher.configured or dry_run:
+            publishers.append(publisher)
+        else:
+            print(f"{name}: not configured, skipping")
+    return publishers
+
+
+async def _publish_one(publisher: Publisher, post: dict, dry_run: bool) -> dict:
+    text = publisher.adapt(post)
+    result = {"platform": publisher.name, "ok": False, "status": 0, "id": None, "url": None,
+              "length": publisher.length(text), "limit": publisher.limit, "error": None}
+    started = time.perf_counter()
+    try:
+        result.update(await asyncio.to_thread(publisher.publish, text, post["media"], dry_run))
+        result["ok"] = True
+    except PublishError as e:
+        result.update(status=e.status, error=str(e))
+    except requests.RequestException as e:
+        result["error"] = str(e)
+    except Exception as e:
+        # 想定外の応答（キーの欠けた JSON など）でも、他の投稿先の結果は返す
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def publish_async(post: dict, publishers: list[Publisher], dry_run: bool = False) -> dict[str, dict]:
+    """全投稿先に同時に投稿し、投稿先名 → 結果の辞書を返す"""
+    results = await asyncio.gather(*(_publish_one(p, post, dry_run) for p in publishers))
+    return {r["platform"]: r for r in results}
+
+
+def publish(post: dict, publishers: list[Publisher], dry_run: bool = False) -> dict[str, dict]:
+    """publish_async() の同期版（結果の一覧も表示する）
+
+    Returns:
+        {"<platform>": {"ok", "status", "id", "url", "length", "limit", "latency_ms", "error"}}
+    """
+    results = asyncio.run(publish_async(post, publishers, dry_run))
+    print("\nPublish results:")
+    for r in results.values():
+        outcome = "ok" if r["ok"] else f"FAILED ({r['error']})"
+        print(f"  {r['platform']:<9} {outcome:<10} {r['length']:>3}/{r['limit']} chars  "
+              f"{r['latency_ms']:7.0f}ms  {r['url'] or ''}")
+    return results
+
+
+def primary_result(results: dict[str, dict]) -> dict:
+    """実行の成否を決める結果（X に投稿したなら X、そうでなければ全投稿先が成功したか）"""
+    if "x" in results:
+        return results["x"]
+    ok = bool(results) and all(r["ok"] for r in results.values())
+    return {"platform": None, "ok": ok, "status": 200 if ok else 0, "id": None}
+
+
+def format_results(results: dict[str, dict]) -> str:
+    """GITHUB_OUTPUT 用の要約（例: x=ok,bluesky=ok,mastodon=failed）"""
+    return ",".join(f"{name}={'ok' if r['ok'] else 'failed'}" for name, r in results.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a post to local stand-ins of every platform")
+    parser.add_argument("text", type=str, help="Post text")
+    parser.add_argument("--latency-ms", type=float, default=100, help="Stand-in server delay per request")
+    args = parser.parse_args()
+
+    from fake_social_servers import SocialState, start_bluesky, start_mastodon
+    from fake_x_server import FakeXState, start_server
+    from x_client import XClient, XError
+
+    x_state = FakeXState(latency_ms=args.latency_ms)
+    _, x_base = start_server(x_state)
+    social = SocialState(latency_ms=args.latency_ms)
+    _, bsky_base = start_bluesky(social)
+    _, masto_base = start_mastodon(social)
+    client = XClient("k", "s", "t", "ts", api_base=x_base, upload_base=x_base)
+
+    def x_post(text, media):
+        try:
+            return True, 200, client.create_tweet(text)
+        except XError as e:
+            return False, e.status, None
+
+    publishers = [
+        XPublisher(x_post),
+        BlueskyPublisher("bench.bsky.social", "app-password", bsky_base),
+        MastodonPublisher(masto_base, "token"),
+    ]
+    started = time.perf_counter()
+    results = publish(make_post(args.text), publishers)
+    wall_ms = (time.perf_counter() - started) * 1000
+    print(f"\nwall {wall_ms:.0f}ms (one after another: {sum(r['latency_ms'] for r in results.values()):.0f}ms)")
+    sys.exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+記録済み HTTP レスポンスの保存と、それを返すローカル HTTP サーバー
+
+capture_sunday_markets.py の --record-responses で保存したディレクトリを、
+--replay-server で指定するスタンドインサーバーとして配信する。
+ライブサイトに接続せずにキャプチャ処理を再現・検証するために使う。
+
+ディレクトリ構成:
+    <dir>/manifest.json      {"<host><path>?<query>": {"file", "status", "content_type"}}
+    <dir>/bodies/<sha1>.bin  レスポンス本文
+
+使用方法:
+    python recorded_responses.py tmp/sunday_recorded
+    python recorded_responses.py tmp/sunday_recorded --port 8765
+"""
+
+import sys
+import json
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MANIFEST_NAME = "manifest.json"
+
+
+def response_key(url: str) -> str:
+    """URL からスキームを除いた記録キー（host + path + query）を作る"""
+    parts = urlsplit(url)
+    key = f"{parts.netloc}{parts.path or '/'}"
+    if parts.query:
+        key += f"?{parts.query}"
+    return key
+
+
+def local_url(base_url: str, original_url: str) -> str:
+    """元の URL をスタンドインサーバー上の URL に変換する"""
+    return f"{base_url.rstrip('/')}/{response_key(original_url)}"
+
+
+def load_manifest(record_dir: Path) -> dict:
+    """manifest.json を読み込む（なければ空）"""
+    path = record_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(record_dir: Path, manifest: dict) -> None:
+    """manifest.json を書き出す"""
+    record_dir.mkdir(parents=True, exist_ok=True)
+    with open(record_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def record_response(
+    record_dir: Path,
+    manifest: dict,
+    url: str,
+    body: bytes,
+    status: int = 200,
+    content_type: str = "application/octet-stream",
+) -> None:
+    """レスポンス本文を保存し、manifest（メモリ上）に登録する"""
+    digest = hashlib.sha1(body).hexdigest()
+    bodies = record_dir / "bodies"
+    bodies.mkdir(parents=True, exist_ok=True)
+    body_path = bodies / f"{digest}.bin"
+    if not body_path.exists():
+        body_path.write_bytes(body)
+    manifest[response_key(url)] = {
+        "file": f"bodies/{digest}.bin",
+        "status": status,
+        "content_type": content_type,
+    }
+
+
+def _make_handler(record_dir: Path, manifest: dict):
+    """記録ディレクトリを配信するリクエストハンドラを作る"""
+
+    class RecordedHandler(BaseHTTPRequestHandler):
+        def _serve(self):
+            entry = manifest.get(self.path.lstrip("/"))
+            if entry is None:
+                self.send_error(404, "Not recorded")
+                return
+            body = (record_dir / entry["file"]).read_bytes()
+            self.send_response(entry.get("status", 200))
+            self.send_header("Content-Type", entry.get("content_type", "application/octet-stream"))
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        do_GET = _serve
+        do_POST = _serve
+        do_HEAD = _serve
+
+        def log_message(self, format, *args):
+            pass
+
+    return RecordedHandler
+
+
+def start_server(record_dir: Path, port: int = 0) -> tuple[ThreadingHTTPServer, str]:
+    """スタンドインサーバーをバックグラウンドスレッドで起動し、(server, base_url) を返す"""
+    manifest = load_manifest(record_dir)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(record_dir, manifest))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded HTTP responses locally")
+    parser.add_argument("record_dir", type=str, help="Directory written by --record-responses")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    record_dir = Path(args.record_dir)
+    if not (record_dir / MANIFEST_NAME).exists():
+        print(f"ERROR: {record_dir / MANIFEST_NAME} not found")
+        sys.exit(1)
+
+    server, base_url = start_server(record_dir, args.port)
+    print(f"Serving {len(load_manifest(record_dir))} recorded responses at {base_url}")
+    print(f"Use: capture_sunday_markets.py --replay-server {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
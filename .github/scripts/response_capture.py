@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+チャートページのレスポンスの取得（価格系列の抽出・記録）と、記録済みレスポンスでの再生
+
+capture_sunday_markets.py がページのレスポンスを監視し、価格系列を含む JSON を
+market_series.py で取り出す（--capture-mode network / both）。--record-responses では
+全レスポンスを recorded_responses.py の形式で保存し、--replay-server では全リクエストを
+その記録を配信するスタンドインサーバーへ振り向ける。
+"""
+
+import json
+from pathlib import Path
+
+from market_series import parse_payload, find_series, best_series, summarize_series
+from recorded_responses import record_response, local_url
+
+# 価格系列の候補として JSON パースするレスポンスの上限サイズ
+MAX_SERIES_RESPONSE_BYTES = 5 * 1024 * 1024
+
+
+async def install_response_capture(page, session: dict) -> list[tuple[str, object]]:
+    """ページのレスポンスを監視し、価格系列を含む JSON を (URL, payload) として集める
+
+    session["record_dir"] があれば全レスポンスを記録用に保存する。
+    """
+    payloads: list[tuple[str, object]] = []
+    record_dir = session.get("record_dir")
+
+    async def on_response(response):
+        request = response.request
+        content_type = response.headers.get("content-type", "")
+        wants_series = session["capture_mode"] != "screenshot" and (
+            request.resource_type in ("xhr", "fetch")
+            or "json" in content_type or "javascript" in content_type
+        )
+        if not wants_series and not record_dir:
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return  # リダイレクトや中断されたリクエストは本文を持たない
+        if record_dir:
+            record_response(
+                record_dir, session["record_manifest"], response.url, body,
+                status=response.status, content_type=content_type or "application/octet-stream",
+            )
+        if wants_series and len(body) <= MAX_SERIES_RESPONSE_BYTES:
+            payload = parse_payload(body.decode("utf-8", errors="replace"))
+            if payload is not None and find_series(payload):
+                payloads.append((response.url, payload))
+
+    page.on("response", on_response)
+    return payloads
+
+
+async def install_replay_routes(page, replay_url: str) -> None:
+    """全リクエストをスタンドインサーバーの記録済みレスポンスで応答する"""
+
+    async def handle_route(route):
+        try:
+            response = await route.fetch(url=local_url(replay_url, route.request.url))
+        except Exception:
+            await route.abort("connectionrefused")
+            return
+        if response.status == 404:
+            await route.abort("internetdisconnected")
+        else:
+            await route.fulfill(response=response)
+
+    await page.route("**/*", handle_route)
+
+
+def network_market_data(target: dict, payloads: list, output_dir: Path) -> tuple[dict | None, dict | None]:
+    """集めたレスポンスから価格系列を選び、(数値データ, 系列) を返す"""
+    log = f"    [{target['name']}]"
+    series = best_series(payloads)
+    if not series:
+        print(f"{log} Network: no price series in {len(payloads)} candidate responses")
+        return None, None
+
+    summary = summarize_series(series)
+    series_path = output_dir / f"{Path(target['filename']).stem}_series.json"
+    with open(series_path, "w", encoding="utf-8") as f:
+        json.dump({"target": target["name"], **series, "summary": summary}, f, ensure_ascii=False)
+    print(f"{log} Network series: {summary['ticks']} ticks from {series['url']}")
+    print(f"{log} Network data: value={summary['value']}, change={summary['change']}, "
+          f"pct={summary['change_pct']}")
+    return summary, series
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+ジョブの実行レポート（フェーズ別スパン）の記録と比較
+
+capture_sunday_markets.py がブラウザ起動・ページ遷移・待機・スクレイピング・
+スクリーンショット・メディアアップロード・ツイート作成などの所要時間をスパンとして記録し、
+JSON レポートとして保存する。compare サブコマンドで直近のレポートを比較し、
+特定フェーズの遅延やサイト側の劣化を検出する。
+
+使用方法:
+    python run_report.py show tmp/sunday_markets/run_report.json
+    python run_report.py compare --dir tmp/sunday_state/reports --last 8
+    python run_report.py compare a.json b.json c.json --threshold 1.5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from zoneinfo import ZoneInfo
+
+JST = ZoneInfo("Asia/Tokyo")
+
+# compare でこれより小さい差（ms）は誤差として扱う
+MIN_REGRESSION_MS = 300
+
+
+class RunReport:
+    """1回の実行のスパンを集めて JSON レポートにする"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started_at = datetime.now(JST)
+        self._t0 = time.perf_counter()
+        self.spans: list[dict] = []
+        self.meta: dict = {}
+
+    def add_span(
+        self,
+        name: str,
+        duration_ms: float,
+        target: str | None = None,
+        start: float | None = None,
+        status: str = "ok",
+        **attrs,
+    ) -> None:
+        """スパンを追加する（start は time.perf_counter() の値）"""
+        span = {
+            "name": name,
+            "target": target,
+            "start_ms": round(((start if start is not None else time.perf_counter() - duration_ms / 1000)
+                               - self._t0) * 1000, 1),
+            "duration_ms": round(duration_ms, 1),
+            "status": status,
+        }
+        if attrs:
+            span["attrs"] = attrs
+        self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, target: str | None = None, **attrs):
+        """with ブロックをスパンとして記録する（例外時は status=error）"""
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.add_span(name, (time.perf_counter() - started) * 1000,
+                          target=target, start=started, status=status, **attrs)
+
+    def phase_totals(self) -> dict[str, float]:
+        """フェーズ名ごとの合計時間（ms）"""
+        totals: dict[str, float] = {}
+        for s in self.spans:
+            totals[s["name"]] = round(totals.get(s["name"], 0) + s["duration_ms"], 1)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "job": self.job,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+            "meta": self.meta,
+            "phase_totals": self.phase_totals(),
+            "spans": self.spans,
+        }
+
+    def write(self, path: Path) -> dict:
+        """レポートを JSON で保存し、その内容を返す"""
+        data = self.to_dict()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return data
+
+    def write_github(self, report_path: Path | None = None) -> None:
+        """GITHUB_OUTPUT と GITHUB_STEP_SUMMARY にレポートの要約を追記する"""
+        data = self.to_dict()
+        gh_output = os.environ.get("GITHUB_OUTPUT")
+        if gh_output:
+            with open(gh_output, "a") as f:
+                f.write(f"run_duration_ms={data['duration_ms']:.0f}\n")
+                if report_path:
+                    f.write(f"run_report={report_path}\n")
+        summary = os.environ.get("GITHUB_STEP_SUMMARY")
+        if summary:
+            with open(summary, "a", encoding="utf-8") as f:
+                f.write(format_markdown(data))
+
+
+def _by_target(data: dict) -> dict[str, dict[str, float]]:
+    """スパンを target → フェーズ → 合計 ms にまとめる"""
+    table: dict[str, dict[str, float]] = {}
+    for s in data["spans"]:
+        row = table.setdefault(s["target"] or "(run)", {})
+        row[s["name"]] = row.get(s["name"], 0) + s["duration_ms"]
+    return table
+
+
+def format_markdown(data: dict) -> str:
+    """レポートをステップサマリー用の Markdown 表にする"""
+    table = _by_target(data)
+    phases = list(dict.fromkeys(s["name"] for s in data["spans"]))
+    lines = [
+        f"### Run report: {data['job']} ({data['duration_ms'] / 1000:.1f}s)",
+        "",
+        "| target | " + " | ".join(phases) + " |",
+        "|---|" + "---:|" * len(phases),
+    ]
+    for target, row in table.items():
+        cells = [f"{row[p]:.0f}" if p in row else "" for p in phases]
+        lines.append(f"| {target} | " + " | ".join(cells) + " |")
+    errors = [s for s in data["spans"] if s["status"] != "ok"]
+    if errors:
+        lines.append("")
+        lines.append("Errors: " + ", ".join(f"{s['name']}@{s['target'] or 'run'}" for s in errors))
+    return "\n".join(lines) + "\n\n"
+
+
+def load_reports(paths: list[Path]) -> list[dict]:
+    """レポートを読み込み、開始時刻順に並べる"""
+    reports = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"WARNING: Skipping {path}: {e}")
+    return sorted(reports, key=lambda r: r.get("started_at", ""))
+
+
+def compare_reports(reports: list[dict], threshold: float = 1.5) -> list[dict]:
+    """最新レポートの各フェーズ合計を、それ以前のレポートの中央値と比べる
+
+    Returns:
+        フェーズごとの {"phase", "baseline_ms", "latest_ms", "ratio", "regressed"}
+    """
+    if len(reports) < 2:
+        return []
+    latest = reports[-1]
+    baseline = reports[:-1]
+    phases = set(latest["phase_totals"])
+    for r in baseline:
+        phases.update(r["phase_totals"])
+    phases.add("total")
+
+    rows = []
+    for phase in sorted(phases):
+        def value(r):
+            return r["duration_ms"] if phase == "total" else r["phase_totals"].get(phase)
+        history = [v for v in (value(r) for r in baseline) if v is not None]
+        current = value(latest)
+        if not history or current is None:
+            continue
+        base = median(history)
+        ratio = current / base if base else float("inf")
+        rows.append({
+            "phase": phase,
+            "baseline_ms": round(base, 1),
+            "latest_ms": round(current, 1),
+            "ratio": round(ratio, 2),
+            "regressed": ratio >= threshold and current - base >= MIN_REGRESSION_MS,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or compare job run reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    show = sub.add_parser("show", help="Print one report as a table")
+    show.add_argument("report", type=str)
+
+    cmp_ = sub.add_parser("compare", help="Compare the latest report with earlier ones")
+    cmp_.add_argument("reports", nargs="*", type=str, help="Report files (any order)")
+    cmp_.add_argument("--dir", type=str, default=None, help="Directory of run_report-*.json")
+    cmp_.add_argument("--last", type=int, default=8, help="Use the N most recent reports (default: 8)")
+    cmp_.add_argument(
+        "--threshold", type=float, default=1.5,
+        help="Flag phases at least this many times slower than the baseline median (default: 1.5)",
+    )
+    cmp_.add_argument("--summary", action="store_true", help="Also append to GITHUB_STEP_SUMMARY")
+    cmp_.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(format_markdown(load_reports([Path(args.report)])[0]))
+        return
+
+    paths = [Path(p) for p in args.reports]
+    if args.dir:
+        paths.extend(sorted(Path(args.dir).glob("run_report-*.json")))
+    reports = load_reports(paths)[-args.last:]
+    rows = compare_reports(reports, args.threshold)
+    if not rows:
+        print(f"Not enough reports to compare ({len(reports)} found)")
+        return
+
+    lines = [
+        f"### Phase timings: latest vs median of previous {len(reports) - 1} runs",
+        "",
+        "| phase | baseline ms | latest ms | ratio | |",
+        "|---|---:|---:|---:|---|",
+    ]
+    for r in rows:
+        flag = "⚠️ slower" if r["regressed"] else ""
+        lines.append(f"| {r['phase']} | {r['baseline_ms']:.0f} | {r['latest_ms']:.0f} "
+                     f"| {r['ratio']:.2f} | {flag} |")
+    text = "\n".join(lines) + "\n"
+    print(text)
+
+    summary = os.environ.get("GITHUB_STEP_SUMMARY")
+    if args.summary and summary:
+        with open(summary, "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.fail_on_regression and any(r["regressed"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+チャート領域の DOM スクレイピングと、URL ごとに学習したセレクタ（スクレイププロファイル）
+
+capture_sunday_markets.py / sunday_bench.py がチャート見出しと価格を含む領域を探し、
+その部分木だけから現在値・変動額・変動率を読む。一度見つけた領域のセレクタは
+状態ディレクトリの scrape_profiles.json に保存し、次回以降は探索を省く。
+
+使用方法（保存済みのプロファイルを確認）:
+    python scrape_profiles.py tmp/sunday_state/scrape_profiles.json
+"""
+
+import io
+import sys
+import json
+from pathlib import Path
+
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+
+# チャート領域の特定: 「サンデー…」見出しと、価格を含む祖先要素を1回の TreeWalker で探す
+LOCATE_CHART_REGION_JS = """
+() => {
+    const TITLE_RE = /^(X\\s+)?サンデー/;
+    function cssPath(el) {
+        const parts = [];
+        while (el && el.nodeType === Node.ELEMENT_NODE && el !== document.body) {
+            if (el.id && document.querySelectorAll('#' + CSS.escape(el.id)).length === 1) {
+                parts.unshift('#' + CSS.escape(el.id));
+                return parts.join(' > ');
+            }
+            let idx = 1;
+            for (let sib = el.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                if (sib.nodeName === el.nodeName) idx++;
+            }
+            parts.unshift(el.nodeName.toLowerCase() + ':nth-of-type(' + idx + ')');
+            el = el.parentElement;
+        }
+        parts.unshift('body');
+        return parts.join(' > ');
+    }
+
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    for (let n = walker.nextNode(); n; n = walker.nextNode()) {
+        if (n.textContent.indexOf('サンデー') === -1) continue;
+        // "X " と "サンデー…" が別ノードのこともあるので数階層だけ親をたどる
+        let el = n.parentElement;
+        for (let depth = 0; el && depth < 3; depth++, el = el.parentElement) {
+            const text = (el.textContent || '').trim();
+            if (text.length >= 40) break;
+            if (!TITLE_RE.test(text) || el.offsetHeight <= 30 || el.offsetHeight >= 60) continue;
+            const rect = el.getBoundingClientRect();
+            if (rect.y <= 100) continue;
+            let root = el.parentElement;
+            while (root && root !== document.body && root.getBoundingClientRect().height < 300) {
+                root = root.parentElement;
+            }
+            return {
+                x: 0, y: Math.floor(rect.y), found: true,
+                title_selector: cssPath(el),
+                root_selector: root ? cssPath(root) : 'body',
+            };
+        }
+    }
+    return { x: 0, y: 305, found: false, title_selector: null, root_selector: null };
+}
+"""
+
+# プロファイル済みの見出し要素から位置だけを読む（見つからなければ null）
+CHART_TITLE_BOUNDS_JS = """
+(selector) => {
+    const el = document.querySelector(selector);
+    if (!el || el.offsetHeight === 0) return null;
+    return { x: 0, y: Math.floor(el.getBoundingClientRect().y), found: true };
+}
+"""
+
+# rootSelector を渡すとその部分木だけを走査する（省略時は document.body 全体）
+SCRAPE_MARKET_DATA_JS = """
+(opts) => {
+    const rootSelector = opts && opts.rootSelector;
+    const root = rootSelector ? document.querySelector(rootSelector) : document.body;
+    const result = {
+        value: null, change: null, change_pct: null, debug_texts: [],
+        matched: !!root,
+    };
+    if (!root) return result;
+    const segments = [];
+    const seen = new Set();
+
+    const SKIP_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'SVG']);
+    const walker = document.createTreeWalker(
+        root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT,
+        { acceptNode(node) {
+            if (node.nodeType === Node.ELEMENT_NODE) {
+                return SKIP_TAGS.has(node.nodeName.toUpperCase())
+                    ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_SKIP;
+            }
+            return NodeFilter.FILTER_ACCEPT;
+        } },
+    );
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const text = node.textContent.trim();
+        // 価格・変動額・変動率はすべて数字を含むので、それ以外はスタイル計算を省く
+        if (text.length < 1 || text.length > 50 || !/\\d/.test(text)) continue;
+        const parent = node.parentElement;
+        if (!parent) continue;
+        const rect = parent.getBoundingClientRect();
+        if (rect.height === 0) continue;
+        const style = getComputedStyle(parent);
+        if (style.display === 'none' || style.visibility === 'hidden') continue;
+        const key = text + '|' + Math.round(rect.x) + '|' + Math.round(rect.y);
+        if (!seen.has(key)) {
+            seen.add(key);
+            segments.push({
+                text: text, x: rect.x, y: rect.y,
+                fontSize: parseFloat(style.fontSize),
+                color: style.color,
+            });
+        }
+    }
+    segments.sort((a, b) => a.y - b.y || a.x - b.x);
+
+    const chartSegs = segments.filter(s => s.y > 400);
+    result.debug_texts = chartSegs.slice(0, 30).map(
+        s => '[y=' + Math.round(s.y) + ' x=' + Math.round(s.x)
+             + ' fs=' + s.fontSize + ' c=' + s.color.slice(0,20)
+             + '] "' + s.text + '"'
+    );
+
+    // Price: largest-font pure number in chart area
+    let maxFs = 0;
+    let priceX = 0, priceY = 0;
+    for (const s of chartSegs) {
+        const c = s.text.replace(/[,\\s]/g, '');
+        if (/^\\d+\\.?\\d*$/.test(c) && s.fontSize > maxFs) {
+            const v = parseFloat(c);
+            if (v > 1) { result.value = v; maxFs = s.fontSize; priceX = s.x; priceY = s.y; }
+        }
+    }
+
+    // Combine decimal part for price (e.g. "47,405" + ".20" → 47405.20)
+    if (result.value !== null && result.value === Math.floor(result.value)) {
+        for (const s of chartSegs) {
+            if (/^\\.\\d+$/.test(s.text.trim())
+                && Math.abs(s.y - priceY) < 40
+                && s.x > priceX && s.x < priceX + 300
+                && s.fontSize > maxFs * 0.4) {
+                result.value = parseFloat(result.value.toString() + s.text.trim());
+                break;
+            }
+        }
+    }
+
+    // Change: red/green colored number or signed number in chart area (fs >= 20)
+    function parseColor(c) {
+        const m = c.match(/rgb\\((\\d+),\\s*(\\d+),\\s*(\\d+)\\)/);
+        if (!m) return null;
+        return { r: parseInt(m[1]), g: parseInt(m[2]), b: parseInt(m[3]) };
+    }
+    let changeSeg = null;
+    for (const s of chartSegs) {
+        if (s.fontSize < 20) continue;
+        const c = s.text.replace(/[,\\s]/g, '');
+        const m = c.match(/^([+-]?\\d+\\.?\\d*)$/);
+        if (!m) continue;
+        const v = parseFloat(m[1]);
+        if (v === result.value || v === 0) continue;
+        const rgb = parseColor(s.color);
+        if (!rgb) continue;
+        const isRed = rgb.r > 150 && rgb.g < 100;
+        const isGreen = rgb.g > 100 && rgb.r < 80;
+        if (c.startsWith('+') || c.startsWith('-')) {
+            result.change = v; changeSeg = s; break;
+        }
+        if (isRed) {
+            result.change = -Math.abs(v); changeSeg = s; break;
+        }
+        if (isGreen) {
+            result.change = Math.abs(v); changeSeg = s; break;
+        }
+    }
+
+    // Combine decimal part for change
+    if (changeSeg && result.change === Math.floor(result.change)) {
+        for (const s of chartSegs) {
+            if (/^\\.\\d+$/.test(s.text.trim())
+                && Math.abs(s.y - changeSeg.y) < 30
+                && s.x > changeSeg.x && s.x < changeSeg.x + 200
+                && s.fontSize < changeSeg.fontSize) {
+                const sign = result.change < 0 ? -1 : 1;
+                result.change = sign * parseFloat(Math.abs(result.change).toString() + s.text.trim());
+                break;
+            }
+        }
+    }
+
+    // Percentage: medium-font number < 100, not the price or change
+    for (const s of chartSegs) {
+        if (s.fontSize < 20 || s.fontSize >= maxFs) continue;
+        const c = s.text.replace(/[,\\s%]/g, '');
+        if (/^\\d+\\.\\d+$/.test(c)) {
+            const v = parseFloat(c);
+            if (v < 100 && v > 0
+                && v !== Math.abs(result.value || 0)
+                && v !== Math.abs(result.change || 0)) {
+                result.change_pct = (result.change !== null && result.change < 0) ? -v : v;
+                break;
+            }
+        }
+    }
+
+    return result;
+}
+"""
+
+
+def load_scrape_profiles(path: Path) -> dict:
+    """URL ごとに学習したチャート領域のセレクタを読み込む"""
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"WARNING: Ignoring unreadable scrape profiles {path}: {e}")
+        return {}
+
+
+def save_scrape_profiles(path: Path, profiles: dict) -> None:
+    """学習したセレクタを保存する"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False, indent=2)
+
+
+async def scrape_market_data(
+    page, target_name: str, profile: dict | None = None
+) -> tuple[dict | None, dict | None]:
+    """ページから現在値・変動額・変動率をスクレイピングする
+
+    profile（前回学習したチャート領域のセレクタ）があればその部分木だけを走査し、
+    一致しなくなった場合は領域を探し直し、それでも駄目なら body 全体を走査する。
+
+    Returns:
+        (数値データ, 次回以降に使うプロファイル)
+    """
+    log = f"    [{target_name}]"
+    try:
+        raw = None
+        mode = "full"
+        if profile:
+            raw = await page.evaluate(
+                SCRAPE_MARKET_DATA_JS, {"rootSelector": profile["root_selector"]}
+            )
+            mode = "profile"
+            if raw.get("value") is None:
+                print(f"{log} Scrape profile no longer matches, relearning")
+                raw, profile = None, None
+
+        if raw is None:
+            region = await page.evaluate(LOCATE_CHART_REGION_JS)
+            if region.get("found"):
+                raw = await page.evaluate(
+                    SCRAPE_MARKET_DATA_JS, {"rootSelector": region["root_selector"]}
+                )
+                mode = "learned"
+                if raw.get("value") is not None:
+                    profile = {
+                        "root_selector": region["root_selector"],
+                        "title_selector": region["title_selector"],
+                    }
+                else:
+                    raw = None
+
+        if raw is None:
+            raw = await page.evaluate(SCRAPE_MARKET_DATA_JS, {"rootSelector": None})
+            mode = "full"
+
+        debug = raw.get("debug_texts", [])
+        value = raw.get("value")
+        change = raw.get("change")
+        change_pct = raw.get("change_pct")
+
+        if debug and value is None:
+            print(f"{log} Scrape debug ({len(debug)} chart segments):")
+            for line in debug[:20]:
+                print(f"{log}   {line}")
+
+        if value is not None:
+            data = {"value": value}
+            if change is not None:
+                data["change"] = change
+            if change_pct is not None:
+                data["change_pct"] = change_pct
+            print(f"{log} Scraped ({mode}): value={value}, change={change}, pct={change_pct}")
+            return data, profile
+
+        print(f"{log} Scrape: no price found")
+        return None, None
+    except Exception as e:
+        print(f"{log} Scrape error: {e}")
+        return None, profile
+
+
+async def find_chart_bounds(page, profile: dict | None) -> dict:
+    """スクリーンショットの切り出し位置（チャート見出しの y 座標）を求める"""
+    if profile and profile.get("title_selector"):
+        bounds = await page.evaluate(CHART_TITLE_BOUNDS_JS, profile["title_selector"])
+        if bounds:
+            return bounds
+    return await page.evaluate(LOCATE_CHART_REGION_JS)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: scrape_profiles.py <scrape_profiles.json>")
+        sys.exit(1)
+    profiles = load_scrape_profiles(Path(sys.argv[1]))
+    for url, profile in profiles.items():
+        print(url)
+        print(f"  root:  {profile.get('root_selector')}")
+        print(f"  title: {profile.get('title_selector')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+サンデー指数キャプチャのオフラインベンチマーク
+
+capture_sunday_markets.py --snapshot-dir で保存したページ（DOM スナップショット +
+記録済みレスポンス）をローカルのスタンドインサーバーから配信し、キャプチャ処理一式を
+繰り返し実行して、フェーズ別レイテンシのパーセンタイルと抽出値の一致率を報告する。
+
+使用方法:
+    python capture_sunday_markets.py --snapshot-dir tmp/sunday_snapshot --capture-only
+    python sunday_bench.py tmp/sunday_snapshot
+    python sunday_bench.py tmp/sunday_snapshot --runs 20 --no-profile --json bench.json
+"""
+
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from pathlib import Path
+
+from capture_sunday_markets import (
+    async_playwright,
+    require_playwright,
+    new_session,
+    launch_browser_context,
+    _capture_target,
+)
+from sunday_targets import load_targets
+from network_policy import load_network_policy
+from recorded_responses import start_server, MANIFEST_NAME
+
+COMPARED_FIELDS = ("value", "change", "change_pct")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """線形補間のパーセンタイル（q は 0〜100）"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def _same(expected, actual) -> bool:
+    """抽出値が記録時と一致するか（浮動小数の誤差は許容）"""
+    if expected is None or actual is None:
+        return expected is actual
+    return abs(expected - actual) <= 1e-9 * max(1.0, abs(expected))
+
+
+async def run_benchmark(
+    snapshot_dir: Path,
+    targets: list[dict],
+    expectations: dict,
+    runs: int,
+    use_profiles: bool = True,
+    chart_timeout_ms: int = 8000,
+) -> dict:
+    """スナップショットに対してキャプチャを runs 回繰り返し、計測結果を返す"""
+    server, base_url = start_server(snapshot_dir)
+    output_dir = snapshot_dir / "bench_output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    session = new_session(
+        output_dir,
+        chart_timeout_ms=chart_timeout_ms,
+        network_policy=load_network_policy(),
+        replay_url=base_url,
+    )
+    phases: dict[str, list[float]] = {}
+    accuracy: dict[str, dict] = {
+        t["name"]: {"runs": 0, "failures": 0, "mismatches": {}, "last": None} for t in targets
+    }
+    profiles: dict = {}
+
+    try:
+        async with async_playwright() as p:
+            browser, context = await launch_browser_context(p)
+            try:
+                for run in range(runs):
+                    for target in targets:
+                        acc = accuracy[target["name"]]
+                        acc["runs"] += 1
+                        profile = profiles.get(target["url"]) if use_profiles else None
+                        started = time.perf_counter()
+                        try:
+                            with contextlib.redirect_stdout(io.StringIO()):
+                                result = await _capture_target(context, target, session, profile)
+                        except Exception as e:
+                            acc["failures"] += 1
+                            print(f"  run {run + 1} {target['name']}: ERROR {e}")
+                            continue
+                        phases.setdefault("total", []).append(
+                            (time.perf_counter() - started) * 1000
+                        )
+                        for phase, ms in result["timings"].items():
+                            phases.setdefault(phase, []).append(ms)
+                        if use_profiles and result["profile"]:
+                            profiles[target["url"]] = result["profile"]
+
+                        data = result["data"] or {}
+                        acc["last"] = {k: data.get(k) for k in COMPARED_FIELDS}
+                        expected = expectations.get(target["name"], {})
+                        for field in COMPARED_FIELDS:
+                            if not _same(expected.get(field), data.get(field)):
+                                acc["mismatches"][field] = acc["mismatches"].get(field, 0) + 1
+            finally:
+                await browser.close()
+    finally:
+        server.shutdown()
+
+    return {
+        "runs": runs,
+        "use_profiles": use_profiles,
+        "phases": {
+            phase: {
+                "n": len(values),
+                "p50": round(_percentile(values, 50), 1),
+                "p90": round(_percentile(values, 90), 1),
+                "p99": round(_percentile(values, 99), 1),
+                "max": round(max(values), 1),
+            }
+            for phase, values in phases.items()
+        },
+        "accuracy": accuracy,
+    }
+
+
+def print_report(report: dict, expectations: dict) -> None:
+    """計測結果を表形式で表示する"""
+    print(f"\nPhase latency (ms) over {report['runs']} runs "
+          f"(profiles {'on' if report['use_profiles'] else 'off'}):")
+    print(f"  {'phase':<16}{'n':>5}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for phase, st in sorted(report["phases"].items(), key=lambda kv: kv[0] == "total"):
+        print(f"  {phase:<16}{st['n']:>5}{st['p50']:>10.1f}{st['p90']:>10.1f}"
+              f"{st['p99']:>10.1f}{st['max']:>10.1f}")
+
+    print("\nExtraction vs expectations:")
+    for name, acc in report["accuracy"].items():
+        expected = expectations.get(name, {})
+        ok = acc["runs"] - acc["failures"] - max(acc["mismatches"].values(), default=0)
+        print(f"  {name}: {ok}/{acc['runs']} exact "
+              f"(failures={acc['failures']}, mismatches={acc['mismatches'] or '-'})")
+        print("    expected: " + ", ".join(f"{k}={expected.get(k)}" for k in COMPARED_FIELDS))
+        if acc["last"]:
+            print("    last:     " + ", ".join(f"{k}={acc['last'][k]}" for k in COMPARED_FIELDS))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Sunday capture pipeline against recorded snapshots"
+    )
+    parser.add_argument("snapshot_dir", type=str, help="Directory written by --snapshot-dir")
+    parser.add_argument("--runs", type=int, default=10, help="Repetitions per target (default: 10)")
+    parser.add_argument("--targets", type=str, default=None, help="Target registry JSON")
+    parser.add_argument(
+        "--no-profile", action="store_true",
+        help="Do not reuse learned scrape profiles (measure full region discovery every run)",
+    )
+    parser.add_argument(
+        "--chart-timeout", type=int, default=8000, help="Readiness deadline in ms (default: 8000)"
+    )
+    parser.add_argument("--json", type=str, default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+    if not require_playwright():
+        sys.exit(1)
+
+    snapshot_dir = Path(args.snapshot_dir)
+    if not (snapshot_dir / MANIFEST_NAME).exists():
+        print(f"ERROR: {snapshot_dir / MANIFEST_NAME} not found "
+              f"(record with capture_sunday_markets.py --snapshot-dir)")
+        sys.exit(1)
+
+    expectations_path = snapshot_dir / "expectations.json"
+    expectations = {}
+    if expectations_path.exists():
+        with open(expectations_path, "r", encoding="utf-8") as f:
+            expectations = json.load(f)
+    else:
+        print("WARNING: expectations.json not found, accuracy will only report extracted values")
+
+    targets = load_targets(Path(args.targets) if args.targets else None)
+    if expectations:
+        targets = [t for t in targets if t["name"] in expectations]
+    if not targets:
+        print("ERROR: No targets to benchmark")
+        sys.exit(1)
+
+    print(f"Benchmarking {len(targets)} targets x {args.runs} runs from {snapshot_dir}")
+    report = asyncio.run(run_benchmark(
+        snapshot_dir,
+        targets,
+        expectations,
+        args.runs,
+        use_profiles=not args.no_profile,
+        chart_timeout_ms=args.chart_timeout,
+    ))
+    print_report(report, expectations)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
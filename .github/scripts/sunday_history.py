@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+サンデー指数の時系列ストア（instrument / date でパーティション分割した Parquet）
+
+capture_sunday_markets.py --record で日曜セッション中に定期取得したサンプルを
+追記専用で保存する。追記は新しい小さな part ファイルを書くだけで、既存ファイルは
+書き換えない。パーティションごとの既存タイムスタンプをメモリに保持し、重複を除く。
+
+ディレクトリ構成（Hive 形式）:
+    <root>/instrument=sunday_dow/date=2026-10-18/part-20261018T091500-1a2b3c4d.parquet
+
+使用方法:
+    python sunday_history.py tmp/sunday_history              # サマリー表示
+    python sunday_history.py tmp/sunday_history --compact    # part ファイルを統合
+"""
+
+import sys
+import uuid
+import argparse
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+JST = ZoneInfo("Asia/Tokyo")
+
+
+def _schema():
+    """保存する列の定義"""
+    return pa.schema([
+        ("ts", pa.timestamp("ms", tz="Asia/Tokyo")),
+        ("value", pa.float64()),
+        ("change", pa.float64()),
+        ("change_pct", pa.float64()),
+        ("source", pa.string()),
+    ])
+
+
+def require_pyarrow() -> bool:
+    """pyarrow が使えるか確認し、なければメッセージを出す"""
+    if pa is None:
+        print("ERROR: pyarrow is not installed. Run: pip install pyarrow")
+        return False
+    return True
+
+
+class HistoryStore:
+    """追記専用のパーティション分割 Parquet ストア"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._seen: dict[tuple[str, str], set[int]] = {}
+
+    def _partition(self, instrument: str, day: str) -> Path:
+        return self.root / f"instrument={instrument}" / f"date={day}"
+
+    def _timestamps(self, instrument: str, day: str) -> set[int]:
+        """パーティション内の既存タイムスタンプ（ms）を返す（初回のみ ts 列だけ読む）"""
+        key = (instrument, day)
+        if key not in self._seen:
+            seen: set[int] = set()
+            for part in self._partition(instrument, day).glob("*.parquet"):
+                column = pq.read_table(part, columns=["ts"]).column("ts")
+                seen.update(column.cast(pa.int64()).to_pylist())
+            self._seen[key] = seen
+        return self._seen[key]
+
+    def append(self, instrument: str, samples: list[dict]) -> int:
+        """サンプル（ts: datetime, value, change, change_pct, source）を追記し、書いた行数を返す"""
+        by_day: dict[str, list[dict]] = {}
+        for sample in samples:
+            ts = sample["ts"].astimezone(JST)
+            by_day.setdefault(ts.strftime("%Y-%m-%d"), []).append(sample)
+
+        written = 0
+        for day, rows in by_day.items():
+            seen = self._timestamps(instrument, day)
+            fresh = []
+            for row in sorted(rows, key=lambda r: r["ts"]):
+                ms = int(row["ts"].timestamp() * 1000)
+                if ms in seen:
+                    continue
+                seen.add(ms)
+                fresh.append(row)
+            if not fresh:
+                continue
+
+            table = pa.Table.from_pylist([
+                {
+                    "ts": r["ts"],
+                    "value": r.get("value"),
+                    "change": r.get("change"),
+                    "change_pct": r.get("change_pct"),
+                    "source": r.get("source", "dom"),
+                }
+                for r in fresh
+            ], schema=_schema())
+            part_dir = self._partition(instrument, day)
+            part_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(JST).strftime("%Y%m%dT%H%M%S")
+            pq.write_table(table, part_dir / f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet")
+            written += len(fresh)
+        return written
+
+    def read(self, instrument: str | None = None, day: str | None = None):
+        """指定条件のサンプルを ts 順の pyarrow.Table で返す"""
+        tables = []
+        for inst_dir in sorted(self.root.glob("instrument=*")):
+            inst = inst_dir.name.split("=", 1)[1]
+            if instrument and inst != instrument:
+                continue
+            for day_dir in sorted(inst_dir.glob("date=*")):
+                if day and day_dir.name.split("=", 1)[1] != day:
+                    continue
+                for part in sorted(day_dir.glob("*.parquet")):
+                    table = pq.read_table(part)
+                    tables.append(table.append_column(
+                        "instrument", pa.array([inst] * table.num_rows, pa.string())
+                    ))
+        if not tables:
+            return None
+        return pa.concat_tables(tables).sort_by([("instrument", "ascending"), ("ts", "ascending")])
+
+    def compact(self) -> int:
+        """パーティションごとに part ファイルを1つに統合する（重複除去・ts 順）"""
+        compacted = 0
+        for day_dir in sorted(self.root.glob("instrument=*/date=*")):
+            parts = sorted(day_dir.glob("*.parquet"))
+            if len(parts) < 2:
+                continue
+            table = pa.concat_tables([pq.read_table(p) for p in parts]).sort_by("ts")
+            ts = table.column("ts").cast(pa.int64()).to_pylist()
+            keep = [i for i, t in enumerate(ts) if i == 0 or t != ts[i - 1]]
+            merged = day_dir / "part-compacted.tmp"
+            pq.write_table(table.take(keep), merged)
+            for p in parts:
+                p.unlink()
+            merged.rename(day_dir / "part-compacted.parquet")
+            compacted += 1
+        self._seen.clear()
+        return compacted
+
+
+def summarize(store: HistoryStore) -> list[dict]:
+    """instrument / date ごとのサンプル数と始値→終値のドリフトを返す"""
+    table = store.read()
+    if table is None:
+        return []
+    rows = table.to_pylist()
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for row in rows:
+        day = row["ts"].astimezone(JST).strftime("%Y-%m-%d")
+        groups.setdefault((row["instrument"], day), []).append(row)
+
+    summary = []
+    for (inst, day), samples in sorted(groups.items()):
+        first, last = samples[0], samples[-1]
+        drift = None
+        if first["value"] and last["value"] is not None:
+            drift = (last["value"] - first["value"]) / first["value"] * 100
+        summary.append({
+            "instrument": inst,
+            "date": day,
+            "samples": len(samples),
+            "first": first["value"],
+            "last": last["value"],
+            "first_ts": first["ts"].astimezone(JST).strftime("%H:%M"),
+            "last_ts": last["ts"].astimezone(JST).strftime("%H:%M"),
+            "drift_pct": drift,
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the Sunday session history store")
+    parser.add_argument("root", type=str, help="History directory (capture --history-dir)")
+    parser.add_argument("--compact", action="store_true", help="Merge part files per partition")
+    args = parser.parse_args()
+
+    if not require_pyarrow():
+        sys.exit(1)
+
+    store = HistoryStore(Path(args.root))
+    if args.compact:
+        print(f"Compacted {store.compact()} partitions")
+
+    rows = summarize(store)
+    if not rows:
+        print(f"No samples in {args.root}")
+        return
+    for r in rows:
+        drift = f"{r['drift_pct']:+.2f}%" if r["drift_pct"] is not None else "n/a"
+        print(f"{r['instrument']:<16} {r['date']}  {r['samples']:>4} samples  "
+              f"{r['first_ts']} {r['first']} -> {r['last_ts']} {r['last']}  drift {drift}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+サンデー指数のキャプチャ対象（ターゲット registry）の読み込み
+
+capture_sunday_markets.py / sunday_bench.py が .github/data/sunday_targets.json
+（または --targets で指定した JSON）からキャプチャ対象と、ポップアップ・チャートタブ
+操作のプロファイルを読み込む。registry の "network" は network_policy.py が読む。
+
+使用方法（registry の内容を確認）:
+    python sunday_targets.py
+    python sunday_targets.py my_targets.json
+"""
+
+import io
+import sys
+import json
+from pathlib import Path
+
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+
+DEFAULT_TARGETS_FILE = Path(__file__).parent.parent / "data" / "sunday_targets.json"
+
+# タブをクリックした後にチャート描画を待つ上限（ms）。readiness 判定が早く満たされればその時点で抜ける
+IG_SETTLE_MS = 3000
+ONE_DAY_SETTLE_MS = 2000
+
+# ポップアップ・チャートタブ操作の既定プロファイル（registry JSON の "actions" で上書き可能）
+#   dismiss: 閉じる対象。selector に一致し、text（部分一致・大文字小文字無視）を含む最初の可視要素
+#   tabs:    text と完全一致する可視要素をクリックし、settle_ms を上限にチャート描画を待つ
+DEFAULT_ACTIONS = {
+    "dismiss": [
+        {"selector": "button", "text": "同意"},
+        {"selector": "button", "text": "OK"},
+        {"selector": "button", "text": "Accept"},
+        {"selector": "button", "text": "閉じる"},
+        {"selector": ".cookie-close"},
+        {"selector": "[class*='cookie'] button"},
+    ],
+    "dismiss_settle_ms": 300,
+    "tabs": [
+        {"name": "ig_tab", "text": "IG", "settle_ms": IG_SETTLE_MS},
+        {"name": "1day_tab", "text": "１日", "settle_ms": ONE_DAY_SETTLE_MS},
+    ],
+}
+
+# ターゲット定義ファイルがない場合の既定値
+TARGETS = [
+    {
+        "name": "サンデーダウ",
+        "short_name": "ダウ",
+        "url": "https://nikkei225jp.com/_ssi/if/?c=731",
+        "filename": "sunday_dow.png",
+        "emoji": "🇺🇸",
+        "is_fx": False,
+    },
+    {
+        "name": "サンデーNAS100",
+        "short_name": "NAS100",
+        "url": "https://nikkei225jp.com/_ssi/if/?c=737",
+        "filename": "sunday_nas100.png",
+        "emoji": "📈",
+        "is_fx": False,
+    },
+    {
+        "name": "サンデードル円",
+        "short_name": "ドル円",
+        "url": "https://nikkei225jp.com/_ssi/if/?c=734",
+        "filename": "sunday_usdjpy.png",
+        "emoji": "💵",
+        "is_fx": True,
+    },
+]
+
+
+def load_targets(path: Path | None = None) -> list[dict]:
+    """ターゲット定義を JSON から読み込む（ファイルがなければ既定の TARGETS）
+
+    JSON は {"targets": [{"name", "url", "filename", ...}, ...]} 形式。
+    short_name / emoji / is_fx / post / timeout_sec / actions は省略可能。
+    "actions"（ポップアップ・タブ操作のプロファイル）はトップレベルにも書け、
+    ターゲット個別の指定がそれに優先する。
+    """
+    path = path or DEFAULT_TARGETS_FILE
+    if not path.exists():
+        print(f"Target registry not found: {path} (using built-in targets)")
+        return [dict(t, post=True, actions=merge_actions()) for t in TARGETS]
+
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    targets: list[dict] = []
+    seen: set[str] = set()
+    for item in raw.get("targets", []):
+        if not all(item.get(k) for k in ("name", "url", "filename")):
+            print(f"WARNING: Skipping target without name/url/filename: {item}")
+            continue
+        if item["name"] in seen or item["filename"] in seen:
+            print(f"WARNING: Skipping duplicate target: {item['name']}")
+            continue
+        if item.get("enabled") is False:
+            continue
+        seen.update((item["name"], item["filename"]))
+        targets.append({
+            "name": item["name"],
+            "short_name": item.get("short_name", item["name"]),
+            "url": item["url"],
+            "filename": item["filename"],
+            "emoji": item.get("emoji", "📈"),
+            "is_fx": bool(item.get("is_fx", False)),
+            "post": item.get("post", True),
+            "timeout_sec": item.get("timeout_sec"),
+            "actions": merge_actions(raw.get("actions"), item.get("actions")),
+        })
+
+    print(f"Loaded {len(targets)} targets from {path}")
+    return targets
+
+
+def merge_actions(*layers: dict | None) -> dict:
+    """既定の操作プロファイルに registry 全体・ターゲット個別の指定を順に重ねる"""
+    actions = {k: (list(v) if isinstance(v, list) else v) for k, v in DEFAULT_ACTIONS.items()}
+    for layer in layers:
+        for key, value in (layer or {}).items():
+            if key in actions:
+                actions[key] = value
+    return actions
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else None
+    for target in load_targets(path):
+        tabs = ", ".join(t["name"] for t in target["actions"]["tabs"])
+        print(f"  {target['name']:<16} post={str(target['post']):<5} tabs=[{tabs}]  {target['url']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+ツイート本文生成のベンチマーク
+
+ランダムに作った数千件の入力で、3つのスクリプトの本文生成を従来の実装と比較する。
+
+    calendar: post_weekly_calendar.generate_tweet()（イベントを1件ずつ減らして組み直す従来の方法）
+    sunday:   capture_sunday_markets.generate_tweet_text()（長い版 → 短い版 → 静的テキスト）
+    listing:  post_to_x.format_tweet()（説明文を len() で切り詰める）
+
+実行時間のほか、X の重み付き文字数（tweet_composer.weighted_length）で 280 を
+超えた件数と、本文に入った量（calendar はイベント数、sunday は行数、listing は文字数）を報告する。
+
+使用方法:
+    python tweet_bench.py
+    python tweet_bench.py --inputs 5000 --max-events 200 --runs 5
+"""
+
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from statistics import median
+
+from post_weekly_calendar import JST, format_event_line, generate_tweet
+from capture_sunday_markets import (
+    TARGETS,
+    generate_tweet_text,
+    _generate_summary,
+    _format_data_line,
+    _static_tweet_text,
+)
+from post_to_x import format_tweet
+from tweet_composer import TWEET_LIMIT, weighted_length
+
+SAMPLE_SUMMARIES = [
+    "米国 雇用統計・失業率", "米国 消費者物価指数(CPI)", "FOMC 政策金利発表",
+    "日銀 金融政策決定会合", "ユーロ圏 GDP（速報値）", "米国 ISM製造業景気指数",
+    "米国 小売売上高", "日本 鉱工業生産（速報）", "米国 住宅着工件数", "豪州 貿易収支",
+    "米国 生産者物価指数(PPI)", "英国 英中銀政策金利", "中国 製造業PMI",
+    "独 IFO景況感指数", "米国 中古住宅販売件数 (前月比・年率換算)",
+]
+SAMPLE_WORDS = ["Makeover", "Monday", "データ", "可視化", "売上", "trend", "地域別", "比較",
+                "chart", "人口", "推移", "🌏", "📈", "growth", "2026年"]
+
+
+# ----------------------------------------------------------------------
+# 従来の実装（比較用）
+# ----------------------------------------------------------------------
+
+def legacy_calendar_tweet(week_start, week_end, events, holidays) -> str:
+    """従来の generate_tweet(): len() で数え、超えたら1件減らして全体を組み直す
+
+    組み直すときは件数の上限（5件 / 3件）が外れて全件から減らしていくため、
+    イベントが多い週ほど組み直しの回数と1回あたりの長さが増える。
+    """
+    header = f"📅 来週の重要経済指標（{week_start.month}/{week_start.day}〜{week_end.month}/{week_end.day}）\n"
+    footer = "\n#経済指標 #マーケット"
+    week_events = [e for e in events if week_start.date() <= e["date"] <= week_end.date()]
+    importance_order = {"high": 0, "medium": 1, "low": 2}
+    week_events.sort(key=lambda e: (importance_order[e["importance"]], e["datetime"]))
+    high_events = [e for e in week_events if e["importance"] == "high"]
+    medium_events = [e for e in week_events if e["importance"] == "medium"]
+    holiday_line = f"\n🏦 休場: {'、'.join(h[1] for h in holidays)}" if holidays else "\n🏦 休場: なし"
+
+    def build(high, medium):
+        parts = []
+        if high:
+            parts.append("\n🔴 重要")
+            parts.extend(format_event_line(e) for e in high)
+        if medium:
+            parts.append("\n🟡 中程度")
+            parts.extend(format_event_line(e) for e in medium)
+        parts.append(holiday_line)
+        return header + "\n".join(parts) + footer
+
+    tweet = build(high_events[:5], medium_events[:3])
+    while len(tweet) > 280 and medium_events:
+        medium_events = medium_events[:-1]
+        tweet = build(high_events[:5], medium_events)
+    while len(tweet) > 280 and high_events and len(high_events) > 1:
+        high_events = high_events[:-1]
+        tweet = build(high_events, [])
+    if not high_events and not medium_events:
+        body = "\n今週は重要な経済指標の発表予定はありません。"
+        if holidays:
+            body += f"\n\n🏦 休場: {'、'.join(h[1] for h in holidays)}"
+        tweet = header + body + footer
+    return tweet
+
+
+def legacy_sunday_tweet(market_data: dict, targets: list[dict]) -> str:
+    """従来の generate_tweet_text(): 長い版が len() で 280 を超えたら短い版にする"""
+    now = datetime.now(JST)
+    date_str = f"{now.month}/{now.day}"
+    summary = _generate_summary(market_data)
+    data_lines = [_format_data_line(t, market_data.get(t["name"])) for t in targets]
+    lines = [f"📊 サンデー指数 速報（{date_str}）", ""]
+    if summary:
+        lines.extend([summary, ""])
+    tweet = "\n".join(lines + data_lines + ["", "#サンデーダウ #投資 #株式投資 #マーケット"])
+    if len(tweet) > 280:
+        tweet = "\n".join([f"📊 サンデー指数 速報（{date_str}）", ""] + data_lines
+                          + ["", "#サンデーダウ #投資 #マーケット"])
+    if len(tweet) > 280:
+        return _static_tweet_text(date_str)
+    return tweet
+
+
+def legacy_listing_tweet(item: dict, post_type: str) -> str:
+    """従来の format_tweet(): URL を 23 とみなし、説明文を len() で切り詰める"""
+    title, description, url = item["title"], item["description"], item["url"]
+    hashtags = ("#MakeoverMonday #MyMakeoverMonday #DataViz #Python" if post_type == "makeover-monday"
+                else "#TidyTuesday #MyTidyTuesday #DataViz #RStats")
+    tweet = f"{title}\n\n{description}\n\n{url}\n\n{hashtags}"
+    if len(tweet) - len(url) + 23 > 280:
+        max_desc = 280 - len(title) - 23 - len(hashtags) - 10
+        if max_desc > 0:
+            description = description[:max_desc] + "..."
+        tweet = f"{title}\n\n{description}\n\n{url}\n\n{hashtags}"
+    return tweet
+
+
+# ----------------------------------------------------------------------
+# 合成入力
+# ----------------------------------------------------------------------
+
+def synthetic_calendar(rng: random.Random, max_events: int) -> tuple:
+    week_start = datetime(2026, 10, 19, tzinfo=JST)
+    week_end = week_start + timedelta(days=6)
+    events = []
+    for _ in range(rng.randint(0, max_events)):
+        dt = week_start + timedelta(days=rng.randint(0, 6), hours=rng.randint(8, 23),
+                                    minutes=rng.choice((0, 30)))
+        summary = rng.choice(SAMPLE_SUMMARIES)
+        if rng.random() < 0.3:
+            summary += f"（{rng.choice(['前月比', '前年比', '改定値', '確報値'])}）"
+        events.append({
+            "datetime": dt, "date": dt.date(), "time": dt.strftime("%H:%M"),
+            "summary": summary, "importance": rng.choice(("high", "medium", "medium", "low")),
+        })
+    holidays = [("2026-10-21", "祝日")] if rng.random() < 0.2 else []
+    return week_start, week_end, events, holidays
+
+
+def synthetic_market(rng: random.Random) -> tuple[dict, list[dict]]:
+    targets = TARGETS + [
+        {"name": f"サンデー指数{i}", "short_name": f"指数{i}", "emoji": "🌐", "is_fx": False}
+        for i in range(rng.randint(0, 6))
+    ]
+    market_data = {}
+    for t in targets:
+        value = rng.uniform(100, 50000)
+        change = rng.uniform(-500, 500)
+        market_data[t["name"]] = {"value": value, "change": change, "change_pct": change / value * 100}
+    return market_data, targets
+
+
+def synthetic_listing(rng: random.Random) -> tuple[dict, str]:
+    item = {
+        "title": " ".join(rng.choices(SAMPLE_WORDS, k=rng.randint(2, 8))),
+        "description": " ".join(rng.choices(SAMPLE_WORDS, k=rng.randint(0, 120))),
+        "url": f"https://example.com/posts/{rng.randint(1, 10**6)}/" + "x" * rng.randint(0, 60),
+    }
+    return item, rng.choice(("makeover-monday", "tidytuesday"))
+
+
+# ----------------------------------------------------------------------
+# 計測
+# ----------------------------------------------------------------------
+
+def _timeit(fn, runs: int) -> tuple[float, object]:
+    times = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return median(times), result
+
+
+def _report(name: str, inputs: list, legacy_fn, new_fn, runs: int, count_kept) -> bool:
+    legacy_ms, legacy = _timeit(lambda: [legacy_fn(*args) for args in inputs], runs)
+    new_ms, new = _timeit(lambda: [new_fn(*args) for args in inputs], runs)
+
+    def over(tweets):
+        return sum(weighted_length(t) > TWEET_LIMIT for t in tweets)
+
+    print(f"{name}: {len(inputs)} inputs")
+    for label, ms, tweets in (("legacy", legacy_ms, legacy), ("composer", new_ms, new)):
+        print(f"  {label:<9} {ms:9.1f} ms  over {TWEET_LIMIT} (weighted): {over(tweets):>5}  "
+              f"kept: {sum(map(count_kept, tweets)):>7}  "
+              f"mean weighted length: {sum(map(weighted_length, tweets)) / len(tweets):6.1f}")
+    return over(new) == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tweet text composition")
+    parser.add_argument("--inputs", type=int, default=3000, help="Generated inputs per script (default: 3000)")
+    parser.add_argument("--max-events", type=int, default=120,
+                        help="Upper bound of calendar events per input (default: 120)")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions, median is reported (default: 3)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    calendars = [synthetic_calendar(rng, args.max_events) for _ in range(args.inputs)]
+    markets = [synthetic_market(rng) for _ in range(args.inputs)]
+    listings = [synthetic_listing(rng) for _ in range(args.inputs)]
+
+    ok = all([
+        _report("calendar", calendars, legacy_calendar_tweet, generate_tweet, args.runs,
+                lambda t: t.count("\n・")),
+        _report("sunday", markets, legacy_sunday_tweet, generate_tweet_text, args.runs,
+                lambda t: t.count("\n")),
+        _report("listing", listings, legacy_listing_tweet, format_tweet, args.runs,
+                lambda t: len(t)),
+    ])
+    if not ok:
+        print("ERROR: composer produced tweets over the limit")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
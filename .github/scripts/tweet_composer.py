@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+X の重み付き文字数で本文を組み立てるツイートコンポーザー
+
+post_weekly_calendar.py / capture_sunday_markets.py / post_to_x.py の本文生成で使う。
+X は len() ではなく重み付きの文字数で 280 を数える（twitter-text v3）。
+
+    - U+0000〜U+10FF、一般句読点の一部（U+2000〜U+200D, U+2010〜U+201F, U+2032〜U+2037）: 1
+    - それ以外（日本語・全角記号など）: 2
+    - 絵文字は ZWJ・異体字セレクタ・肌色・国旗の組み合わせを含めて1つで 2
+    - URL は長さに関係なく 23
+
+Bluesky（書記素の数で 300）と Mastodon（文字数で 500、URL は 23）の数え方も
+grapheme_length() / mastodon_length() として持ち、compose() / truncate() の
+length 引数で切り替える（publishers.py が投稿先ごとに本文を組み立て直すときに使う）。
+
+本文は「セクション」（見出し + 行の並び）のリストとして渡し、compose() が
+必須のセクションを先に確保したうえで、優先度の高いセクションから1行ずつ
+残りの文字数に収まるだけ詰める。文字数は追加した分だけ足していくので、
+本文全体を組み直して数え直すことはない。
+
+使用方法（文字数の確認）:
+    python tweet_composer.py "📅 来週の重要経済指標" "https://example.com"
+"""
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+TWEET_LIMIT = 280
+URL_WEIGHT = 23
+BLUESKY_LIMIT = 300
+MASTODON_LIMIT = 500
+
+_LIGHT = "\u0000-\u10FF\u2000-\u200D\u2010-\u201F\u2032-\u2037"
+_HEAVY_RE = re.compile(f"[^{_LIGHT}]")
+_NON_ASCII_LIGHT_RE = re.compile("[\u0080-\u10FF\u2000-\u200D\u2010-\u201F\u2032-\u2037]")
+# 重み 1 の文字の並び（group 1）と重み 2 の文字の並び
+_RUN_RE = re.compile(f"([{_LIGHT}]+)|[^{_LIGHT}]+")
+_URL_RE = re.compile(r"https?://\S+")
+_EMOJI_BASE = "\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF\U0001F000-\U0001FAFF"
+_EMOJI_TAIL = "\uFE0F\U0001F3FB-\U0001F3FF"
+_EMOJI_RE = re.compile(
+    "[\U0001F1E6-\U0001F1FF]{2}"
+    "|[0-9#*]\uFE0F?\u20E3"
+    f"|[{_EMOJI_BASE}][{_EMOJI_TAIL}]*(?:\u200D[{_EMOJI_BASE}][{_EMOJI_TAIL}]*)*"
+)
+
+_TOKEN_RE = re.compile(f"{_URL_RE.pattern}|{_EMOJI_RE.pattern}")
+# 複数のコードポイントからなる絵文字に必ず含まれる文字（国旗・キーキャップ・ZWJ・異体字セレクタ・肌色）
+_EMOJI_JOIN_RE = re.compile("[\U0001F1E6-\U0001F1FF\u20E3\u200D\uFE0F\U0001F3FB-\U0001F3FF]")
+
+
+def _naive_weight(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    if _NON_ASCII_LIGHT_RE.search(text) is None:
+        # ASCII 以外がすべて 2 なら、ASCII 以外の文字数を足すだけでよい
+        return 2 * len(text) - len(text.encode("ascii", "ignore"))
+    return len(text) + len(_HEAVY_RE.findall(text))
+
+
+@lru_cache(maxsize=8192)
+def weighted_length(text: str) -> int:
+    """X が数える重み付きの文字数（見出しや区切りは何度も数えるのでメモ化する）"""
+    if "http" in text:
+        text = _URL_RE.sub("x" * URL_WEIGHT, text)
+    if text.isascii():
+        return len(text)
+    text = unicodedata.normalize("NFC", text)
+    length = _naive_weight(text)
+    if _EMOJI_JOIN_RE.search(text) is None:
+        return length
+    for m in _EMOJI_RE.finditer(text):
+        # 1文字だけの絵文字はもともと 2 なので、組み合わせだけ数え直す
+        if m.end() - m.start() > 1:
+            length += 2 - _naive_weight(m.group())
+    return length
+
+
+@lru_cache(maxsize=8192)
+def grapheme_length(text: str) -> int:
+    """Bluesky が数える書記素の数（絵文字の組み合わせと結合文字は1つに数える）"""
+    text = unicodedata.normalize("NFC", text)
+    if text.isascii():
+        return len(text)
+    length = len(text) - sum(1 for ch in text if unicodedata.combining(ch))
+    for m in _EMOJI_RE.finditer(text):
+        length -= m.end() - m.start() - 1
+    return length
+
+
+@lru_cache(maxsize=8192)
+def mastodon_length(text: str) -> int:
+    """Mastodon が数える文字数（URL は長さに関係なく 23）"""
+    if "http" in text:
+        text = _URL_RE.sub("x" * URL_WEIGHT, text)
+    return len(text)
+
+
+def _plain_fit(text: str, start: int, end: int, room: int, length) -> tuple[int, int]:
+    """URL・絵文字を含まない text[start:end] を先頭から room に収まるだけ取る
+
+    Returns:
+        (切る位置, 使った文字数)
+    """
+    used = 0
+    if length is grapheme_length:
+        # 結合文字は 0、それ以外は 1
+        for i in range(start, end):
+            weight = 0 if unicodedata.combining(text[i]) else 1
+            if used + weight > room:
+                return i, used
+            used += weight
+        return end, used
+    heavy = 2 if length is weighted_length else 1
+    # 重みが同じ文字の並びごとに進め、収まらない並びの中は割り算で位置を決める
+    for m in _RUN_RE.finditer(text, start, end):
+        per = 1 if m.group(1) else heavy
+        size = (m.end() - m.start()) * per
+        if used + size > room:
+            n = (room - used) // per
+            return m.start() + n, used + n * per
+        used += size
+    return end, used
+
+
+def _prefix_fit(text: str, budget: int, length) -> int:
+    """length で数えて budget に収まる最長の先頭部分の長さ（URL・絵文字の途中では切らない）
+
+    先頭から重みを足していくだけなので、切り出した部分を数え直すことはない。
+    """
+    # URL・絵文字を含まない部分の重み（収まる部分は丸ごと足し、はみ出す部分だけ1文字単位で見る）
+    plain = _naive_weight if length is weighted_length else len if length is mastodon_length else None
+    used = 0
+    pos = 0
+    for m in _TOKEN_RE.finditer(text):
+        weight = plain(text[pos:m.start()]) if plain else budget + 1
+        if used + weight > budget:
+            cut, weight = _plain_fit(text, pos, m.start(), budget - used, length)
+            if cut < m.start():
+                return cut
+        used += weight
+        weight = length(m.group())
+        if used + weight > budget:
+            return m.start()
+        used += weight
+        pos = m.end()
+    return _plain_fit(text, pos, len(text), budget - used, length)[0]
+
+
+def _bisect_fit(text: str, budget: int, length) -> int:
+    """任意の length 用: 収まる最長の先頭部分を二分探索する"""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if length(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    # 絵文字の組み合わせや URL の途中では切らない
+    for m in _TOKEN_RE.finditer(text, 0, lo + 1):
+        if m.start() < lo < m.end():
+            lo = m.start()
+            break
+    while lo and length(text[:lo]) > budget:
+        lo -= 1
+    return lo
+
+
+def truncate(text: str, budget: int, ellipsis: str = "...", length=weighted_length) -> str:
+    """length で数えた文字数が budget 以内になるよう末尾を切って ellipsis を付ける"""
+    if length(text) <= budget:
+        return text
+    budget -= length(ellipsis)
+    if budget <= 0:
+        return ""
+    if length is mastodon_length:
+        lo = _prefix_fit(text, budget, length)
+    elif length is weighted_length or length is grapheme_length:
+        # 数えるときと同じく NFC にそろえてから切る
+        text = unicodedata.normalize("NFC", text)
+        lo = _prefix_fit(text, budget, length)
+    else:
+        lo = _bisect_fit(text, budget, length)
+    return text[:lo].rstrip() + ellipsis
+
+
+def section(
+    lines: list[str] | str = (),
+    heading: str | None = None,
+    priority: int = 0,
+    required: bool = False,
+    min_lines: int = 0,
+    max_lines: int | None = None,
+    variants: list[str] | None = None,
+    truncatable: bool = False,
+    sep: str = "\n\n",
+    joiner: str = "\n",
+) -> dict:
+    """compose() に渡すセクションを作る
+
+    Args:
+        lines: 本文の行（文字列1つなら1行）
+        heading: 1行目に付ける見出し（行が1つも入らなければ見出しも出さない）
+        priority: 小さいほど先に詰める
+        required: すべての行を必ず入れる
+        min_lines: 先頭から必ず入れる行数
+        max_lines: 入れる行数の上限
+        variants: 1行だけのセクションの候補（長い順）。収まる最初の候補を使い、
+            必須なら最後の候補の分を先に確保する
+        truncatable: 1行だけのセクションが収まらなければ末尾を切って入れる
+        sep: 前のセクションとの区切り
+        joiner: 行どうしの区切り
+    """
+    if isinstance(lines, str):
+        lines = [lines]
+    return {
+        "lines": list(lines if max_lines is None else lines[:max_lines]),
+        "heading": heading,
+        "priority": priority,
+        "required": required,
+        "min_lines": min_lines,
+        "variants": variants,
+        "truncatable": truncatable,
+        "sep": sep,
+        "joiner": joiner,
+    }
+
+
+def compose(sections: list[dict], limit: int = TWEET_LIMIT, length=weighted_length) -> str:
+    """セクションを limit 以内に詰めて本文にする（文字数は length で数える）
+
+    1. 必須の行（required / min_lines / variants の最短候補）をすべて確保する
+    2. priority の順に、残りの文字数に収まる行を先頭から1行ずつ足す
+       （収まらない行があればそのセクションはそこで打ち切る）
+    3. variants は収まる最も長い候補に、truncatable は残りの文字数に切り詰めて入れる
+
+    必須の行だけで limit を超える場合もそのまま返すので、呼び出し側で
+    length() を確かめてフォールバックする。
+    """
+    chosen: list[list[str]] = [[] for _ in sections]
+    used = 0
+
+    # 区切りと見出しは、そのセクションに最初の行が入るときに数える（セクションごとに1回だけ数える）
+    joiner_cost = [length(s["joiner"]) for s in sections]
+    opening_cost = [
+        (length(s["sep"]) if i else 0)
+        + (length(s["heading"]) + joiner_cost[i] if s["heading"] else 0)
+        for i, s in enumerate(sections)
+    ]
+
+    def line_cost(i: int, line: str) -> int:
+        return length(line) + (joiner_cost[i] if chosen[i] else opening_cost[i])
+
+    reserved: dict[int, int] = {}
+    for i, s in enumerate(sections):
+        if s["variants"]:
+            if s["required"]:
+                reserved[i] = line_cost(i, s["variants"][-1])
+                used += reserved[i]
+            continue
+        must = len(s["lines"]) if s["required"] else min(s["min_lines"], len(s["lines"]))
+        for line in s["lines"][:must]:
+            used += line_cost(i, line)
+            chosen[i].append(line)
+
+    for i in sorted(range(len(sections)), key=lambda i: sections[i]["priority"]):
+        s = sections[i]
+        if s["variants"]:
+            budget = limit - used + reserved.get(i, 0)
+            for variant in s["variants"]:
+                cost = line_cost(i, variant)
+                if cost <= budget:
+                    chosen[i].append(variant)
+                    used += cost - reserved.get(i, 0)
+                    break
+            else:
+                if i in reserved:
+                    chosen[i].append(s["variants"][-1])
+            continue
+        for line in s["lines"][len(chosen[i]):]:
+            cost = line_cost(i, line)
+            if used + cost <= limit:
+                chosen[i].append(line)
+                used += cost
+                continue
+            if s["truncatable"] and not chosen[i]:
+                overhead = cost - length(line)
+                cut = truncate(line, limit - used - overhead, length=length)
+                if cut:
+                    chosen[i].append(cut)
+                    used += overhead + length(cut)
+            break
+
+    blocks = []
+    for s, lines in zip(sections, chosen):
+        if not lines:
+            continue
+        rows = ([s["heading"]] if s["heading"] else []) + lines
+        blocks.append((s["sep"], s["joiner"].join(rows)))
+    return "".join(block if n == 0 else sep + block for n, (sep, block) in enumerate(blocks))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: tweet_composer.py "<text>" [...]')
+        sys.exit(1)
+    for text in sys.argv[1:]:
+        print(f"{weighted_length(text):>4} (bsky {grapheme_length(text):>3}, "
+              f"mastodon {mastodon_length(text):>3}, len {len(text):>3})  {text}")
+
+
+if __name__ == "__main__":
+    main()
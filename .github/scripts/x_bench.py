@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+X クライアント（x_client.py）のオフライン負荷試験
+
+fake_x_server.py をプロセス内で起動し、2つのシナリオを比べる。
+
+    throughput: 画像付きツイートを続けて投稿する。従来の方法（投稿ごとに新しいクライアントと接続、
+                画像は1枚ずつ）と、共有クライアント（接続プール、画像は同時アップロード）の比較。
+                一部のツイートには CHUNKED_THRESHOLD を超える画像を入れてチャンク分割も通す
+    retry:      レート制限（ウィンドウあたりの上限）と 503 を起こすサーバーで投稿する。
+                従来どおりエラーで諦める場合（max_retries=0）と、x-rate-limit-reset まで待って
+                再試行する場合の成功数と待ち時間を比べる
+
+使用方法:
+    python x_bench.py
+    python x_bench.py --tweets 30 --latency-ms 50 --connect-ms 100 --rate-limit 3 --window 2
+"""
+
+import sys
+import time
+import random
+import argparse
+
+import x_client
+from x_client import CHUNKED_THRESHOLD, XClient, XError
+from fake_x_server import FakeXState, start_server
+
+CREDENTIALS = ("bench-key", "bench-secret", "bench-token", "bench-token-secret")
+
+
+def make_media(rng: random.Random, tweets: int, images: int, image_kb: int) -> list[list[tuple[str, bytes]]]:
+    """ツイートごとの画像（5件に1件は大きな画像を含める）"""
+    batches = []
+    for i in range(tweets):
+        batch = []
+        for j in range(images):
+            size = CHUNKED_THRESHOLD + 512 * 1024 if (i % 5 == 0 and j == 0) else image_kb * 1024
+            batch.append((f"chart_{i}_{j}.png", rng.randbytes(size)))
+        batches.append(batch)
+    return batches
+
+
+def post_batches(
+    base_url: str,
+    batches: list[list[tuple[str, bytes]]],
+    shared: bool,
+    workers: int,
+    max_retries: int = x_client.MAX_RETRIES,
+    label: str = "",
+) -> dict:
+    """batches を投稿し、{"ms", "posted", "failed", "requests", "retries", "waited_s"} を返す"""
+    totals = {"requests": 0, "retries": 0, "waited_s": 0.0}
+    client = None
+    posted = failed = 0
+    started = time.perf_counter()
+    for i, batch in enumerate(batches):
+        if client is None or not shared:
+            if client is not None:
+                client.close()
+                for k in totals:
+                    totals[k] += client.stats[k]
+            client = XClient(*CREDENTIALS, api_base=base_url, upload_base=base_url, max_retries=max_retries)
+        try:
+            results = client.upload_many(batch, workers=workers)
+            media_ids = [r["media_id"] for r in results if r["media_id"]]
+            if len(media_ids) != len(batch):
+                raise XError(0, "upload failed")
+            client.create_tweet(f"{label} tweet {i}", media_ids)
+            posted += 1
+        except XError:
+            failed += 1
+    elapsed = (time.perf_counter() - started) * 1000
+    if client is not None:
+        client.close()
+        for k in totals:
+            totals[k] += client.stats[k]
+    return {"ms": elapsed, "posted": posted, "failed": failed, **totals}
+
+
+def _row(label: str, r: dict, server: dict) -> str:
+    return (f"  {label:<28} {r['ms']:9.0f} ms  posted {r['posted']:>3}  failed {r['failed']:>3}  "
+            f"requests {r['requests']:>4}  retries {r['retries']:>3}  waited {r['waited_s']:5.1f}s  "
+            f"connections {server['connections']:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the X client against the fake X API")
+    parser.add_argument("--tweets", type=int, default=20, help="Tweets per scenario (default: 20)")
+    parser.add_argument("--images", type=int, default=4, help="Images per tweet (default: 4)")
+    parser.add_argument("--image-kb", type=int, default=300, help="Size of regular images (default: 300)")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Server delay per request (default: 30)")
+    parser.add_argument("--connect-ms", type=float, default=60,
+                        help="Server delay per new connection, stands in for TLS setup (default: 60)")
+    parser.add_argument("--rate-limit", type=int, default=4,
+                        help="Requests per window per endpoint in the retry scenario (default: 4)")
+    parser.add_argument("--window", type=float, default=2, help="Rate limit window in seconds (default: 2)")
+    parser.add_argument("--fail-rate", type=float, default=0.1,
+                        help="Share of uploads answered with 503 in the retry scenario (default: 0.1)")
+    parser.add_argument("--backoff", type=float, default=0.1,
+                        help="Backoff base for 5xx in seconds, shortened for the bench (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    x_client.BACKOFF_BASE = args.backoff
+    rng = random.Random(args.seed)
+    batches = make_media(rng, args.tweets, args.images, args.image_kb)
+    total_mb = sum(len(d) for b in batches for _, d in b) / 1024 / 1024
+    print(f"throughput: {args.tweets} tweets x {args.images} images ({total_mb:.1f} MB), "
+          f"latency {args.latency_ms:.0f}ms, connect {args.connect_ms:.0f}ms")
+
+    ok = True
+    for label, shared, workers in (("per-call client, serial", False, 1),
+                                   ("shared client, concurrent", True, x_client.UPLOAD_WORKERS)):
+        state = FakeXState(latency_ms=args.latency_ms, connect_ms=args.connect_ms)
+        server, base_url = start_server(state)
+        result = post_batches(base_url, batches, shared, workers, label=label)
+        server.shutdown()
+        print(_row(label, result, state.stats))
+        attached = sum(len(t["media_ids"]) for t in state.tweets.values())
+        ok &= result["posted"] == args.tweets and attached == args.tweets * args.images
+
+    retry_batches = [b[1:2] for b in batches]
+    print(f"\nretry: {len(retry_batches)} tweets x 1 image, {args.rate_limit} requests per "
+          f"{args.window:.0f}s window, {args.fail_rate:.0%} of uploads fail with 503")
+    for label, retries in (("no retries (legacy)", 0), ("rate-limit aware retries", 20)):
+        state = FakeXState(latency_ms=args.latency_ms, rate_limit=args.rate_limit,
+                           window=args.window, fail_rate=args.fail_rate, seed=args.seed)
+        server, base_url = start_server(state)
+        result = post_batches(base_url, retry_batches, True, 1, max_retries=retries, label=label)
+        server.shutdown()
+        print(_row(label, result, state.stats) + f"  429s {state.stats['rate_limited']:>3}")
+        if retries:
+            ok &= result["posted"] == len(retry_batches)
+
+    if not ok:
+        print("ERROR: not every tweet was posted with its images")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
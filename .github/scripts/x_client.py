@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+X (Twitter) API の共有クライアント
+
+post_to_x.py / post_weekly_calendar.py / capture_sunday_markets.py が投稿と画像の
+アップロードに使う。1つのプロセスで1つの認証済みクライアント（requests.Session と
+OAuth1 署名）を使い回し、接続はプールして再利用する。
+
+    アップロード: v1.1 media/upload。CHUNKED_THRESHOLD を超える画像は INIT / APPEND /
+                  FINALIZE のチャンク分割。複数の画像はスレッドで同時にアップロードする
+    投稿:         v2 POST /2/tweets
+    リトライ:     429 は x-rate-limit-reset の時刻まで待つ（MAX_RATE_LIMIT_WAIT を超えるなら諦める）。
+                  5xx と通信エラーは指数バックオフ。ただし投稿は二重投稿を避けるため 429 だけ再試行する
+
+接続先は X_API_BASE / X_UPLOAD_BASE 環境変数（または引数）で差し替えられる。
+fake_x_server.py のローカルサーバーに向ければ、オフラインで負荷試験とリトライの確認ができる。
+
+使用方法（認証とアップロードの確認。投稿はしない）:
+    python x_client.py chart.png
+    X_API_BASE=http://127.0.0.1:8766 X_UPLOAD_BASE=http://127.0.0.1:8766 python x_client.py chart.png
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from requests_oauthlib import OAuth1
+except ImportError:
+    OAuth1 = None
+
+API_BASE = "https://api.twitter.com"
+UPLOAD_BASE = "https://upload.twitter.com"
+
+# これより大きい画像はチャンク分割でアップロードする（単純アップロードの上限は 5MB）
+CHUNKED_THRESHOLD = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# 同時アップロード数（1ツイートの画像は最大4枚）
+UPLOAD_WORKERS = 4
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0  # 秒。5xx と通信エラーは 1, 2, 4, ... 秒待つ
+
+# x-rate-limit-reset がこれより先なら待たずに失敗させる（X のウィンドウは 15 分）
+MAX_RATE_LIMIT_WAIT = 15 * 60
+
+CREDENTIAL_ENV = ("X_API_KEY", "X_API_SECRET", "X_ACCESS_TOKEN", "X_ACCESS_TOKEN_SECRET")
+
+
+class XError(Exception):
+    """X API のエラー（status は HTTP ステータス。通信エラーは 0）"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status} {message}" if status else message)
+        self.status = status
+
+
+class XClient:
+    """接続をプールし、レート制限を待って再試行する X API クライアント"""
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        access_token: str,
+        access_token_secret: str,
+        api_base: str = API_BASE,
+        upload_base: str = UPLOAD_BASE,
+        max_retries: int = MAX_RETRIES,
+        max_rate_limit_wait: float = MAX_RATE_LIMIT_WAIT,
+        pool_size: int = UPLOAD_WORKERS * 2,
+    ):
+        if OAuth1 is None:
+            raise RuntimeError("requests-oauthlib is not installed. Run: pip install requests-oauthlib")
+        self.api_base = api_base.rstrip("/")
+        self.upload_base = upload_base.rstrip("/")
+        self.max_retries = max_retries
+        self.max_rate_limit_wait = max_rate_limit_wait
+
+        self.session = requests.Session()
+        self.session.auth = OAuth1(api_key, api_secret, access_token, access_token_secret)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "waited_s": 0.0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "XClient | None":
+        """環境変数の認証情報でクライアントを作る（足りなければ None）"""
+        if OAuth1 is None:
+            print("ERROR: requests-oauthlib is not installed. Run: pip install requests-oauthlib")
+            return None
+        missing = [name for name in CREDENTIAL_ENV if not os.environ.get(name)]
+        if missing:
+            print("ERROR: Missing X API credentials in environment variables")
+            print(f"Required: {', '.join(CREDENTIAL_ENV)}")
+            return None
+        kwargs.setdefault("api_base", os.environ.get("X_API_BASE", API_BASE))
+        kwargs.setdefault("upload_base", os.environ.get("X_UPLOAD_BASE", UPLOAD_BASE))
+        return cls(*(os.environ[name] for name in CREDENTIAL_ENV), **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _wait(self, seconds: float) -> None:
+        self._count("waited_s", seconds)
+        time.sleep(seconds)
+
+    def _rate_limit_wait(self, response: requests.Response, attempt: int) -> float:
+        """429 のあと待つ秒数（x-rate-limit-reset がなければ指数バックオフ）"""
+        reset = response.headers.get("x-rate-limit-reset")
+        if reset and reset.isdigit():
+            return max(0.0, int(reset) - time.time()) + 0.5
+        return BACKOFF_BASE * 2 ** attempt
+
+    def request(self, method: str, url: str, idempotent: bool = True, **kwargs) -> requests.Response:
+        """リクエストを送り、成功したレスポンスを返す（失敗は XError）
+
+        idempotent が偽なら（投稿）、サーバーが処理した可能性のある 5xx と通信エラーは再試行しない。
+        """
+        kwargs.setdefault("timeout", 60)
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                if last or not idempotent:
+                    raise XError(0, f"{method} {url}: {e}") from e
+                self._count("retries")
+                self._wait(BACKOFF_BASE * 2 ** attempt)
+                continue
+
+            if response.status_code == 429:
+                self._count("rate_limited")
+                wait = self._rate_limit_wait(response, attempt)
+                if last or wait > self.max_rate_limit_wait:
+                    raise XError(429, f"rate limited until {response.headers.get('x-rate-limit-reset')}")
+                print(f"    Rate limited, waiting {wait:.1f}s")
+                self._count("retries")
+                self._wait(wait)
+                continue
+            if response.status_code >= 500 and idempotent and not last:
+                self._count("retries")
+                self._wait(BACKOFF_BASE * 2 ** attempt * (1 + random.random() / 2))
+                continue
+            if response.status_code >= 400:
+                raise XError(response.status_code, response.text[:200])
+            return response
+        raise XError(0, f"{method} {url}: retries exhausted")
+
+    # ------------------------------------------------------------------
+    # アップロード
+    # ------------------------------------------------------------------
+
+    def upload_media(self, name: str, data: bytes) -> str:
+        """画像をアップロードして media_id を返す"""
+        url = f"{self.upload_base}/1.1/media/upload.json"
+        if len(data) <= CHUNKED_THRESHOLD:
+            response = self.request("POST", url, files={"media": (name, data)})
+            return response.json()["media_id_string"]
+
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        init = self.request("POST", url, data={
+            "command": "INIT",
+            "total_bytes": len(data),
+            "media_type": media_type,
+            "media_category": "tweet_image",
+        }).json()
+        media_id = init["media_id_string"]
+        for index, offset in enumerate(range(0, len(data), CHUNK_SIZE)):
+            self.request("POST", url, data={
+                "command": "APPEND", "media_id": media_id, "segment_index": index,
+            }, files={"media": (name, data[offset:offset + CHUNK_SIZE])})
+        info = self.request("POST", url, data={"command": "FINALIZE", "media_id": media_id}).json()
+
+        # 画像は通常すぐ使えるが、processing_info があれば完了まで待つ
+        processing = info.get("processing_info")
+        while processing and processing.get("state") in ("pending", "in_progress"):
+            self._wait(processing.get("check_after_secs", 1))
+            processing = self.request(
+                "GET", url, params={"command": "STATUS", "media_id": media_id},
+            ).json().get("processing_info")
+        if processing and processing.get("state") == "failed":
+            raise XError(0, f"media processing failed for {name}: {processing.get('error')}")
+        return media_id
+
+    def upload_many(self, media: list[tuple[str, bytes]], workers: int = UPLOAD_WORKERS) -> list[dict]:
+        """複数の画像を同時にアップロードする
+
+        Returns:
+            入力と同じ順の [{"name", "media_id", "elapsed_ms", "start"}]（失敗した画像は media_id が None）
+        """
+        def upload(item):
+            name, data = item
+            started = time.perf_counter()
+            try:
+                media_id = self.upload_media(name, data)
+                print(f"    Uploaded: {name} ({len(data) / 1024:.0f} KB, media_id: {media_id})")
+            except XError as e:
+                print(f"    WARNING: Failed to upload {name}: {e}")
+                media_id = None
+            return {"name": name, "media_id": media_id,
+                    "elapsed_ms": (time.perf_counter() - started) * 1000, "start": started}
+
+        if len(media) <= 1:
+            return [upload(item) for item in media]
+        with ThreadPoolExecutor(max_workers=min(workers, len(media))) as pool:
+            return list(pool.map(upload, media))
+
+    # ------------------------------------------------------------------
+    # 投稿
+    # ------------------------------------------------------------------
+
+    def create_tweet(self, text: str, media_ids: list[str] | None = None) -> str:
+        """ツイートを投稿して tweet id を返す（403 は重複投稿のことが多い）"""
+        payload = {"text": text}
+        if media_ids:
+            payload["media"] = {"media_ids": list(media_ids)}
+        response = self.request("POST", f"{self.api_base}/2/tweets", idempotent=False, json=payload)
+        return response.json()["data"]["id"]
+
+
+_shared: XClient | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> XClient | None:
+    """環境変数から作ったクライアントをプロセス内で共有する（認証情報がなければ None）"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = XClient.from_env()
+        return _shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload images with the shared X client (no tweet)")
+    parser.add_argument("images", nargs="+", type=str, help="Image files to upload")
+    args = parser.parse_args()
+
+    client = shared_client()
+    if client is None:
+        sys.exit(1)
+    media = [(Path(p).name, Path(p).read_bytes()) for p in args.images]
+    started = time.perf_counter()
+    results = client.upload_many(media)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    ok = sum(1 for r in results if r["media_id"])
+    print(f"{ok}/{len(results)} uploaded in {elapsed_ms:.0f}ms via {client.upload_base}  stats: {client.stats}")
+    sys.exit(0 if ok == len(results) else 1)
+
+
+if __name__ == "__main__":
+    main()